@@ -0,0 +1,107 @@
+"""
+Throughput benchmark of the award amount parser (`oic_scrape.money`).
+
+Amounts are generated in the formats the spiders see ("$1,250,000", "$50,000.00",
+"CAD 75,000", "€ 1.250.000,50", "£2.5 million"), with as many distinct values as given by
+`--distinct`, since the same amounts recur across grants. Each parser is timed over the same
+amounts:
+
+- `legacy`: the regex the spiders used (`float(re.sub(r"[^\\d.]", "", ...))`), for reference
+- `parse_money (cold)`: the parser with an empty cache
+- `parse_money (cached)`: the parser again, with every value cached
+- `parse_money_batch`: the batch form, parsing each distinct value once
+- `parse_money_series`: the Polars form, over a column of the amounts
+
+Usage:
+
+    $ poetry run python benchmarks/money.py
+    $ poetry run python benchmarks/money.py --amounts 1000000 --distinct 50000 --json money.json
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import polars as pl
+
+from oic_scrape.money import parse_money, parse_money_batch, parse_money_series
+
+FORMATS = [
+    lambda n: f"${n:,}",
+    lambda n: f"${n:,}.00",
+    lambda n: f"CAD {n:,}",
+    lambda n: f"€ {n:,}".replace(",", ".") + ",50",
+    lambda n: f"£{n / 1e6:.1f} million",
+    lambda n: f"{n:,} USD",
+]
+
+
+def generate_amounts(count: int, distinct: int, seed: int = 0) -> List[str]:
+    """Returns `count` amounts drawn from `distinct` values in the formats of `FORMATS`."""
+    rng = random.Random(seed)
+    values = [rng.choice(FORMATS)(rng.randrange(1_000, 5_000_000)) for _ in range(distinct)]
+    return [rng.choice(values) for _ in range(count)]
+
+
+def legacy_parse(text: str) -> Optional[float]:
+    try:
+        return float(re.sub(r"[^\d.]", "", text))
+    except ValueError:
+        return None
+
+
+def time_run(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(amounts: List[str]) -> List[Dict[str, Any]]:
+    series = pl.Series("amount", amounts)
+    parse_money.cache_clear()
+    runs = [
+        ("legacy", lambda: [legacy_parse(amount) for amount in amounts]),
+        ("parse_money (cold)", lambda: [parse_money(amount) for amount in amounts]),
+        ("parse_money (cached)", lambda: [parse_money(amount) for amount in amounts]),
+    ]
+    results = [{"parser": name, "seconds": time_run(function)} for name, function in runs]
+    parse_money.cache_clear()
+    results.append({"parser": "parse_money_batch", "seconds": time_run(lambda: parse_money_batch(amounts))})
+    parse_money.cache_clear()
+    results.append({"parser": "parse_money_series", "seconds": time_run(lambda: parse_money_series(series))})
+    for result in results:
+        result["amounts_per_second"] = len(amounts) / result["seconds"]
+    return results
+
+
+def print_report(results: List[Dict[str, Any]], count: int, distinct: int) -> None:
+    print(f"{count:,} amounts, {distinct:,} distinct\n")
+    header = f"{'parser':<24} {'seconds':>9} {'amounts/s':>14}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['parser']:<24} {r['seconds']:>9.3f} {r['amounts_per_second']:>14,.0f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--amounts", type=int, default=200_000, help="Number of amounts (default: %(default)s)")
+    parser.add_argument("--distinct", type=int, default=10_000, help="Number of distinct amounts (default: %(default)s)")
+    parser.add_argument("--json", dest="json_output", help="Also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    amounts = generate_amounts(args.amounts, args.distinct)
+    results = run_benchmarks(amounts)
+    print_report(results, args.amounts, args.distinct)
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
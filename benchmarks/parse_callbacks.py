@@ -0,0 +1,414 @@
+"""
+Micro-benchmarks for spider parse callbacks.
+
+Each spider callback (`parse_grant`, `parse_award_page`, `parse_grantee`, ...) is timed in
+isolation against stored responses, without touching the network, the scheduler or the
+item pipelines. This lets us compare the cost of the different extraction styles used
+across the spiders (BeautifulSoup, regexes over raw HTML, `:contains()` CSS selectors)
+and find the slow extractors.
+
+Fixtures live in `benchmarks/fixtures/<spider_name>/` as pairs of files:
+
+- `<fixture>.json`: metadata for the stored response
+    - `url` (required): the URL the response was fetched from
+    - `callback` (required): the name of the spider method to benchmark
+    - `status`, `headers`, `meta`, `cb_kwargs` (optional)
+- `<fixture>.body`: the raw response body, exactly as downloaded
+
+No fixtures are shipped (they are pages of the funders' sites): record them first, either by
+downloading pages directly:
+
+    $ poetry run python benchmarks/parse_callbacks.py record dfg.de_grants parse_grant https://gepris.dfg.de/gepris/projekt/5000000
+
+or from Scrapy's HTTP cache (enabled in `settings.py`) after a normal crawl:
+
+    $ poetry run python benchmarks/parse_callbacks.py capture dfg.de_grants parse_grant --url-pattern /projekt/ --limit 5
+
+Then run the benchmarks for all (or some) spiders:
+
+    $ poetry run python benchmarks/parse_callbacks.py run
+    $ poetry run python benchmarks/parse_callbacks.py run dfg.de_grants --iterations 500
+
+Spiders are built through a crawler with the project settings, as during a crawl, so callbacks
+can use `self.crawler` (e.g. its stats). Async callbacks are run to completion on an asyncio
+event loop; those needing a live browser page (`playwright_page`) can't be benchmarked.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from scrapy import Request
+from scrapy.http.response import Response
+from scrapy.responsetypes import responsetypes
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.misc import arg_to_iter
+from scrapy.utils.project import data_path, get_project_settings
+from scrapy.utils.reactor import install_reactor
+from scrapy.utils.test import get_crawler
+from w3lib.http import headers_raw_to_dict
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# The event loop async callbacks run on, created once so that it isn't part of the timings
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def load_fixtures(spider_name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Loads the stored response fixtures for a spider.
+
+    Args:
+        spider_name (str): The name of the spider, which is also the fixture directory name.
+
+    Yields:
+        Dict[str, Any]: The fixture metadata, with the raw body added under `body` and the
+            fixture's file stem under `name`.
+    """
+    spider_dir = FIXTURES_DIR / spider_name
+    if not spider_dir.is_dir():
+        return
+    for meta_path in sorted(spider_dir.glob("*.json")):
+        fixture = json.loads(meta_path.read_text(encoding="utf-8"))
+        fixture["name"] = meta_path.stem
+        fixture["body"] = meta_path.with_suffix(".body").read_bytes()
+        yield fixture
+
+
+def build_response(fixture: Dict[str, Any]) -> Response:
+    """
+    Builds a fresh response object for a fixture.
+
+    A new response is built for every call so that lazily-parsed selectors are not reused
+    between iterations, and the parsing cost of the document is included in each timing.
+
+    Args:
+        fixture (Dict[str, Any]): The fixture, as returned by `load_fixtures`.
+
+    Returns:
+        Response: An `HtmlResponse`, `TextResponse` or `XmlResponse` depending on the
+            stored headers and body.
+    """
+    headers = fixture.get("headers", {})
+    url = fixture["url"]
+    body = fixture["body"]
+    request = Request(url, meta=fixture.get("meta", {}), cb_kwargs=fixture.get("cb_kwargs", {}))
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    return respcls(
+        url=url,
+        status=fixture.get("status", 200),
+        headers=headers,
+        body=body,
+        request=request,
+    )
+
+
+def run_callback(spider, fixture: Dict[str, Any]) -> int:
+    """
+    Runs a spider callback over a fixture and exhausts its output.
+
+    Args:
+        spider (scrapy.Spider): The spider instance owning the callback.
+        fixture (Dict[str, Any]): The fixture, as returned by `load_fixtures`.
+
+    Returns:
+        int: The number of items (not requests) produced by the callback.
+    """
+    response = build_response(fixture)
+    callback = getattr(spider, fixture["callback"])
+    output = callback(response, **response.request.cb_kwargs)
+    return sum(1 for result in _collect(output) if not isinstance(result, Request))
+
+
+def _collect(output) -> List[Any]:
+    """Returns the results of a callback, running it to completion if it is async."""
+    global _loop
+    if inspect.isasyncgen(output) or inspect.iscoroutine(output):
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+        if inspect.isasyncgen(output):
+
+            async def drain():
+                return [result async for result in output]
+
+            return _loop.run_until_complete(drain())
+        output = _loop.run_until_complete(output)
+    return list(arg_to_iter(output))
+
+
+def build_spider(loader: SpiderLoader, name: str):
+    """
+    Builds a spider the way a crawl does, bound to a crawler with the project settings.
+
+    Callbacks using `self.crawler` (stats, settings) or state set up in `from_crawler`
+    then behave as during a crawl.
+    """
+    settings = get_project_settings()
+    # get_crawler checks the installed reactor against TWISTED_REACTOR
+    install_reactor(settings["TWISTED_REACTOR"], settings["ASYNCIO_EVENT_LOOP"])
+    crawler = get_crawler(loader.load(name), settings.copy_to_dict())
+    return crawler.spidercls.from_crawler(crawler)
+
+
+def benchmark_fixture(
+    spider, fixture: Dict[str, Any], iterations: int, warmup: int = 3
+) -> Dict[str, Any]:
+    """
+    Times a callback over one fixture and measures its memory allocations.
+
+    Timings and allocations are measured in separate passes, as tracemalloc slows down
+    the code it traces considerably.
+
+    Args:
+        spider (scrapy.Spider): The spider instance owning the callback.
+        fixture (Dict[str, Any]): The fixture, as returned by `load_fixtures`.
+        iterations (int): The number of timed calls.
+        warmup (int, optional): The number of untimed calls made first. Defaults to 3.
+
+    Returns:
+        Dict[str, Any]: The benchmark results for the fixture.
+    """
+    for _ in range(warmup):
+        items = run_callback(spider, fixture)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items = run_callback(spider, fixture)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    run_callback(spider, fixture)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = statistics.fmean(timings)
+    return {
+        "spider": spider.name,
+        "callback": fixture["callback"],
+        "fixture": fixture["name"],
+        "body_bytes": len(fixture["body"]),
+        "iterations": iterations,
+        "items_per_call": items,
+        "mean_ms": mean * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000,
+        "ms_per_item": (mean * 1000 / items) if items else None,
+        "peak_alloc_kib": (peak - baseline) / 1024,
+        "retained_kib": (retained - baseline) / 1024,
+    }
+
+
+def run_benchmarks(
+    spider_names: List[str], iterations: int, callback: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Benchmarks every fixture of the given spiders.
+
+    Args:
+        spider_names (List[str]): The spiders to benchmark. All spiders with fixtures if empty.
+        iterations (int): The number of timed calls per fixture.
+        callback (Optional[str], optional): Only benchmark fixtures for this callback. Defaults to None.
+
+    Returns:
+        List[Dict[str, Any]]: One result per fixture: those of callbacks producing items, slowest
+            per item first, then those of callbacks producing only requests, slowest per call first.
+    """
+    loader = SpiderLoader.from_settings(get_project_settings())
+    if not spider_names:
+        spider_names = [name for name in loader.list() if (FIXTURES_DIR / name).is_dir()]
+
+    results = []
+    for name in spider_names:
+        spider = build_spider(loader, name)
+        for fixture in load_fixtures(name):
+            if callback and fixture["callback"] != callback:
+                continue
+            results.append(benchmark_fixture(spider, fixture, iterations))
+
+    # Times per item and per call aren't comparable, so they are ranked separately
+    with_items = [r for r in results if r["ms_per_item"] is not None]
+    without_items = [r for r in results if r["ms_per_item"] is None]
+    return sorted(with_items, key=lambda r: r["ms_per_item"], reverse=True) + sorted(
+        without_items, key=lambda r: r["mean_ms"], reverse=True
+    )
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Prints benchmark results as fixed-width tables, one per ranking (see `run_benchmarks`)."""
+    header = f"{'spider':<32} {'callback':<22} {'fixture':<24} {'items':>5} {'ms/call':>9} {'p95 ms':>9} {'ms/item':>9} {'peak KiB':>10}"
+    sections = [
+        ("Callbacks producing items, by ms/item", [r for r in results if r["ms_per_item"] is not None]),
+        ("Callbacks producing only requests, by ms/call", [r for r in results if r["ms_per_item"] is None]),
+    ]
+    for title, rows in sections:
+        if not rows:
+            continue
+        print(f"\n{title}\n")
+        print(header)
+        print("-" * len(header))
+        for r in rows:
+            ms_per_item = f"{r['ms_per_item']:9.3f}" if r["ms_per_item"] is not None else f"{'-':>9}"
+            print(
+                f"{r['spider']:<32} {r['callback']:<22} {r['fixture'][:24]:<24} {r['items_per_call']:>5} "
+                f"{r['mean_ms']:9.3f} {r['p95_ms']:9.3f} {ms_per_item} {r['peak_alloc_kib']:10.1f}"
+            )
+
+
+def _write_fixture(spider_name: str, fixture_name: str, body: bytes, metadata: Dict[str, Any]) -> Path:
+    out_dir = FIXTURES_DIR / spider_name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f"{fixture_name}.body").write_bytes(body)
+    path = out_dir / f"{fixture_name}.json"
+    path.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    return path
+
+
+def record_fixtures(spider_name: str, callback: str, urls: List[str]) -> int:
+    """
+    Downloads pages and stores them as benchmark fixtures.
+
+    Args:
+        spider_name (str): The spider the fixtures are for.
+        callback (str): The callback the pages should be benchmarked against.
+        urls (List[str]): The pages to download.
+
+    Returns:
+        int: The number of fixtures written.
+
+    Raises:
+        requests.HTTPError: If a page can't be downloaded.
+    """
+    settings = get_project_settings()
+    headers = {"User-Agent": settings["USER_AGENT"]}
+    for url in urls:
+        response = requests.get(url, headers=headers, timeout=60)
+        response.raise_for_status()
+        fixture_name = f"{callback}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}"
+        _write_fixture(
+            spider_name,
+            fixture_name,
+            response.content,
+            {
+                "url": response.url,
+                "callback": callback,
+                "status": response.status_code,
+                # The body is stored decoded, so the encoding headers don't apply to it
+                "headers": {
+                    k: [v] for k, v in response.headers.items()
+                    if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+                },
+            },
+        )
+    return len(urls)
+
+
+def capture_fixtures(
+    spider_name: str, callback: str, url_pattern: Optional[str] = None, limit: int = 5
+) -> int:
+    """
+    Copies responses from Scrapy's filesystem HTTP cache into benchmark fixtures.
+
+    Args:
+        spider_name (str): The spider whose cache should be read.
+        callback (str): The callback the captured responses should be benchmarked against.
+        url_pattern (Optional[str], optional): Only capture responses whose URL matches this regex. Defaults to None.
+        limit (int, optional): The maximum number of fixtures to capture. Defaults to 5.
+
+    Returns:
+        int: The number of fixtures written.
+    """
+    settings = get_project_settings()
+    cache_dir = Path(data_path(settings["HTTPCACHE_DIR"])) / spider_name
+    if not cache_dir.is_dir():
+        raise ValueError(f"No HTTP cache found for {spider_name} at {cache_dir}")
+
+    pattern = re.compile(url_pattern) if url_pattern else None
+
+    written = 0
+    for entry in sorted(cache_dir.glob("*/*")):
+        if written >= limit:
+            break
+        with open(entry / "pickled_meta", "rb") as f:
+            meta = pickle.load(f)
+        if pattern and not pattern.search(meta["url"]):
+            continue
+        headers = headers_raw_to_dict((entry / "response_headers").read_bytes())
+        _write_fixture(
+            spider_name,
+            f"{callback}-{entry.name[:12]}",
+            (entry / "response_body").read_bytes(),
+            {
+                "url": meta["response_url"],
+                "callback": callback,
+                "status": int(meta["status"]),
+                "headers": {
+                    k.decode("latin-1"): [v.decode("latin-1") for v in vs]
+                    for k, vs in headers.items()
+                },
+            },
+        )
+        written += 1
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Benchmark spider callbacks over stored fixtures")
+    run.add_argument("spiders", nargs="*", help="Spider names (default: all spiders with fixtures)")
+    run.add_argument("--callback", help="Only benchmark this callback")
+    run.add_argument("--iterations", type=int, default=200)
+    run.add_argument("--json", dest="json_output", help="Also write the results as JSON to this path")
+
+    record = subparsers.add_parser("record", help="Create fixtures by downloading pages")
+    record.add_argument("spider")
+    record.add_argument("callback")
+    record.add_argument("urls", nargs="+", metavar="URL")
+
+    capture = subparsers.add_parser("capture", help="Create fixtures from the Scrapy HTTP cache")
+    capture.add_argument("spider")
+    capture.add_argument("callback")
+    capture.add_argument("--url-pattern")
+    capture.add_argument("--limit", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "oic_scrape.settings")
+
+    if args.command == "record":
+        written = record_fixtures(args.spider, args.callback, args.urls)
+        print(f"Wrote {written} fixtures to {FIXTURES_DIR / args.spider}")
+        return 0
+
+    if args.command == "capture":
+        written = capture_fixtures(args.spider, args.callback, args.url_pattern, args.limit)
+        print(f"Wrote {written} fixtures to {FIXTURES_DIR / args.spider}")
+        return 0
+
+    results = run_benchmarks(args.spiders, args.iterations, args.callback)
+    if not results:
+        print(f"No fixtures found in {FIXTURES_DIR}, create some with the record or capture command", file=sys.stderr)
+        return 1
+    print_report(results)
+    if args.json_output:
+        Path(args.json_output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Harvesters for bulk sources: APIs and data files too large to be crawled page by page.
+
+Unlike the spiders, these don't go through Scrapy. Each harvester streams its source into
+batches of `AwardItem`, which are written as JSON Lines as they arrive, so a full backfill
+never holds the whole dataset in memory.
+
+Each source is a `BulkSource` (see `oic_scrape.bulk.base`), registered in `SOURCES` and run
+from the command line:
+
+    $ poetry run python -m oic_scrape.bulk --list
+    $ poetry run python -m oic_scrape.bulk neh.gov_grants --decades "2010, 2020"
+"""
+
+import importlib
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Union
+
+import attrs
+import polars as pl
+
+from oic_scrape.bulk.mapping import validate_frame
+from oic_scrape.items import AwardItem
+
+# The bulk sources by name, as "module:class" so that only the source being run is imported
+SOURCES = {
+    "arcadiafund.org.uk_grants": "oic_scrape.bulk.arcadia:ArcadiaSource",
+    "gatesfoundation.org_grants": "oic_scrape.bulk.gates:GatesSource",
+    "neh.gov_grants": "oic_scrape.bulk.neh:NehSource",
+    "nih.gov_grants": "oic_scrape.bulk.nih:NihHarvester",
+    "rwjf.org_grants": "oic_scrape.bulk.rwjf:RwjfSource",
+    "wellcome.org_grants": "oic_scrape.bulk.wellcome:WellcomeSource",
+}
+
+
+def load_source(name: str) -> type:
+    """Returns the `BulkSource` class registered under `name`.
+
+    Raises:
+        KeyError: If no source is registered under `name`.
+    """
+    if name not in SOURCES:
+        raise KeyError(f"Unknown bulk source: {name}")
+    module_name, _, class_name = SOURCES[name].partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def award_to_dict(award: AwardItem) -> Dict[str, Any]:
+    """Returns an award as a dict, with the same fields as the spiders' feed exports."""
+    return attrs.asdict(award)
+
+
+def frame_to_jsonl(df: pl.DataFrame) -> str:
+    """Returns a DataFrame of awards as JSON Lines, formatted like the serialized `AwardItem`."""
+    return df.with_columns(
+        pl.col(pl.Datetime).dt.strftime("%Y-%m-%dT%H:%M:%S%.6f"),
+    ).write_ndjson()
+
+
+def write_jsonl(batches: Iterable[Union[List[AwardItem], pl.DataFrame]], output: str) -> int:
+    """Writes batches of awards to a JSON Lines file (overwritten) as they are produced.
+
+    Args:
+        batches (Iterable[Union[List[AwardItem], pl.DataFrame]]): The batches of awards, either
+            as `AwardItem` or as DataFrames with the columns of `oic_scrape.bulk.mapping.AWARD_SCHEMA`.
+        output (str): The path of the output file.
+
+    Returns:
+        int: The number of awards written.
+
+    Raises:
+        TypeError: If a DataFrame batch doesn't validate (see `oic_scrape.bulk.mapping.validate_frame`).
+    """
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8") as f:
+        for batch in batches:
+            if isinstance(batch, pl.DataFrame):
+                validate_frame(batch)
+                f.write(frame_to_jsonl(batch))
+                count += batch.height
+                continue
+            for award in batch:
+                f.write(json.dumps(award_to_dict(award), default=_json_default, ensure_ascii=False))
+                f.write("\n")
+            count += len(batch)
+    return count
@@ -0,0 +1,5 @@
+import sys
+
+from oic_scrape.bulk.cli import main
+
+sys.exit(main())
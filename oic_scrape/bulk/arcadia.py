@@ -0,0 +1,98 @@
+"""
+Arcadia Fund grants, from the latest 360Giving CSV linked from their grant directory.
+"""
+
+import argparse
+from datetime import datetime
+from typing import Any, Iterator, List, Optional
+from urllib.parse import urljoin
+
+import polars as pl
+from parsel import Selector
+
+from oic_scrape.bulk.base import BulkSource
+from oic_scrape.bulk.mapping import AwardMapping, join_text, text, to_amount
+from oic_scrape.bulk.readers import iter_csv_batches
+
+FUNDER_ORG_NAME = "Arcadia Fund"
+FUNDER_ORG_ROR_ID = "https://ror.org/051z6e826"
+
+GRANT_DIRECTORY_URL = "https://www.arcadiafund.org.uk/grant-directory"
+
+_amount = to_amount("Amount Awarded")
+_priority = text("Priority")
+
+
+def arcadia_mapping(url: str) -> AwardMapping:
+    """Arcadia's export has its own column names, with amounts in USD."""
+    return AwardMapping(
+        {
+            "source": "arcadia.org.uk__360giving-export",
+            "grant_id": pl.format("360g::{}", text("Identifier")),
+            "funder_org_name": FUNDER_ORG_NAME,
+            "funder_org_ror_id": FUNDER_ORG_ROR_ID,
+            "recipient_org_name": text("Grant recipient"),
+            "grant_year": text("Award year").cast(pl.Int64, strict=False),
+            "grant_duration": pl.format("{} Years", text("Duration")),
+            "award_amount": _amount,
+            "award_currency": pl.when(_amount.is_not_null()).then(pl.lit("USD")),
+            "award_amount_usd": _amount,
+            "source_url": url,
+            "grant_title": text("Title"),
+            "grant_description": text("Description"),
+            # The priority is left out when it's the same as the funding area
+            "program_of_funder": join_text(
+                "Funding area",
+                pl.when(_priority != text("Funding area").fill_null("")).then(_priority),
+                separator=" > ",
+            ),
+        }
+    )
+
+
+class ArcadiaSource(BulkSource):
+    """Arcadia Fund grants, from its 360Giving export.
+
+    Args:
+        url (str, optional): The URL of the 360Giving CSV. Defaults to the latest one linked from the grant directory.
+    """
+
+    name = "arcadiafund.org.uk_grants"
+    default_output = "data/arcadia-fund--giving360_grants.jsonl"
+
+    def __init__(self, url: Optional[str] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.url = url
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--url", help="URL of the 360Giving CSV (default: the latest linked from the grant directory)")
+
+    def find_latest_results(self) -> str:
+        """Finds the latest results link from the Arcadia Fund
+
+        Returns:
+            str: The URL of the latest results file
+
+        Raises:
+            ValueError: If the grant directory page doesn't link to a CSV file.
+        """
+        response = self.session.get(GRANT_DIRECTORY_URL)
+        response.raise_for_status()
+        for href in Selector(text=response.text).css("a::attr(href)").getall():
+            # Strip URL parameters to check true file extension
+            if href.split("?")[0].endswith(".csv"):
+                return urljoin(response.url, href)
+        raise ValueError("No CSV link found in the Arcadia Fund's grant directory page.")
+
+    def input_urls(self) -> List[str]:
+        self.url = self.url or self.find_latest_results()
+        return [self.url]
+
+    def batches(self) -> Iterator[pl.DataFrame]:
+        self.url = self.url or self.find_latest_results()
+        mapping = arcadia_mapping(self.url)
+        with self.open_download(self.url, suffix=".csv") as path:
+            crawled_at = datetime.now()
+            for df in iter_csv_batches(path, self.batch_size):
+                yield from self.map_frame(df, mapping, crawled_at)
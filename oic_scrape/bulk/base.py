@@ -0,0 +1,206 @@
+"""
+The common interface of the bulk sources, and helpers shared by their implementations.
+"""
+
+import argparse
+import logging
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar, Union
+
+import polars as pl
+
+from oic_scrape.bulk import write_jsonl
+from oic_scrape.bulk.downloads import DEFAULT_CACHE_DIR, Downloader
+from oic_scrape.bulk.mapping import AwardMapping
+from oic_scrape.bulk.readers import download_to_tempfile
+from oic_scrape.httpclient import HttpClient, build_client
+from oic_scrape.items import AwardItem
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Splits an iterable into lists of `size` items (the last one may be shorter)."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class BulkSource(ABC):
+    """Base class of the bulk sources: a funder's dataset, converted to batches of AwardItem.
+
+    Subclasses set `name` and `default_output`, implement `batches()` (e.g. to yield DataFrames
+    of awards from an `AwardMapping`), and declare their parameters in `add_arguments()`, which
+    are passed to `__init__` as keyword arguments by the command line
+    (`python -m oic_scrape.bulk <name> ...`). Sources converting records one at a time subclass
+    `RecordSource` and implement `awards()` instead.
+
+    Args:
+        batch_size (int, optional): The number of awards per batch. Defaults to 1000.
+        use_cache (bool, optional): Cache HTTP responses (development use only). Defaults to False.
+        cache_dir (str, optional): Where downloaded bulk files are kept, and reused while unchanged
+            upstream (see `oic_scrape.bulk.downloads`). Defaults to `.cache/bulk`. When None,
+            files are downloaded to temporary files on every run.
+    """
+
+    name: str = ""
+    default_output: str = ""
+    # Passed on to `session.get` when downloading bulk files (e.g. `{"verify": False}`)
+    download_kwargs: Dict[str, Any] = {}
+    # The maximum requests per second to the source's hosts (see `oic_scrape.httpclient`)
+    rate_limits: Dict[str, float] = {}
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        use_cache: bool = False,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        **kwargs: Any,
+    ):
+        if kwargs:
+            raise TypeError(f"Unexpected parameters for {self.name}: {', '.join(kwargs)}")
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.errors = 0
+        self.cache_dir = cache_dir
+        self._session: Optional[HttpClient] = None
+        self._downloader: Optional[Downloader] = None
+
+    @property
+    def session(self) -> HttpClient:
+        if self._session is None:
+            self._session = build_client(rate_limits=self.rate_limits, use_cache=self.use_cache)
+        return self._session
+
+    @property
+    def downloader(self) -> Optional[Downloader]:
+        """The downloader of bulk files to `cache_dir`, or None without a cache."""
+        if self._downloader is None and self.cache_dir:
+            self._downloader = Downloader(self.session, self.cache_dir)
+        return self._downloader
+
+    @contextmanager
+    def open_download(self, url: str, suffix: str = "", **kwargs: Any) -> Iterator[Path]:
+        """Downloads a bulk file and yields its path (see `prefetch`).
+
+        The file is kept in `cache_dir` and reused while unchanged upstream, or downloaded to a
+        temporary file deleted afterwards when there is no cache.
+
+        Args:
+            url (str): The URL of the file.
+            suffix (str, optional): The suffix of the temporary file name (e.g. ".csv").
+            **kwargs: Passed on to `session.get` (e.g. `verify=False`).
+        """
+        kwargs = {**self.download_kwargs, **kwargs}
+        if self.downloader:
+            yield self.downloader.fetch(url, **kwargs)
+        else:
+            with download_to_tempfile(self.session, url, suffix=suffix, **kwargs) as path:
+                yield path
+
+    def prefetch(self, urls: List[str], **kwargs: Any) -> None:
+        """Downloads several bulk files concurrently to the cache, before they are opened.
+
+        Without a cache, files are downloaded when opened.
+        """
+        if self.downloader:
+            self.downloader.fetch_all(urls, **{**self.download_kwargs, **kwargs})
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Adds the source's parameters to its command line parser."""
+
+    def input_urls(self) -> List[str]:
+        """The URLs of the bulk files the awards are built from (none for APIs).
+
+        The runner (`oic_scrape.bulk.runner`) skips a source whose files and parameters haven't
+        changed since its last successful run.
+        """
+        return []
+
+    @abstractmethod
+    def batches(self) -> Iterator[Union[List[AwardItem], pl.DataFrame]]:
+        """Yields the awards of the source, `batch_size` at a time."""
+
+    def map_frame(self, df: pl.DataFrame, mapping: AwardMapping, crawled_at: datetime) -> Iterator[pl.DataFrame]:
+        """Maps source rows to awards, counting and logging the rows dropped by the mapping.
+
+        Args:
+            df (pl.DataFrame): The source rows.
+            mapping (AwardMapping): The mapping of the source.
+            crawled_at (datetime): When the source was downloaded.
+
+        Yields:
+            pl.DataFrame: The awards, `batch_size` at a time.
+        """
+        awards = mapping.apply(df, crawled_at)
+        dropped = df.height - awards.height
+        if dropped:
+            self.errors += dropped
+            logger.warning("%s: skipping %d records missing required fields", self.name, dropped)
+        yield from awards.iter_slices(self.batch_size)
+
+    def convert(
+        self,
+        records: Iterable[Dict[str, Any]],
+        to_award: Callable[[Dict[str, Any]], AwardItem],
+        record_id: Callable[[Dict[str, Any]], Any] = lambda record: None,
+    ) -> Iterator[AwardItem]:
+        """Converts source records to awards, logging and skipping the records that fail.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): The source records.
+            to_award (Callable): Converts a record to an AwardItem.
+            record_id (Callable, optional): Returns an identifier of a record, for the logs.
+
+        Yields:
+            AwardItem: The award of each record that could be converted.
+        """
+        for record in records:
+            try:
+                yield to_award(record)
+            except Exception as e:
+                self.errors += 1
+                logger.warning("%s: skipping record %s: %r", self.name, record_id(record), e)
+
+
+class RecordSource(BulkSource):
+    """Base class of the bulk sources converting their records to AwardItem one at a time."""
+
+    @abstractmethod
+    def awards(self) -> Iterator[AwardItem]:
+        """Yields the awards of the source, one at a time."""
+
+    def batches(self) -> Iterator[List[AwardItem]]:
+        """Yields the awards of the source, `batch_size` at a time."""
+        return batched(self.awards(), self.batch_size)
+
+
+def run_source(source: BulkSource, output: str) -> Dict[str, Any]:
+    """Writes all the awards of a source to a JSON Lines file.
+
+    Args:
+        source (BulkSource): The source.
+        output (str): The output path (overwritten).
+
+    Returns:
+        Dict[str, Any]: The number of awards written, records skipped, HTTP requests made and the
+            elapsed time.
+    """
+    start = time.monotonic()
+    count = write_jsonl(source.batches(), output)
+    elapsed = time.monotonic() - start
+    logger.info("%s: wrote %d awards to %s in %.1fs (%d skipped)", source.name, count, output, elapsed, source.errors)
+    requests = 0
+    if isinstance(source._session, HttpClient):
+        requests = source._session.metrics.count
+        for host, metrics in source._session.metrics.summary().items():
+            logger.info("%s: requests to %s: %s", source.name, host, metrics)
+    return {"items": count, "errors": source.errors, "requests": requests, "elapsed_seconds": elapsed}
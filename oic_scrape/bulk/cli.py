@@ -0,0 +1,89 @@
+"""
+The command line of the bulk sources: runs a bulk source and writes its awards as JSON Lines.
+
+Usage:
+
+    $ poetry run python -m oic_scrape.bulk --list
+    $ poetry run python -m oic_scrape.bulk gatesfoundation.org_grants
+    $ poetry run python -m oic_scrape.bulk rwjf.org_grants --start-year 2020 --output data/rwjf.org-2020.jsonl
+"""
+
+import argparse
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from oic_scrape.bulk import SOURCES, load_source
+from oic_scrape.bulk.base import run_source
+from oic_scrape.bulk.downloads import DEFAULT_CACHE_DIR
+
+
+def build_parser(source: Optional[str] = None) -> argparse.ArgumentParser:
+    """Returns the command line parser, with the options of `source` only.
+
+    Every source has a subcommand, but only the selected one is imported (to declare its
+    options), so that running a source doesn't import the others and their dependencies.
+
+    Args:
+        source (str, optional): The source whose options are added, if any.
+    """
+    parser = argparse.ArgumentParser(prog="python -m oic_scrape.bulk", description="Run a bulk source.")
+    parser.add_argument("--list", action="store_true", help="List the bulk sources and exit")
+    subparsers = parser.add_subparsers(dest="source", metavar="SOURCE")
+    for name in sorted(SOURCES):
+        if name != source:
+            subparsers.add_parser(name, add_help=False)
+            continue
+        source_cls = load_source(name)
+        subparser = subparsers.add_parser(name, help=(source_cls.__doc__ or "").splitlines()[0])
+        subparser.add_argument(
+            "--output", default=source_cls.default_output, help="Output JSON Lines file (default: %(default)s)"
+        )
+        subparser.add_argument("--batch-size", type=int, help="Awards per batch (default: the source's)")
+        subparser.add_argument(
+            "--use-cache", action="store_true", help="Cache HTTP responses (development use only)"
+        )
+        subparser.add_argument(
+            "--cache-dir", default=DEFAULT_CACHE_DIR, help="Where bulk files are kept between runs (default: %(default)s)"
+        )
+        subparser.add_argument(
+            "--no-file-cache", dest="cache_dir", action="store_const", const=None,
+            help="Download bulk files to temporary files on every run",
+        )
+        source_cls.add_arguments(subparser)
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.ArgumentParser, argparse.Namespace]:
+    """Parses the command line, loading only the selected source to parse its options.
+
+    Returns:
+        Tuple[argparse.ArgumentParser, argparse.Namespace]: The parser and the parsed arguments.
+    """
+    # The source is found first, with the subcommands' options left unparsed
+    args, _ = build_parser().parse_known_args(argv)
+    parser = build_parser(args.source)
+    return parser, parser.parse_args(argv)
+
+
+def source_params(args: argparse.Namespace) -> Tuple[Dict[str, Any], str]:
+    """Returns the parameters of the selected source (passed to its `__init__`) and its output path."""
+    params = {k: v for k, v in vars(args).items() if k not in ("list", "source", "output")}
+    if params["batch_size"] is None:
+        del params["batch_size"]
+    return params, args.output
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser, args = parse_args(argv)
+    if args.list:
+        for name in sorted(SOURCES):
+            print(name)
+        return 0
+    if not args.source:
+        parser.error("No source selected")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    params, output = source_params(args)
+    source = load_source(args.source)(**params)
+    run_source(source, output)
+    return 0
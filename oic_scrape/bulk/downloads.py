@@ -0,0 +1,217 @@
+"""
+A local cache of bulk files (CSV, Excel exports), refreshed only when they change upstream.
+
+Bulk exports are often tens or hundreds of MB and rarely change between runs. `Downloader`
+keeps each file in a cache directory (`.cache/bulk` by default) with its `ETag`,
+`Last-Modified` and SHA-256 digest:
+
+- A cached file is revalidated with a conditional request (`If-None-Match` /
+  `If-Modified-Since`), and reused when the server answers 304 Not Modified and its digest
+  still matches.
+- An interrupted download is resumed from where it stopped with a `Range` request, guarded by
+  `If-Range` so that a file changed in the meantime is downloaded again from the start.
+- A download is checked against an expected SHA-256 digest when one is given, and only
+  replaces the cached file once complete.
+
+Several files are downloaded concurrently with `fetch_all`.
+
+Example:
+
+    >>> downloader = Downloader(session)
+    >>> paths = downloader.fetch_all([url_2000s, url_2010s], verify=False)
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from attrs import asdict, define
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache/bulk"
+CHUNK_SIZE = 1024 * 1024  # Bytes read from the response at a time
+
+
+class ChecksumError(ValueError):
+    """A downloaded file doesn't match its expected SHA-256 digest."""
+
+
+@define
+class CacheEntry:
+    """What is known of a cached file, stored next to it as JSON."""
+
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    complete: bool = False
+
+
+def file_sha256(path: Path) -> str:
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Downloader:
+    """Downloads bulk files to a local cache, reusing and resuming them when possible.
+
+    Args:
+        session (requests.Session): The session to download with.
+        cache_dir (Union[str, Path], optional): The cache directory. Defaults to `.cache/bulk`.
+        max_workers (int, optional): The number of concurrent downloads in `fetch_all`. Defaults to 4.
+    """
+
+    def __init__(self, session: requests.Session, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR, max_workers: int = 4):
+        self.session = session
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self.stats: Counter = Counter()
+        # Files already fetched by this downloader, which aren't revalidated again
+        self.fetched: Dict[str, Path] = {}
+
+    def path_for(self, url: str) -> Path:
+        """The path of a URL's file in the cache (keeping the file extension, for readers)."""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        suffix = Path(url.split("?")[0]).suffix
+        return self.cache_dir / f"{key}{suffix}"
+
+    def _entry_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".json")
+
+    def _load_entry(self, url: str, path: Path) -> CacheEntry:
+        try:
+            entry = CacheEntry(**json.loads(self._entry_path(path).read_text()))
+        except (OSError, ValueError, TypeError):
+            return CacheEntry(url=url)
+        return entry if entry.url == url else CacheEntry(url=url)
+
+    def _save_entry(self, path: Path, entry: CacheEntry) -> None:
+        tmp = self._entry_path(path).with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(entry)))
+        os.replace(tmp, self._entry_path(path))
+
+    def entry(self, url: str) -> CacheEntry:
+        """Returns what is known of a URL's cached file (e.g. its SHA-256 digest once fetched)."""
+        return self._load_entry(url, self.path_for(url))
+
+    def fetch(self, url: str, sha256: Optional[str] = None, **kwargs: Any) -> Path:
+        """Returns the path of an up-to-date copy of a file in the cache.
+
+        Args:
+            url (str): The URL of the file.
+            sha256 (str, optional): The expected SHA-256 hex digest of the file.
+            **kwargs: Passed on to `session.get` (e.g. `verify=False`).
+
+        Returns:
+            Path: The cached file.
+
+        Raises:
+            requests.HTTPError: If the download fails.
+            ChecksumError: If the downloaded file doesn't match `sha256`.
+        """
+        if url in self.fetched:
+            return self.fetched[url]
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(url)
+        part = path.with_name(path.name + ".part")
+        entry = self._load_entry(url, path)
+
+        # Byte ranges (and validators) refer to the encoded representation, so files are
+        # requested unencoded: the bytes written to the `.part` file are then those of the file
+        headers = {"Accept-Encoding": "identity"}
+        validator = entry.etag or entry.last_modified
+        if entry.complete and path.exists():
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        elif part.exists() and validator:
+            # Resume only if the file hasn't changed since the partial download (If-Range)
+            headers["Range"] = f"bytes={part.stat().st_size}-"
+            headers["If-Range"] = validator
+
+        with self.session.get(url, headers=headers, stream=True, **kwargs) as response:
+            if response.status_code == 304:
+                expected = (sha256 or entry.sha256 or "").lower()
+                if path.stat().st_size == entry.size and file_sha256(path) == expected:
+                    self.stats["downloads/reused"] += 1
+                    logger.info("Reusing unchanged %s", url)
+                    self.fetched[url] = path
+                    return path
+                # The cached copy is corrupt, download it again
+                logger.warning("Cached copy of %s doesn't match its checksum, downloading it again", url)
+                self._save_entry(path, CacheEntry(url=url))
+                return self.fetch(url, sha256=sha256, **kwargs)
+            if response.status_code == 416:
+                # The partial download can't be resumed (e.g. it's larger than the file now is)
+                part.unlink()
+                return self.fetch(url, sha256=sha256, **kwargs)
+            response.raise_for_status()
+
+            if response.status_code == 206 and response.headers.get("Content-Encoding", "identity") != "identity":
+                # The range is of the encoded file, which can't be appended to the decoded part
+                logger.warning("%s can't be resumed as it is served encoded, downloading it again", url)
+                part.unlink()
+                return self.fetch(url, sha256=sha256, **kwargs)
+
+            digest = hashlib.sha256()
+            if response.status_code == 206:
+                self.stats["downloads/resumed"] += 1
+                logger.info("Resuming %s from byte %d", url, part.stat().st_size)
+                with part.open("rb") as f:
+                    while chunk := f.read(CHUNK_SIZE):
+                        digest.update(chunk)
+                mode = "ab"
+            else:
+                mode = "wb"
+
+            entry = CacheEntry(
+                url=url,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            # Saved before the download, so that an interrupted one can be resumed
+            self._save_entry(path, entry)
+            with part.open(mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+        if sha256 and digest.hexdigest() != sha256.lower():
+            part.unlink()
+            raise ChecksumError(f"{url} has SHA-256 {digest.hexdigest()}, expected {sha256}")
+        os.replace(part, path)
+        entry.sha256 = digest.hexdigest()
+        entry.size = path.stat().st_size
+        entry.complete = True
+        self._save_entry(path, entry)
+        self.stats["downloads/downloaded"] += 1
+        logger.info("Downloaded %s (%d bytes)", url, entry.size)
+        self.fetched[url] = path
+        return path
+
+    def fetch_all(self, urls: List[str], **kwargs: Any) -> Dict[str, Path]:
+        """Fetches several files concurrently (see `fetch`).
+
+        Returns:
+            Dict[str, Path]: The cached file of each URL.
+
+        Raises:
+            requests.HTTPError: If a download fails (after the others have finished).
+        """
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {url: pool.submit(self.fetch, url, **kwargs) for url in urls}
+        return {url: future.result() for url, future in futures.items()}
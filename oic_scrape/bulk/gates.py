@@ -0,0 +1,62 @@
+"""
+Bill & Melinda Gates Foundation committed grants, from their static grants CSV export.
+"""
+
+from datetime import datetime
+from typing import Iterator, List
+
+import polars as pl
+
+from oic_scrape.bulk.base import BulkSource
+from oic_scrape.bulk.mapping import AwardMapping, join_text, text, to_amount
+from oic_scrape.bulk.readers import iter_csv_batches
+from oic_scrape.dates import format_months_expr
+
+FUNDER_ORG_NAME = "Bill & Melinda Gates Foundation"
+FUNDER_ORG_ROR_ID = "https://ror.org/0456r8d26"
+
+GRANTS_CSV_URL = "https://www.gatesfoundation.org/-/media/files/bmgf-grants.csv"
+
+_committed = text("DATE COMMITTED").str.split_exact("-", 1)
+_amount = to_amount("AMOUNT COMMITTED")
+
+GATES_MAPPING = AwardMapping(
+    {
+        "source": "gatesfoundation.org",
+        "grant_id": pl.format("gatesfoundation.org::{}", text("GRANT ID")),
+        "funder_org_name": FUNDER_ORG_NAME,
+        "funder_org_ror_id": FUNDER_ORG_ROR_ID,
+        "recipient_org_name": text("GRANTEE"),
+        "recipient_org_location": join_text("GRANTEE CITY", "GRANTEE STATE", "GRANTEE COUNTRY"),
+        "grant_year": _committed.struct.field("field_0").cast(pl.Int64, strict=False),
+        "grant_duration": format_months_expr(text("DURATION (MONTHS)").cast(pl.Float64, strict=False)),
+        "award_amount": _amount,
+        "award_currency": "USD",
+        "award_amount_usd": _amount,
+        "grant_description": text("PURPOSE"),
+        "program_of_funder": join_text("DIVISION", "TOPIC", separator=" > "),
+        "source_url": pl.format(
+            "https://www.gatesfoundation.org/about/committed-grants/{}/{}/{}",
+            _committed.struct.field("field_0"),
+            _committed.struct.field("field_1"),
+            text("GRANT ID"),
+        ),
+    }
+)
+
+
+class GatesSource(BulkSource):
+    """The Gates Foundation's committed grants."""
+
+    name = "gatesfoundation.org_grants"
+    default_output = "data/gatesfoundation.org.jsonl"
+
+    def input_urls(self) -> List[str]:
+        return [GRANTS_CSV_URL]
+
+    def batches(self) -> Iterator[pl.DataFrame]:
+        with self.open_download(GRANTS_CSV_URL, suffix=".csv") as path:
+            crawled_at = datetime.utcnow()
+            # The first line is a title, the header is on the second one
+            for df in iter_csv_batches(path, self.batch_size, skip_rows=1):
+                yield from self.map_frame(df.filter(pl.col("GRANT ID").is_not_null()), GATES_MAPPING, crawled_at)
@@ -0,0 +1,273 @@
+"""
+Declarative mappings from tabular grant exports to the award schema, run as Polars expressions.
+
+Building an `AwardItem` per row is the slowest part of converting large exports, and most of
+their fields are plain column copies, concatenations and lookups. An `AwardMapping` declares,
+for each award field, the Polars expression computing it from the source columns. Applying it
+to a DataFrame returns a columnar batch of awards (one column per `AwardItem` field, with the
+types of `AWARD_SCHEMA`), which `write_jsonl` checks with `validate_frame` and writes as is.
+
+Example:
+
+    >>> mapping = threesixty_giving_mapping(source="example.org_360giving-export", funder_org_name="Example Fund")
+    >>> awards = mapping.apply(df, crawled_at=datetime.utcnow())
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import attrs
+import polars as pl
+from attrs import define
+
+from oic_scrape.dates import format_days_expr
+from oic_scrape.items import AwardItem
+
+PARTICIPANT_DTYPE = pl.Struct(
+    {
+        "full_name": pl.String,
+        "is_pi": pl.Boolean,
+        "affiliations": pl.List(pl.String),
+        "grant_role": pl.String,
+        "first_name": pl.String,
+        "middle_name": pl.String,
+        "last_name": pl.String,
+        "suffix": pl.String,
+        # Identifiers are free-form dicts, which mapped sources don't provide
+        "identifiers": pl.Null,
+    }
+)
+
+# The columns of an award batch, in the order of the AwardItem fields
+AWARD_SCHEMA: Dict[str, pl.DataType] = {
+    "_crawled_at": pl.Datetime("us"),
+    "source": pl.String,
+    "grant_id": pl.String,
+    "funder_org_name": pl.String,
+    "recipient_org_name": pl.String,
+    "funder_org_ror_id": pl.String,
+    "recipient_org_ror_id": pl.String,
+    "recipient_org_location": pl.String,
+    "pi_name": pl.String,
+    "named_participants": pl.List(PARTICIPANT_DTYPE),
+    "grant_year": pl.Int64,
+    "grant_duration": pl.String,
+    "grant_start_date": pl.Date,
+    "grant_end_date": pl.Date,
+    "award_amount": pl.Float64,
+    "award_currency": pl.String,
+    "award_amount_usd": pl.Float64,
+    "source_url": pl.String,
+    "grant_title": pl.String,
+    "grant_description": pl.String,
+    "program_of_funder": pl.String,
+    "comments": pl.String,
+    "raw_source_data": pl.String,
+    "_award_schema_version": pl.String,
+}
+# Keeps the columnar batches in step with the AwardItem definition
+assert list(AWARD_SCHEMA) == [field.name for field in attrs.fields(AwardItem)]
+
+REQUIRED_FIELDS = ("_crawled_at", "source", "grant_id", "funder_org_name", "recipient_org_name")
+
+Column = Union[str, pl.Expr]
+
+
+def _col(column: Column) -> pl.Expr:
+    return pl.col(column) if isinstance(column, str) else column
+
+
+def text(column: Column) -> pl.Expr:
+    """A column as stripped text, with empty values as null."""
+    value = _col(column).cast(pl.String).str.strip_chars()
+    return pl.when(value.str.len_chars() > 0).then(value)
+
+
+def join_text(*columns: Column, separator: str = ", ") -> pl.Expr:
+    """The non-empty values of several columns joined with `separator` (null if all are empty)."""
+    joined = pl.concat_str([text(column) for column in columns], separator=separator, ignore_nulls=True)
+    return pl.when(joined.str.len_chars() > 0).then(joined)
+
+
+def to_amount(column: Column) -> pl.Expr:
+    """A column of amounts as floats, ignoring thousands separators (null if not a number)."""
+    return text(column).str.replace_all(",", "").cast(pl.Float64, strict=False)
+
+
+def to_date(column: Column) -> pl.Expr:
+    """A column of dates, datetimes or ISO 8601 strings as dates (null if not a date)."""
+    return _col(column).cast(pl.String).str.slice(0, 10).str.to_date("%Y-%m-%d", strict=False)
+
+
+def lookup(column: Column, values: Dict[str, str]) -> pl.Expr:
+    """The value of `values` for each value of a column (null if missing), e.g. ROR ids by organization name."""
+    return text(column).replace_strict(values, default=None, return_dtype=pl.String)
+
+
+def split_text(column: Column, separator: str = ",") -> pl.Expr:
+    """A column of `separator`-separated values as lists of stripped, non-empty strings."""
+    return (
+        text(column)
+        .str.split(separator)
+        .list.eval(pl.element().str.strip_chars().filter(pl.element().str.len_chars() > 0))
+    )
+
+
+def participant(full_name: Column, is_pi: bool = False, **fields: Any) -> pl.Expr:
+    """A participant struct, from a name column and constant or column values for the other fields.
+
+    Args:
+        full_name (Column): The name column (or `pl.element()` within a list).
+        is_pi (bool, optional): Whether the participant is a PI. Defaults to False.
+        **fields: Other `AwardParticipant` fields, as constants or expressions.
+    """
+    values = {"full_name": _col(full_name), "is_pi": is_pi, **fields}
+    return pl.struct(
+        [
+            (values[field.name] if isinstance(values.get(field.name), pl.Expr) else pl.lit(values.get(field.name)))
+            .cast(field.dtype)
+            .alias(field.name)
+            for field in PARTICIPANT_DTYPE.fields
+        ]
+    )
+
+
+def participants(*lists: pl.Expr) -> pl.Expr:
+    """Concatenates lists of participant structs, with null for rows without any participant."""
+    empty = pl.lit([], dtype=pl.List(PARTICIPANT_DTYPE))
+    combined = pl.concat_list([participant_list.fill_null(empty) for participant_list in lists])
+    return pl.when(combined.list.len() > 0).then(combined)
+
+
+def single_participant(full_name: Column, is_pi: bool = False, **fields: Any) -> pl.Expr:
+    """A list with one participant when `full_name` is not empty, for use with `participants`."""
+    return pl.when(text(full_name).is_not_null()).then(
+        pl.concat_list([participant(text(full_name), is_pi=is_pi, **fields)])
+    )
+
+
+@define
+class AwardMapping:
+    """A declarative mapping of source columns to `AwardItem` fields.
+
+    Args:
+        fields (Dict[str, Any]): The value of each award field, as a Polars expression over the
+            source columns or a constant. Unmapped fields are null, except `raw_source_data`, which
+            defaults to all the columns of the source row as JSON, and `_crawled_at`, which is set
+            when applying the mapping.
+
+    Raises:
+        ValueError: If a mapped field isn't an award field.
+    """
+
+    fields: Dict[str, Any]
+
+    def __attrs_post_init__(self):
+        unknown = set(self.fields) - set(AWARD_SCHEMA)
+        if unknown:
+            raise ValueError(f"Not award fields: {', '.join(sorted(unknown))}")
+
+    def expressions(self, crawled_at: datetime) -> List[pl.Expr]:
+        """The expressions computing the award columns, in the order of `AWARD_SCHEMA`."""
+        values = {
+            "raw_source_data": pl.struct(pl.all()).struct.json_encode(),
+            "_award_schema_version": attrs.fields(AwardItem)._award_schema_version.default,
+            **self.fields,
+            "_crawled_at": crawled_at,
+        }
+        return [
+            (values[name] if isinstance(values.get(name), pl.Expr) else pl.lit(values.get(name)))
+            .cast(dtype)
+            .alias(name)
+            for name, dtype in AWARD_SCHEMA.items()
+        ]
+
+    def apply(self, df: pl.DataFrame, crawled_at: datetime) -> pl.DataFrame:
+        """Maps a DataFrame of source rows to a DataFrame of awards.
+
+        Rows missing a required award field (see `REQUIRED_FIELDS`) are dropped.
+
+        Args:
+            df (pl.DataFrame): The source rows.
+            crawled_at (datetime): When the source was downloaded.
+
+        Returns:
+            pl.DataFrame: The awards, with the columns of `AWARD_SCHEMA`.
+        """
+        return df.select(self.expressions(crawled_at)).filter(
+            pl.all_horizontal([pl.col(name).is_not_null() for name in REQUIRED_FIELDS])
+        )
+
+
+def threesixty_giving_mapping(
+    source: str,
+    funder_org_name: Optional[str] = None,
+    funder_ror_ids: Optional[Dict[str, str]] = None,
+    **overrides: Any,
+) -> AwardMapping:
+    """The mapping of a 360Giving export using the standard column names.
+
+    Args:
+        source (str): The `source` of the awards.
+        funder_org_name (str, optional): The funder when the `Funding Org:Name` column is empty.
+        funder_ror_ids (Dict[str, str], optional): ROR ids by funding organization name.
+        **overrides: Award fields mapped differently from the standard.
+
+    Returns:
+        AwardMapping: The mapping.
+    """
+    start_date = to_date("Planned Dates:Start Date")
+    end_date = to_date("Planned Dates:End Date")
+    funder = text("Funding Org:Name").fill_null(funder_org_name) if funder_org_name else text("Funding Org:Name")
+    fields = {
+        "source": source,
+        "grant_id": pl.format("360g::{}", text("Identifier")),
+        "funder_org_name": funder,
+        "funder_org_ror_id": funder.replace_strict(funder_ror_ids or {}, default=None, return_dtype=pl.String),
+        "recipient_org_name": text("Recipient Org:Name"),
+        "recipient_org_location": text("Recipient Org:Country"),
+        "grant_year": to_date("Award Date").dt.year(),
+        "grant_start_date": start_date,
+        "grant_end_date": end_date,
+        "grant_duration": format_days_expr(start_date, end_date),
+        "award_amount": to_amount("Amount Awarded"),
+        "award_currency": text("Currency"),
+        "grant_title": text("Title"),
+        "grant_description": text("Description"),
+        "program_of_funder": text("Grant Programme:Title"),
+    }
+    return AwardMapping({**fields, **overrides})
+
+
+def validate_frame(df: pl.DataFrame) -> None:
+    """Checks that a batch of awards would validate as `AwardItem`, without building them.
+
+    The `AwardItem` validators only check types and required fields, which for a batch are its
+    column types (`AWARD_SCHEMA`), the required fields and the participants' `full_name` and `is_pi`.
+
+    Raises:
+        TypeError: If the batch doesn't have the columns and types of `AWARD_SCHEMA`, or an award
+            is missing a required field or has a participant without a name.
+    """
+    if df.columns != list(AWARD_SCHEMA):
+        raise TypeError(f"Award batch columns {df.columns} don't match AWARD_SCHEMA")
+    mismatched = [
+        f"{name} ({df.schema[name]}, expected {dtype})"
+        for name, dtype in AWARD_SCHEMA.items()
+        if df.schema[name] != dtype
+    ]
+    if mismatched:
+        raise TypeError(f"Award batch columns with the wrong type: {', '.join(mismatched)}")
+
+    invalid_participant = pl.element().is_null() | pl.element().struct.field("full_name").is_null()
+    invalid_participant = invalid_participant | pl.element().struct.field("is_pi").is_null()
+    invalid = df.with_row_index("row").filter(
+        pl.any_horizontal([pl.col(name).is_null() for name in REQUIRED_FIELDS])
+        | pl.col("named_participants").list.eval(invalid_participant).list.any().fill_null(False)
+    )
+    if invalid.height:
+        first = invalid.row(0, named=True)
+        raise TypeError(
+            f"{invalid.height} awards in the batch are missing a required field or a participant's "
+            f"name, the first is row {first['row']} (grant_id={first['grant_id']!r})"
+        )
@@ -0,0 +1,127 @@
+"""
+National Endowment for the Humanities grants, from the per-decade CSV files of NEH open data.
+
+The decade files are downloaded concurrently to the bulk file cache (and reused while unchanged),
+then mapped to awards one decade at a time, in batches of rows.
+"""
+
+import argparse
+from datetime import datetime
+from typing import Any, Iterator, List
+
+import polars as pl
+
+from oic_scrape.bulk.base import BulkSource
+from oic_scrape.bulk.mapping import AwardMapping, join_text, text, to_amount
+from oic_scrape.bulk.readers import iter_csv_batches
+from oic_scrape.dates import format_months_expr, month_diff_expr
+
+FUNDER_NAME = "National Endowment for the Humanities"
+FUNDER_ROR_ID = "https://ror.org/02vdm1p28"
+
+DECADE_CSV_URL = "https://securegrants.neh.gov/open/data/NEH_Grants{}s.csv"
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+
+def _date(column: str) -> pl.Expr:
+    return pl.col(column).str.strptime(pl.Datetime, DATE_FORMAT, strict=False).dt.date()
+
+
+def _joined(first: str, second: str) -> pl.Expr:
+    """Two columns joined with " > ", with empty strings for nulls (as in the original pipeline)."""
+    return pl.concat_str([pl.col(first).fill_null(""), pl.col(second).fill_null("")], separator=" > ")
+
+
+_start = _date("BeginGrant")
+_end = _date("EndGrant")
+_amount = to_amount("ApprovedOutright")
+
+NEH_MAPPING = AwardMapping(
+    {
+        "source": "https://apps.neh.gov/open/data/",
+        "grant_id": pl.format("neh::{}", text("AppNumber")),
+        "funder_org_name": FUNDER_NAME,
+        "funder_org_ror_id": FUNDER_ROR_ID,
+        "recipient_org_name": text("Institution"),
+        "recipient_org_location": join_text("InstCity", "InstState", "InstPostalCode", "InstCountry"),
+        "pi_name": text("Participants"),
+        "grant_year": _start.dt.year(),
+        "grant_duration": format_months_expr(month_diff_expr(_end, _start)),
+        "grant_start_date": _start,
+        "grant_end_date": _end,
+        "award_amount": _amount,
+        "award_currency": pl.when(_amount.is_not_null()).then(pl.lit("USD")),
+        "award_amount_usd": _amount,
+        "grant_description": _joined("ProjectTitle", "ProjectDesc"),
+        "program_of_funder": _joined("Program", "Division"),
+        "_award_schema_version": "0.1.1",
+    }
+)
+
+
+def validate_decades(decades: str) -> List[str]:
+    """
+    Validates a list of decades for NEH data file downloads.
+
+    Args:
+        decades (str): A string representing the decades to validate.
+                       It can be either a comma-separated list of decades or the string "all".
+
+    Returns:
+        list: A list of valid decades.
+
+    Raises:
+        ValueError: If the input decades are not valid.
+
+    Example:
+        >>> validate_decades("1960, 1970, 1980")
+        ['1960', '1970', '1980']
+    """
+    current_year = datetime.now().year
+    current_decade = current_year - (current_year % 10)
+    valid_decades = [str(year) for year in range(1960, current_decade + 1, 10)]
+
+    if decades.lower() == "all":
+        return valid_decades
+
+    sanitized_decades = []
+    for decade in decades.split(","):
+        decade = decade.strip()
+        if decade not in valid_decades:
+            raise ValueError(
+                f"Decade should be between 1960 and {current_decade} (the start of the decade for {current_year})."
+            )
+        sanitized_decades.append(decade)
+    return sanitized_decades
+
+
+class NehSource(BulkSource):
+    """NEH grants, from the decade files of NEH open data.
+
+    Args:
+        decades (str, optional): Comma-separated decades to harvest, or "all". Defaults to "2000, 2010, 2020".
+    """
+
+    name = "neh.gov_grants"
+    default_output = "data/neh.gov_grants.jsonl"
+    # The NEH server's certificate chain doesn't validate
+    download_kwargs = {"verify": False}
+
+    def __init__(self, decades: str = "2000, 2010, 2020", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.decades = validate_decades(decades)
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--decades", default="2000, 2010, 2020", help='Decades to harvest, or "all"')
+
+    def input_urls(self) -> List[str]:
+        return [DECADE_CSV_URL.format(decade) for decade in self.decades]
+
+    def batches(self) -> Iterator[pl.DataFrame]:
+        self.prefetch(self.input_urls())
+        for decade in self.decades:
+            with self.open_download(DECADE_CSV_URL.format(decade), suffix=".csv") as path:
+                crawled_at = datetime.utcnow()
+                for df in iter_csv_batches(path, self.batch_size):
+                    yield from self.map_frame(df, NEH_MAPPING, crawled_at)
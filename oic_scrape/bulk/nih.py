@@ -0,0 +1,369 @@
+"""
+National Institutes of Health grants, from the RePORTER API.
+
+The [RePORTER API](https://api.reporter.nih.gov/) returns at most 500 projects per request and
+15,000 projects per search (through `offset`). `NihHarvester` counts the projects added in a
+date range first, and splits the range in two until every slice fits under that cap, so no
+manual strategy is needed to backfill large ranges. Slices and their result pages are fetched
+concurrently, while the client's token bucket for the API host keeps requests under the API's
+rate limit (1 per second).
+A single day over the cap is fetched sorted both ways (up to 30,000 projects).
+
+Usage:
+
+    $ poetry run python -m oic_scrape.bulk nih.gov_grants --start-date 2015-01-01
+
+[Data Dictionary](https://api.reporter.nih.gov/documents/Data%20Elements%20for%20RePORTER%20Project%20API_V2.pdf)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from oic_scrape.bulk.base import BulkSource
+from oic_scrape.dates import format_days
+from oic_scrape.httpclient import HttpClient, build_client
+from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.names import with_name_parts
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.reporter.nih.gov/v2/projects/search"
+PAGE_SIZE = 500  # Maximum number of projects per request
+MAX_RESULTS = 15000  # Maximum number of projects retrievable from a search (offset + limit)
+
+FUNDER_NAME = "National Institutes of Health"
+FUNDER_ROR_ID = "https://ror.org/01cwqze88"
+
+# ROR ids of the NIH institutes and centers, by their org code
+IC_ROR_IDS = {
+    "CC": "https://ror.org/04vfsmv21",  # Clinical Center
+    "RG": "https://ror.org/04r5s4b52",  # Center for Scientific Review
+    "CIT": "https://ror.org/03jh5a977",  # Center for Information Technology
+    "TW": "https://ror.org/02xey9a22",  # John E. Fogarty International Center
+    "TR": "https://ror.org/04pw6fb54",  # National Center for Advancing Translational Sciences
+    "AT": "https://ror.org/00190t495",  # National Center for Complementary and Integrative Health
+    "CA": "https://ror.org/040gcmg81",  # National Cancer Institute
+    "RR": "https://ror.org/01cwqze88",  # National Center for Research Resources (dissolved 12/2011)
+    "EY": "https://ror.org/03wkg3b53",  # National Eye Institute
+    "HG": "https://ror.org/00baak391",  # National Human Genome Research Institute
+    "HL": "https://ror.org/012pb6c26",  # National Heart, Lung, and Blood Institute
+    "AG": "https://ror.org/049v75w11",  # National Institute on Aging
+    "AA": "https://ror.org/02jzrsm59",  # National Institute on Alcohol Abuse and Alcoholism
+    "AI": "https://ror.org/043z4tv69",  # National Institute of Allergy and Infectious Diseases
+    "AR": "https://ror.org/006zn3t30",  # National Institute of Arthritis and Musculoskeletal and Skin Diseases
+    "EB": "https://ror.org/00372qc85",  # National Institute of Biomedical Imaging and Bioengineering
+    "HD": "https://ror.org/04byxyr05",  # Eunice Kennedy Shriver National Institute of Child Health and Human Development
+    "DA": "https://ror.org/00fq5cm18",  # National Institute on Drug Abuse
+    "DC": "https://ror.org/04mhx6838",  # National Institute on Deafness and Other Communication Disorders
+    "DE": "https://ror.org/004a2wv92",  # National Institute of Dental and Craniofacial Research
+    "DK": "https://ror.org/00adh9b73",  # National Institute of Diabetes and Digestive and Kidney Diseases
+    "ES": "https://ror.org/00j4k1h63",  # National Institute of Environmental Health Sciences
+    "GM": "https://ror.org/04q48ey07",  # National Institute of General Medical Sciences
+    "MH": "https://ror.org/04xeg9z08",  # National Institute of Mental Health
+    "MD": "https://ror.org/0493hgw16",  # National Institute on Minority Health and Health Disparities
+    "NS": "https://ror.org/01s5ya894",  # National Institute of Neurological Disorders and Stroke
+    "NR": "https://ror.org/01y3zfr79",  # National Institute of Nursing Research
+    "LM": "https://ror.org/0060t0j89",  # National Library of Medicine
+    "OD": "https://ror.org/00fj8a872",  # Office of the Director
+}
+
+SUBPROJECT_COMMENT = "Grant record is for a subproject. Value reflected here is value of the subproject only. Parent grant has cumulative value of funding of all subprojects. If summed, this value may be counted twice if using the overall dataset. Use the project_id in the NIH's raw_source_data if you would like to identify the parent project."
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return datetime.fromisoformat(value[:10]).date() if value else None
+
+
+def build_location(organization: Dict[str, Any]) -> Optional[str]:
+    """Builds a location string (city, zip code, country) from a project's organization."""
+    parts = []
+    city = organization.get("org_city") or organization.get("city")
+    if city:
+        parts.append(city)
+    zipcode = organization.get("org_zipcode")
+    if zipcode:
+        # handle zip-5/zip-9 formats
+        if zipcode.isnumeric() and len(zipcode) == 9:
+            zipcode = f"{zipcode[:5]}-{zipcode[5:]}"
+        parts.append(zipcode)
+    country = organization.get("org_country") or organization.get("country")
+    if country:
+        parts.append(country)
+    return ", ".join(parts) if parts else None
+
+
+def project_to_award(project: Dict[str, Any], crawled_at: datetime) -> AwardItem:
+    """Converts a RePORTER project into an AwardItem.
+
+    Args:
+        project (Dict[str, Any]): A project from the API results.
+        crawled_at (datetime): When the project was retrieved.
+
+    Returns:
+        AwardItem: The award.
+    """
+    organization = project.get("organization") or {}
+    agency = project.get("agency_ic_admin") or {}
+    budget_start = _parse_date(project.get("budget_start"))
+    budget_end = _parse_date(project.get("budget_end"))
+
+    participants = [
+        with_name_parts(
+            AwardParticipant(
+                full_name=pi["full_name"],
+                is_pi=True,
+                first_name=pi.get("first_name") or None,
+                middle_name=pi.get("middle_name") or None,
+                last_name=pi.get("last_name") or None,
+                grant_role="Contact Principal Investigator" if pi.get("is_contact_pi") else "Principal Investigator",
+                identifiers={"nih_profile_id": str(pi["profile_id"])} if pi.get("profile_id") else None,
+            )
+        )
+        for pi in project.get("principal_investigators") or []
+        if pi.get("full_name")
+    ]
+
+    description = None
+    if project.get("abstract_text") or project.get("phr_text"):
+        description = (
+            f"PROJECT TITLE: {project.get('project_title') or ''}"
+            f"\n\n\n PROJECT ABSTRACT:\n{project.get('abstract_text') or ''}"
+            f"\n\n\nPUBLIC HEALTH RELEVANCE STATEMENT: \n{project.get('phr_text') or ''}"
+        )
+
+    award_amount = float(project["award_amount"]) if project.get("award_amount") is not None else None
+
+    return AwardItem(
+        _crawled_at=crawled_at,
+        source="NIH RePORTER API",
+        grant_id=f"nih::{project['appl_id']}",
+        funder_org_name=f"{FUNDER_NAME}: {agency['name']}" if agency.get("name") else FUNDER_NAME,
+        funder_org_ror_id=IC_ROR_IDS.get(agency.get("code"), FUNDER_ROR_ID),
+        recipient_org_name=organization.get("org_name") or "Organization Not Listed",
+        recipient_org_location=build_location(organization),
+        pi_name=participants[0].full_name if participants else None,
+        named_participants=participants or None,
+        grant_year=budget_start.year if budget_start else None,
+        grant_duration=format_days(budget_start, budget_end),
+        grant_start_date=budget_start,
+        grant_end_date=budget_end,
+        award_amount=award_amount,
+        award_currency="USD",
+        award_amount_usd=award_amount,
+        source_url="https://api.reporter.nih.gov/?urls.primaryName=V2.0",
+        grant_title=project.get("project_title"),
+        grant_description=description,
+        program_of_funder=project.get("funding_mechanism"),
+        comments=SUBPROJECT_COMMENT if project.get("subproject_id") else None,
+        raw_source_data=json.dumps(project),
+        _award_schema_version="0.1.1",
+    )
+
+
+class NihHarvester(BulkSource):
+    """Harvests the projects added to RePORTER in a date range, as batches of AwardItem.
+
+    Args:
+        start_date (date): The first day to harvest.
+        end_date (date, optional): The day after the last day to harvest. Defaults to tomorrow.
+        rate (float, optional): The maximum number of requests per second. Defaults to 1.
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 4.
+        datefield (str, optional): The date field ranges are searched on. Defaults to "date_added".
+        session (HttpClient, optional): The HTTP client. Defaults to a new client limited to `rate`.
+        batch_size (int, optional): The number of awards per batch. Defaults to 500.
+    """
+
+    name = "nih.gov_grants"
+    default_output = "data/nih.gov_grants.jsonl"
+
+    def __init__(
+        self,
+        start_date: date = date(2015, 1, 1),
+        end_date: Optional[date] = None,
+        rate: float = 1.0,
+        concurrency: int = 4,
+        datefield: str = "date_added",
+        session: Optional[HttpClient] = None,
+        batch_size: int = 500,
+        **kwargs: Any,
+    ):
+        super().__init__(batch_size=batch_size, **kwargs)
+        end_date = end_date or date.today() + timedelta(days=1)
+        if start_date < date(2009, 1, 1):
+            raise ValueError("start_date is too early. Please use a date after 2009-01-01.")
+        if end_date <= start_date:
+            raise ValueError("end_date must be after start_date.")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.rate = rate
+        self.concurrency = concurrency
+        self.datefield = datefield
+        self._session = session or build_client(
+            rate_limits={urlsplit(API_URL).hostname: rate}, pool_size=concurrency, use_cache=self.use_cache
+        )
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "--start-date", type=date.fromisoformat, default=date(2015, 1, 1), help="First day to harvest (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--end-date", type=date.fromisoformat, help="Day after the last day to harvest (YYYY-MM-DD). Defaults to tomorrow."
+        )
+        parser.add_argument("--rate", type=float, default=1.0, help="Maximum requests per second")
+        parser.add_argument("--concurrency", type=int, default=4, help="Maximum requests in flight")
+
+    def _payload(self, start: date, end: date, sort_order: str = "asc") -> Dict[str, Any]:
+        return {
+            "criteria": {
+                self.datefield: {
+                    "from_date": start.strftime("%Y-%m-%d"),
+                    "to_date": end.strftime("%Y-%m-%d"),
+                }
+            },
+            "sort_field": self.datefield,
+            "sort_order": sort_order,
+        }
+
+    async def _search(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._semaphore:
+            response = await self.session.apost(API_URL, json=payload, timeout=120)
+        if response.status_code != 200:
+            raise ValueError(
+                f"API request failed with status code {response.status_code}. Error message: {response.text}"
+            )
+        response_json = response.json()
+        if "error" in response_json:
+            raise ValueError(f"API request returned an error: {response_json['error']}.")
+        return response_json
+
+    async def count(self, start: date, end: date) -> int:
+        """Returns the number of projects added from `start` to `end`."""
+        response = await self._search({**self._payload(start, end), "limit": 1})
+        return response["meta"]["total"]
+
+    async def _fetch_page(self, payload: Dict[str, Any], offset: int, limit: int) -> List[Dict[str, Any]]:
+        response = await self._search({**payload, "offset": offset, "limit": limit})
+        return response["results"]
+
+    async def _run_all(self, coros: Iterable[Coroutine[Any, Any, None]]) -> None:
+        """Runs coroutines concurrently, cancelling the others as soon as one of them fails.
+
+        Unlike `asyncio.gather`, no fetch is left behind (e.g. blocked on the bounded queue)
+        when another one fails. The first failure is raised as is, not as an ExceptionGroup, after
+        logging the others.
+        """
+        try:
+            async with asyncio.TaskGroup() as group:
+                for coro in coros:
+                    group.create_task(coro)
+        except ExceptionGroup as e:
+            for other in e.exceptions[1:]:
+                logger.error("Concurrent NIH request also failed: %r", other, exc_info=other)
+            raise e.exceptions[0]
+
+    async def _fetch_sorted(self, start: date, end: date, sort_order: str, total: int) -> None:
+        payload = self._payload(start, end, sort_order)
+        crawled_at = datetime.utcnow()
+
+        async def fetch(offset: int) -> None:
+            projects = await self._fetch_page(payload, offset, min(PAGE_SIZE, total - offset))
+            await self._queue.put((projects, crawled_at))
+
+        await self._run_all(fetch(offset) for offset in range(0, total, PAGE_SIZE))
+
+    async def _harvest(self, start: date, end: date) -> None:
+        total = await self.count(start, end)
+        days = (end - start).days
+        if total > MAX_RESULTS and days > 1:
+            # Too many projects to page through, split the range in two
+            middle = start + timedelta(days=days // 2)
+            logger.debug("%d projects from %s to %s, splitting at %s", total, start, end, middle)
+            await self._run_all([self._harvest(start, middle), self._harvest(middle, end)])
+            return
+
+        logger.info("Harvesting %d projects from %s to %s", total, start, end)
+        if total <= MAX_RESULTS:
+            await self._fetch_sorted(start, end, "asc", total)
+            return
+
+        # A single day over the cap: take the first projects in ascending order and the rest in
+        # descending order, overlaps are dropped when batching
+        if total > 2 * MAX_RESULTS:
+            logger.warning(
+                "%d projects added on %s, only %d can be retrieved", total, start, 2 * MAX_RESULTS
+            )
+        self._dedupe_days.add(start)
+        await self._run_all(
+            [
+                self._fetch_sorted(start, end, "asc", MAX_RESULTS),
+                self._fetch_sorted(start, end, "desc", min(total - MAX_RESULTS, MAX_RESULTS)),
+            ]
+        )
+
+    async def abatches(self) -> AsyncIterator[List[AwardItem]]:
+        """Yields the awards as they are harvested, `batch_size` at a time."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # Bounded, so fetching pauses when batches aren't consumed fast enough
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._dedupe_days = set()
+        seen_on_dedupe_days = set()
+
+        async def produce() -> None:
+            try:
+                await self._harvest(self.start_date, self.end_date)
+            except Exception:
+                # Ends the pages on failure too, so that the consumer stops waiting and raises the
+                # error (not when cancelled, as the consumer has gone)
+                await self._queue.put(None)
+                raise
+            await self._queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        batch: List[AwardItem] = []
+        try:
+            while True:
+                page = await self._queue.get()
+                if page is None:
+                    break
+                projects, crawled_at = page
+                for project in projects:
+                    if self._dedupe_days and _parse_date(project.get(self.datefield)) in self._dedupe_days:
+                        if project["appl_id"] in seen_on_dedupe_days:
+                            continue
+                        seen_on_dedupe_days.add(project["appl_id"])
+                    try:
+                        batch.append(project_to_award(project, crawled_at))
+                    except Exception as e:
+                        self.errors += 1
+                        logger.warning("Skipping project %s: %r", project.get("appl_id"), e)
+                        continue
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+            # Raises the producer's exception, if any
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    def batches(self) -> Iterator[List[AwardItem]]:
+        """Synchronous version of `abatches()`, running its own event loop."""
+        loop = asyncio.new_event_loop()
+        agen = self.abatches()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(agen.aclose())
+            loop.close()
@@ -0,0 +1,121 @@
+"""
+Chunked readers for large grant exports (CSV and Excel files).
+
+Reading an export with `response.text` and a single `read_csv`/`read_excel` call holds the raw
+download, its decoded text and the parsed frame in memory at the same time. These readers
+stream the download to a temporary file instead, then read it back in DataFrames of a bounded
+number of rows, which are mapped to awards and written before the next one is read.
+
+Example:
+
+    >>> with download_to_tempfile(session, url, suffix=".csv") as path:
+    ...     for df in iter_csv_batches(path, batch_size=10_000):
+    ...         ...
+"""
+
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterator, List, Sequence
+
+import polars as pl
+import requests
+from python_calamine import CalamineWorkbook
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # Bytes written to the temporary file at a time
+
+
+@contextmanager
+def download_to_tempfile(session: requests.Session, url: str, suffix: str = "", **kwargs: Any) -> Iterator[Path]:
+    """Downloads a file to a temporary file, deleted when the context exits.
+
+    Args:
+        session (requests.Session): The session to download with.
+        url (str): The URL of the file.
+        suffix (str, optional): The suffix of the temporary file name (e.g. ".csv").
+        **kwargs: Passed on to `session.get` (e.g. `verify=False`).
+
+    Yields:
+        Path: The path of the downloaded file.
+
+    Raises:
+        requests.HTTPError: If the download fails.
+    """
+    fd, name = tempfile.mkstemp(suffix=suffix, prefix="oic_scrape-")
+    path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as f, session.get(url, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+        logger.debug("Downloaded %s (%d bytes) to %s", url, path.stat().st_size, path)
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def iter_csv_batches(path: Path, batch_size: int = 10_000, **kwargs: Any) -> Iterator[pl.DataFrame]:
+    """Reads a CSV file in DataFrames of about `batch_size` rows.
+
+    All columns are read as strings (so that a chunk can't infer different types than the
+    others); mappings convert them.
+
+    Args:
+        path (Path): The CSV file.
+        batch_size (int, optional): The number of rows per DataFrame. Defaults to 10,000.
+        **kwargs: Passed on to `pl.read_csv_batched` (e.g. `skip_rows`).
+
+    Yields:
+        pl.DataFrame: The rows of the file.
+    """
+    reader = pl.read_csv_batched(path, batch_size=batch_size, infer_schema_length=0, **kwargs)
+    while batches := reader.next_batches(1):
+        yield from batches
+
+
+def rows_to_frame(header: Sequence[Any], rows: List[Sequence[Any]]) -> pl.DataFrame:
+    """Builds a DataFrame from spreadsheet rows, with empty cells as null.
+
+    Columns mixing types that Polars can't reconcile (e.g. dates and text) are read as text.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    series = []
+    for name, values in zip(header, columns):
+        values = [None if value == "" else value for value in values]
+        try:
+            series.append(pl.Series(str(name), values, strict=False))
+        except (pl.exceptions.ComputeError, TypeError):
+            series.append(
+                pl.Series(
+                    str(name),
+                    [v.isoformat() if isinstance(v, (date, datetime)) else None if v is None else str(v) for v in values],
+                )
+            )
+    return pl.DataFrame(series)
+
+
+def iter_xlsx_batches(path: Path, sheet_name: str, batch_size: int = 10_000) -> Iterator[pl.DataFrame]:
+    """Reads a sheet of an Excel file in DataFrames of `batch_size` rows.
+
+    The first row of the sheet is the header.
+
+    Args:
+        path (Path): The Excel file.
+        sheet_name (str): The name of the sheet.
+        batch_size (int, optional): The number of rows per DataFrame. Defaults to 10,000.
+
+    Yields:
+        pl.DataFrame: The rows of the sheet.
+    """
+    rows = CalamineWorkbook.from_path(str(path)).get_sheet_by_name(sheet_name).iter_rows()
+    header = next(rows, None)
+    if header is None:
+        return
+    while batch := list(islice(rows, batch_size)):
+        yield rows_to_frame(header, batch)
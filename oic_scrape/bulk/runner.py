@@ -0,0 +1,396 @@
+"""
+Runs several bulk sources in parallel, skipping those whose inputs haven't changed.
+
+Each source runs in its own worker process, with its own parameters, timeout and log file
+(`<log dir>/<source>.log`). A source that fails or times out does not stop the others, and a
+summary is printed (and optionally written as JSON) at the end.
+
+After a successful run, a manifest of the run is kept in the state directory: a fingerprint of
+the source's inputs (the SHA-256 digests of its bulk files, its parameters and the code of the
+whole `oic_scrape` package, which includes the shared mapping, reader and parsing helpers) and of
+its output. When the fingerprint is unchanged on the next run, the source isn't converted again
+and its previous output is reused. Sources read from APIs (without bulk files) always run.
+Fingerprinting fetches the bulk files (conditionally); when that fails, e.g. offline, the previous
+output is reused if there is one.
+
+Usage:
+
+    $ poetry run python -m oic_scrape.bulk.runner
+    $ poetry run python -m oic_scrape.bulk.runner neh.gov_grants wellcome.org_grants --processes 2
+    $ poetry run python -m oic_scrape.bulk.runner --args 'neh.gov_grants=--decades "2010, 2020"' --timeout 3600
+    $ poetry run python -m oic_scrape.bulk.runner --timeout-for nih.gov_grants=14400 --force --summary runs.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import shlex
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import requests
+from attrs import asdict, define, field
+
+import oic_scrape
+
+from oic_scrape.bulk import SOURCES, load_source
+from oic_scrape.bulk.base import BulkSource, run_source
+from oic_scrape.bulk.cli import build_parser, source_params
+from oic_scrape.bulk.downloads import DEFAULT_CACHE_DIR, file_sha256
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_DIR = f"{DEFAULT_CACHE_DIR}/logs"
+DEFAULT_STATE_DIR = f"{DEFAULT_CACHE_DIR}/runs"
+
+# Parameters that don't change the awards of a source, left out of its fingerprint
+_UNFINGERPRINTED_PARAMS = ("batch_size", "use_cache", "cache_dir")
+
+
+@define
+class PipelineJob:
+    """A bulk source to run.
+
+    Args:
+        source (str): The name of the bulk source.
+        params (Dict[str, Any]): The parameters of the source (passed to its `__init__`).
+        output (str): The path of the JSON Lines file the awards are written to (overwritten).
+        timeout (float, optional): The maximum run time, in seconds. Defaults to no limit.
+    """
+
+    source: str
+    params: Dict[str, Any] = field(factory=dict)
+    output: str = ""
+    timeout: Optional[float] = None
+
+
+@define
+class PipelineResult:
+    """The outcome of a job: "ok", "skipped" (inputs unchanged), "failed" or "timeout"."""
+
+    source: str
+    output: str
+    status: str
+    items: int = 0
+    errors: int = 0
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=1)
+def code_digest() -> str:
+    """Returns a digest of the Python files of the `oic_scrape` package.
+
+    Sources build their awards with code shared across the package (mappings, readers, date,
+    money and name parsing), so any change to it may change their awards.
+    """
+    package = Path(oic_scrape.__file__).parent
+    digest = hashlib.sha256()
+    for path in sorted(package.rglob("*.py")):
+        digest.update(path.relative_to(package).as_posix().encode("utf-8"))
+        digest.update(file_sha256(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def fingerprint(source: BulkSource, params: Dict[str, Any]) -> Optional[str]:
+    """Returns a digest of everything a source's awards are built from, or None if unknown.
+
+    The source's bulk files are downloaded to the cache (if they changed upstream) to get
+    their digests. Sources without bulk files, or without a cache, have no fingerprint.
+
+    Raises:
+        requests.RequestException: If the source's files (or, for some sources, their URLs)
+            can't be fetched, e.g. offline.
+    """
+    urls = source.input_urls()
+    if not urls or not source.downloader:
+        return None
+    source.prefetch(urls)
+    inputs = {url: source.downloader.entry(url).sha256 for url in urls}
+    state = {
+        "source": source.name,
+        "params": {k: v for k, v in params.items() if k not in _UNFINGERPRINTED_PARAMS},
+        "inputs": inputs,
+        "code": code_digest(),
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def reuse_output(job: PipelineJob, manifest: Dict[str, Any]) -> bool:
+    """Copies the output of the last run to the job's output, if it's still there and unchanged."""
+    previous = Path(manifest["output"])
+    if not previous.exists() or file_sha256(previous) != manifest["output_sha256"]:
+        return False
+    output = Path(job.output)
+    if output.resolve() != previous.resolve():
+        output.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(previous, output)
+    return True
+
+
+def _skipped(job: PipelineJob, manifest: Dict[str, Any], start: float) -> PipelineResult:
+    """The result of a job whose output was reused from the run of a manifest."""
+    return PipelineResult(
+        source=job.source,
+        output=job.output,
+        status="skipped",
+        items=manifest["items"],
+        errors=manifest["errors"],
+        elapsed_seconds=time.monotonic() - start,
+    )
+
+
+def run_pipeline(job: PipelineJob, log_dir: str, state_dir: str, force: bool = False) -> PipelineResult:
+    """Runs a bulk source, unless its inputs are unchanged since its last successful run.
+
+    Args:
+        job (PipelineJob): The source to run.
+        log_dir (str): The directory of the log files (`<source>.log`, overwritten).
+        state_dir (str): The directory of the run manifests (`<source>.json`).
+        force (bool, optional): Run the source even if its inputs are unchanged. Defaults to False.
+
+    Returns:
+        PipelineResult: The outcome of the run.
+    """
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(Path(log_dir) / f"{job.source}.log", mode="w")
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(name)s] %(levelname)s: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    start = time.monotonic()
+    try:
+        source = load_source(job.source)(**job.params)
+        manifest_path = Path(state_dir) / f"{job.source}.json"
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        try:
+            digest = fingerprint(source, job.params)
+        except requests.RequestException as e:
+            # The inputs can't be checked (e.g. offline): the last run's output is the best there is
+            if force or not manifest or not reuse_output(job, manifest):
+                raise
+            logger.warning("%s: couldn't check its inputs (%r), reusing %s", job.source, e, manifest["output"])
+            return _skipped(job, manifest, start)
+
+        if digest and not force and manifest.get("fingerprint") == digest and reuse_output(job, manifest):
+            logger.info("%s: inputs unchanged since %s, reusing %s", job.source, manifest["finished_at"], manifest["output"])
+            return _skipped(job, manifest, start)
+
+        stats = run_source(source, job.output)
+        if digest:
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            manifest = {
+                "fingerprint": digest,
+                "output": job.output,
+                "output_sha256": file_sha256(Path(job.output)),
+                "items": stats["items"],
+                "errors": stats["errors"],
+                "finished_at": datetime.now().isoformat(),
+            }
+            manifest_path.write_text(json.dumps(manifest, indent=2))
+        return PipelineResult(
+            source=job.source,
+            output=job.output,
+            status="ok",
+            items=stats["items"],
+            errors=stats["errors"],
+            elapsed_seconds=time.monotonic() - start,
+        )
+    except Exception as e:
+        logger.exception("%s failed", job.source)
+        return PipelineResult(
+            source=job.source, output=job.output, status="failed", elapsed_seconds=time.monotonic() - start, error=repr(e)
+        )
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def _worker(conn: Connection, job: PipelineJob, log_dir: str, state_dir: str, force: bool) -> None:
+    conn.send(asdict(run_pipeline(job, log_dir, state_dir, force)))
+    conn.close()
+
+
+def run_pipelines(
+    jobs: List[PipelineJob],
+    processes: int = 4,
+    log_dir: str = DEFAULT_LOG_DIR,
+    state_dir: str = DEFAULT_STATE_DIR,
+    force: bool = False,
+) -> List[PipelineResult]:
+    """Runs jobs in worker processes, `processes` at a time, stopping those that time out.
+
+    Args:
+        jobs (List[PipelineJob]): The sources to run.
+        processes (int, optional): The maximum number of sources running at once. Defaults to 4.
+        log_dir (str, optional): The directory of the log files. Defaults to `.cache/bulk/logs`.
+        state_dir (str, optional): The directory of the run manifests. Defaults to `.cache/bulk/runs`.
+        force (bool, optional): Run all the sources, even those with unchanged inputs. Defaults to False.
+
+    Returns:
+        List[PipelineResult]: The outcome of each job, in the order of `jobs`.
+    """
+    # Spawned rather than forked, so that workers don't inherit open connections and threads
+    context = multiprocessing.get_context("spawn")
+    pending: Deque[Tuple[int, PipelineJob]] = deque(enumerate(jobs))
+    # The running workers by the receiving end of their pipe: (job index, job, process, deadline)
+    running: Dict[Connection, Tuple[int, PipelineJob, Any, Optional[float]]] = {}
+    results: Dict[int, PipelineResult] = {}
+
+    while pending or running:
+        while pending and len(running) < max(processes, 1):
+            index, job = pending.popleft()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_worker, args=(sender, job, log_dir, state_dir, force), name=f"bulk-{job.source}"
+            )
+            process.start()
+            sender.close()
+            deadline = time.monotonic() + job.timeout if job.timeout else None
+            running[receiver] = (index, job, process, deadline)
+            logger.info("Started %s (pid %s)", job.source, process.pid)
+
+        deadlines = [deadline for _, _, _, deadline in running.values() if deadline is not None]
+        timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+        for conn in wait(list(running), timeout=timeout):
+            index, job, process, _ = running.pop(conn)
+            try:
+                results[index] = PipelineResult(**conn.recv())
+            except EOFError:
+                # The worker died without reporting (e.g. killed for using too much memory)
+                process.join()
+                results[index] = PipelineResult(
+                    source=job.source, output=job.output, status="failed", error=f"Exit code {process.exitcode}"
+                )
+            conn.close()
+            process.join()
+            logger.info("%s: %s", job.source, results[index].status)
+
+        now = time.monotonic()
+        for conn, (index, job, process, deadline) in list(running.items()):
+            if deadline is not None and now >= deadline:
+                process.terminate()
+                process.join()
+                conn.close()
+                del running[conn]
+                results[index] = PipelineResult(
+                    source=job.source,
+                    output=job.output,
+                    status="timeout",
+                    elapsed_seconds=job.timeout,
+                    error=f"Stopped after {job.timeout:g}s",
+                )
+                logger.warning("%s: stopped after %gs", job.source, job.timeout)
+
+    return [results[index] for index in range(len(jobs))]
+
+
+def build_jobs(
+    sources: List[str],
+    source_args: Dict[str, str],
+    timeout: Optional[float] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> List[PipelineJob]:
+    """Builds the jobs of the selected sources (default: all).
+
+    Args:
+        sources (List[str]): The names of the sources to run.
+        source_args (Dict[str, str]): Command line arguments by source, as accepted by
+            `python -m oic_scrape.bulk <source>` (e.g. `--decades "2010, 2020" --output ...`).
+        timeout (float, optional): The default timeout of each job, in seconds.
+        timeouts (Dict[str, float], optional): Timeouts by source, overriding `timeout`.
+
+    Raises:
+        KeyError: If a source isn't registered.
+    """
+    jobs = []
+    for name in sources or sorted(SOURCES):
+        if name not in SOURCES:
+            raise KeyError(f"Unknown bulk source: {name}")
+        params, output = source_params(build_parser(name).parse_args([name, *shlex.split(source_args.get(name, ""))]))
+        jobs.append(PipelineJob(name, params, output, (timeouts or {}).get(name, timeout)))
+    return jobs
+
+
+def print_summary(results: List[PipelineResult], elapsed: float) -> None:
+    header = f"{'source':<30} {'status':<8} {'items':>9} {'errors':>7} {'seconds':>9}  output"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        seconds = f"{r.elapsed_seconds:9.1f}" if r.elapsed_seconds is not None else f"{'-':>9}"
+        print(f"{r.source:<30} {r.status:<8} {r.items:>9} {r.errors:>7} {seconds}  {r.output}")
+        if r.error:
+            print(f"    error: {r.error}")
+    failed = sum(1 for r in results if r.status not in ("ok", "skipped"))
+    skipped = sum(1 for r in results if r.status == "skipped")
+    print(
+        f"\n{len(results)} sources, {skipped} skipped, {failed} failed, {sum(r.items for r in results)} items in {elapsed:.1f}s"
+    )
+
+
+def _key_value(value: str) -> tuple:
+    key, sep, val = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE, got {value!r}")
+    return key, val
+
+
+def _key_seconds(value: str) -> tuple:
+    key, val = _key_value(value)
+    try:
+        return key, float(val)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected SOURCE=SECONDS, got {value!r}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m oic_scrape.bulk.runner", description="Run several bulk sources in parallel."
+    )
+    parser.add_argument("sources", nargs="*", help="Bulk sources to run (default: all)")
+    parser.add_argument(
+        "--args", action="append", type=_key_value, default=[], metavar='SOURCE="ARGS"',
+        help="Command line arguments of a source (see python -m oic_scrape.bulk SOURCE --help)",
+    )
+    parser.add_argument("--processes", type=int, default=4, help="Maximum number of sources running at once (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, help="Maximum run time of each source, in seconds (default: none)")
+    parser.add_argument(
+        "--timeout-for", action="append", type=_key_seconds, default=[], metavar="SOURCE=SECONDS",
+        help="Maximum run time of a specific source",
+    )
+    parser.add_argument("--log-dir", default=DEFAULT_LOG_DIR, help="Directory of the source logs (default: %(default)s)")
+    parser.add_argument("--state-dir", default=DEFAULT_STATE_DIR, help="Directory of the run manifests (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Run all the sources, even those with unchanged inputs")
+    parser.add_argument("--summary", help="Write the run summary as JSON to this path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    try:
+        jobs = build_jobs(args.sources, dict(args.args), args.timeout, dict(args.timeout_for))
+    except KeyError as e:
+        parser.error(str(e))
+
+    start = time.monotonic()
+    results = run_pipelines(jobs, args.processes, args.log_dir, args.state_dir, args.force)
+    elapsed = time.monotonic() - start
+
+    print_summary(results, elapsed)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump({"elapsed_seconds": elapsed, "runs": [asdict(r) for r in results]}, f, indent=2)
+
+    return 0 if all(r.status in ("ok", "skipped") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Wellcome Trust grants, from their 360Giving spreadsheet export.
+
+Amounts are converted to USD with the ECB exchange rate on the planned start date of the
+grant, or the latest rate for start dates outside the ECB data.
+"""
+
+import argparse
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Tuple
+
+import polars as pl
+from currency_converter import ECB_URL, CurrencyConverter, RateNotFoundError
+
+from oic_scrape.bulk.base import BulkSource
+from oic_scrape.bulk.mapping import (
+    participant,
+    participants,
+    single_participant,
+    split_text,
+    text,
+    threesixty_giving_mapping,
+    to_amount,
+)
+from oic_scrape.bulk.readers import iter_xlsx_batches
+from oic_scrape.names import fill_name_parts
+
+FUNDER_ORG_NAME = "The Wellcome Trust"
+FUNDER_ROR_ID = "https://ror.org/029chgv08"
+
+THREESIXTY_G_DATA_URL = "https://wellcome.org/sites/default/files/2023-11/Wellcome-grants-awarded-1-October-2005-to-30-September-2023.xlsx"
+
+_amount = to_amount("Amount Awarded")
+_awarded = _amount > 0
+
+WELLCOME_MAPPING = threesixty_giving_mapping(
+    source="wellcome.org_360giving-export",
+    funder_org_name=FUNDER_ORG_NAME,
+    funder_ror_ids={FUNDER_ORG_NAME: FUNDER_ROR_ID},
+    pi_name=text("Lead Applicant"),
+    named_participants=participants(
+        single_participant("Lead Applicant", is_pi=True, grant_role="Lead Applicant", last_name=text("Applicant Surname")),
+        split_text("Other Applicant(s)").list.eval(participant(pl.element(), grant_role="Other Applicant")),
+        split_text("Sponsor(s)").list.eval(participant(pl.element(), grant_role="Sponsor")),
+    ),
+    # Grants without an amount awarded have no amount nor currency
+    award_amount=pl.when(_awarded).then(_amount),
+    award_currency=pl.when(_awarded).then(text("Currency").fill_null("GBP")),
+    _award_schema_version="0.1.0",
+)
+
+
+class WellcomeSource(BulkSource):
+    """The Wellcome Trust's grants awarded, from its 360Giving export.
+
+    Args:
+        url (str, optional): The URL of the 360Giving spreadsheet. Defaults to the 2005-2023 export.
+    """
+
+    name = "wellcome.org_grants"
+    default_output = "data/wellcome-trust--giving360_grants.jsonl"
+
+    def __init__(self, url: str = THREESIXTY_G_DATA_URL, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.url = url
+        self.currency_converter = CurrencyConverter(ECB_URL, fallback_on_missing_rate=True)
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("--url", default=THREESIXTY_G_DATA_URL, help="URL of the 360Giving spreadsheet")
+
+    def input_urls(self) -> List[str]:
+        return [self.url]
+
+    def usd_rate(self, currency: str, on: Optional[date]) -> Tuple[float, str]:
+        """Returns the exchange rate of a currency to USD, and a comment on the rate used."""
+        try:
+            rate = self.currency_converter.convert(1, currency, "USD", date=on)
+            return rate, f"`award_amount_usd` converted from {currency} to USD using ECB exchange rate on {on}."
+        except RateNotFoundError:
+            # Start dates outside the ECB data (e.g. in the future), use the latest rate
+            rate = self.currency_converter.convert(1, currency, "USD")
+            return rate, f"`award_amount_usd` converted from {currency} to USD using the latest ECB exchange rate, rather than on {on}."
+
+    def convert_to_usd(self, awards: pl.DataFrame) -> pl.DataFrame:
+        """Fills `award_amount_usd` and `comments`, looking up each currency and start date once."""
+        key = pl.concat_str(
+            [pl.col("award_currency"), pl.col("grant_start_date").cast(pl.String).fill_null("")], separator="|"
+        )
+        rates, comments = {}, {}
+        pairs = awards.filter(pl.col("award_amount").is_not_null()).select("award_currency", "grant_start_date")
+        for currency, on in pairs.unique().iter_rows():
+            pair_key = f"{currency}|{on or ''}"
+            rates[pair_key], comments[pair_key] = self.usd_rate(currency, on)
+        return awards.with_columns(
+            award_amount_usd=pl.col("award_amount") * key.replace_strict(rates, default=None, return_dtype=pl.Float64),
+            comments=pl.when(pl.col("award_amount").is_not_null()).then(
+                key.replace_strict(comments, default=None, return_dtype=pl.String)
+            ),
+        )
+
+    def batches(self) -> Iterator[pl.DataFrame]:
+        with self.open_download(self.url, suffix=".xlsx") as path:
+            crawled_at = datetime.utcnow()
+            for df in iter_xlsx_batches(path, "General Report", self.batch_size):
+                for awards in self.map_frame(df, WELLCOME_MAPPING, crawled_at):
+                    awards = awards.with_columns(fill_name_parts(awards["named_participants"]))
+                    yield self.convert_to_usd(awards)
@@ -0,0 +1,259 @@
+"""
+Periodic checkpoints for long crawls, so that a killed crawl can resume where it left off.
+
+Scrapy can already pause and resume crawls with a job directory (`-s JOBDIR=...`), but it
+only saves its state when the crawl shuts down cleanly: the disk request queue's index, the
+spider's `state` dict and the buffered seen-fingerprints file are all written on close. A
+crawl that is killed (OOM, a lost SSH session, a reboot) loses all of it and starts from zero.
+
+`CheckpointScheduler` snapshots all of that state every `CHECKPOINT_INTERVAL` seconds:
+
+- the disk-backed request queue (`requests.queue/`),
+- the requests that were taken from the queue but whose responses were not fully processed yet
+  (`requests.inflight`), which are scheduled again on resume,
+- the seen-fingerprints file of the dupefilter (`requests.seen`),
+- the spider's `state` dict (`spider.state`), e.g. pagination cursors.
+
+The scheduler (through `SpillingScheduler`), `CheckpointMiddleware` and `CheckpointDownloaderMiddleware`
+are enabled in `settings.py`. Without a `JOBDIR`, they behave like Scrapy's default scheduler and do nothing. To make a crawl resumable:
+
+    $ poetry run scrapy crawl dfg.de_grants -s JOBDIR=crawls/dfg.de_grants -o data/dfg.de_grants.jsonl
+
+and run the same command again to resume it. Spiders keep anything they need to resume in
+`self.state` (a dict persisted between runs), and requests must be serializable: callbacks
+must be spider methods and `cb_kwargs`/`meta` must be picklable.
+"""
+
+import logging
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Dict, List
+
+from queuelib.queue import FifoDiskQueue, LifoDiskQueue
+from scrapy import Request, signals
+from scrapy.core.scheduler import Scheduler
+from scrapy.utils.request import request_from_dict
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+# Sent by the checkpoint middlewares once a request's response has been fully processed, or
+# its download has failed for good
+request_processed = object()
+
+# Meta key holding the in-flight key of a request, which its retries and redirects inherit
+CHECKPOINT_KEY = "checkpoint_key"
+
+
+def _atomic_pickle(obj, path: Path) -> None:
+    # Write to a temporary file first, so a crash mid-write never leaves a truncated checkpoint
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        pickle.dump(obj, f, protocol=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _sync_disk_queue(queue) -> None:
+    """Writes the index of a queuelib disk queue, as closing it would, while keeping it open."""
+    if isinstance(queue, FifoDiskQueue):
+        # Requests are written unbuffered, only the index is kept in memory
+        os.fsync(queue.headf.fileno())
+        queue._saveinfo(queue.info)
+    elif isinstance(queue, LifoDiskQueue):
+        queue.f.seek(0)
+        queue.f.write(struct.pack(queue.SIZE_FORMAT, queue.size))
+        queue.f.seek(0, os.SEEK_END)
+        queue.f.flush()
+        os.fsync(queue.f.fileno())
+
+
+def _sync_priority_queue(queue) -> list:
+    """Syncs the disk queues of a ScrapyPriorityQueue, returning its state as `close()` would."""
+    active = set()
+    for queues in (queue.queues, getattr(queue, "_start_queues", {})):
+        for priority, disk_queue in queues.items():
+            active.add(priority)
+            _sync_disk_queue(disk_queue)
+    return list(active)
+
+
+class CheckpointScheduler(Scheduler):
+    """Scheduler that periodically snapshots its state to the job directory.
+
+    Settings:
+        CHECKPOINT_INTERVAL: Seconds between checkpoints. Defaults to 60. 0 disables periodic checkpoints.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jobdir = Path(self.dqdir).parent if self.dqdir else None
+        self.interval = self.crawler.settings.getfloat("CHECKPOINT_INTERVAL", 60) if self.crawler else 60
+        self.inflight: Dict[bytes, object] = {}
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        crawler.signals.connect(scheduler._request_processed, signal=request_processed)
+        crawler.signals.connect(scheduler._request_processed, signal=signals.request_dropped)
+        return scheduler
+
+    def open(self, spider):
+        result = super().open(spider)
+        if self.jobdir is None:
+            return result
+
+        self._resume_inflight()
+        state = getattr(spider, "state", None)
+        if state:
+            logger.info("Resuming with spider state: %(state)r", {"state": state}, extra={"spider": spider})
+        if self.interval:
+            self.loop = task.LoopingCall(self.checkpoint)
+            self.loop.start(self.interval, now=False)
+        return result
+
+    def close(self, reason):
+        if self.loop and self.loop.running:
+            self.loop.stop()
+        if self.jobdir is not None:
+            # After a clean shutdown, nothing is left in flight
+            self._inflight_path().unlink(missing_ok=True)
+        return super().close(reason)
+
+    def next_request(self):
+        request = super().next_request()
+        if request is not None and self.jobdir is not None:
+            key = self._key(request)
+            previous = request.meta.get(CHECKPOINT_KEY)
+            if previous is not None and previous != key:
+                # The redirect of a request in flight takes its place
+                self.inflight.pop(previous, None)
+            request.meta[CHECKPOINT_KEY] = key
+            self.inflight[key] = request
+        return request
+
+    def _key(self, request) -> bytes:
+        return self.crawler.request_fingerprinter.fingerprint(request)
+
+    def _request_processed(self, request, spider=None, **kwargs):
+        if self.jobdir is not None:
+            self.inflight.pop(request.meta.get(CHECKPOINT_KEY) or self._key(request), None)
+
+    def _inflight_path(self) -> Path:
+        return self.jobdir / "requests.inflight"
+
+    def _resume_inflight(self) -> None:
+        path = self._inflight_path()
+        if not path.exists():
+            return
+        with path.open("rb") as f:
+            pending: List[dict] = pickle.load(f)
+        for request_dict in pending:
+            # These were already recorded as seen, so they bypass the dupefilter
+            request = request_from_dict(request_dict, spider=self.spider)
+            if not self._dqpush(request):
+                self._mqpush(request)
+        logger.info(
+            "Rescheduled %(count)d requests that were in progress at the last checkpoint",
+            {"count": len(pending)},
+            extra={"spider": self.spider},
+        )
+        path.unlink()
+
+    def checkpoint(self) -> None:
+        """Snapshots the request queue, in-flight requests, seen fingerprints and spider state."""
+        if self.dqs is not None:
+            if hasattr(self.dqs, "pqueues"):
+                # DownloaderAwarePriorityQueue: a priority queue per download slot
+                state = {slot: _sync_priority_queue(queue) for slot, queue in self.dqs.pqueues.items()}
+            else:
+                state = _sync_priority_queue(self.dqs)
+            self._write_dqs_state(self.dqdir, state)
+
+        inflight = []
+        for request in self.inflight.values():
+            try:
+                inflight.append(request.to_dict(spider=self.spider))
+            except ValueError:
+                # Not serializable (e.g. a lambda callback), it can't be resumed anyway
+                pass
+        _atomic_pickle(inflight, self._inflight_path())
+
+        if hasattr(self.df, "checkpoint"):
+            self.df.checkpoint()
+        elif getattr(self.df, "file", None) is not None:
+            self.df.file.flush()
+            os.fsync(self.df.file.fileno())
+
+        state = getattr(self.spider, "state", None)
+        if state is not None:
+            _atomic_pickle(state, self.jobdir / "spider.state")
+
+        self.stats.inc_value("checkpoint/count", spider=self.spider)
+        logger.debug(
+            "Checkpoint saved (%(queued)d queued, %(inflight)d in flight)",
+            {"queued": len(self), "inflight": len(inflight)},
+            extra={"spider": self.spider},
+        )
+
+
+class CheckpointMiddleware:
+    """Spider middleware reporting when a response's output has been completely processed.
+
+    Until then, the request stays "in flight" in the checkpoints: if the crawl dies while its
+    callback is still yielding follow-up requests, it is fetched again on resume.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _done(self, response, spider):
+        self.crawler.signals.send_catch_log(
+            request_processed, request=response.request, spider=spider
+        )
+
+    def _strip_key(self, output):
+        # Requests built with a copy of `response.meta` must not inherit its in-flight key
+        if isinstance(output, Request):
+            output.meta.pop(CHECKPOINT_KEY, None)
+        return output
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            yield self._strip_key(r)
+        self._done(response, spider)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for r in result:
+            yield self._strip_key(r)
+        self._done(response, spider)
+
+    def process_spider_exception(self, response, exception, spider):
+        self._done(response, spider)
+
+
+class CheckpointDownloaderMiddleware:
+    """Downloader middleware reporting the requests whose download failed for good.
+
+    Their errback runs without going through the spider middlewares, so `CheckpointMiddleware`
+    never sees them. It must come before RetryMiddleware (i.e. have a lower priority), so that it
+    only sees the failures that are not retried.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_exception(self, request, exception, spider):
+        self.crawler.signals.send_catch_log(request_processed, request=request, spider=spider)
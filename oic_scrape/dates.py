@@ -0,0 +1,126 @@
+"""
+Grant durations and end dates, computed the same way by the spiders and the bulk sources.
+
+Funders give a grant's term either as two dates or as a start date and a number of months (or
+years). The helpers here turn either into normalized `grant_duration` strings ("36 months",
+"365 days") and `grant_end_date` values. Each scalar helper, for the spiders converting one
+grant at a time, has a Polars expression counterpart (`..._expr`) computing the same result
+over whole date columns, for the bulk sources' `AwardMapping`s.
+
+Example:
+
+    >>> add_months(date(2020, 1, 31), 1)
+    datetime.date(2020, 2, 29)
+    >>> format_months(parse_months("3 years"))
+    '36 months'
+    >>> df.select(month_diff_expr("end", "start"))
+"""
+
+import calendar
+import re
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Optional, TypeVar, Union
+
+if TYPE_CHECKING:
+    import polars as pl
+
+D = TypeVar("D", bound=date)
+Column = Union[str, "pl.Expr"]
+
+_TERM = re.compile(r"(\d+(?:\.\d+)?)\s*(years?|yrs?|months?|mos?\.?|weeks?|days?)?", re.IGNORECASE)
+_MONTHS_PER_UNIT = {"y": 12, "m": 1, "w": 12 / 52, "d": 12 / 365}
+
+
+def _col(column: Column) -> "pl.Expr":
+    # Polars is only imported by the expression helpers, the spiders use the scalar ones
+    import polars as pl
+
+    return pl.col(column) if isinstance(column, str) else column
+
+
+def add_months(start: D, months: int) -> D:
+    """Returns the date `months` months after `start`, clamped to the end of shorter months.
+
+    Same as `start + relativedelta(months=months)`, for dates and datetimes.
+
+    Example:
+        >>> add_months(date(2020, 1, 31), 1)
+        datetime.date(2020, 2, 29)
+    """
+    month_index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(month_index, 12)
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return start.replace(year=year, month=month + 1, day=day)
+
+
+def month_diff(end_date: date, start_date: date) -> int:
+    """
+    Calculate the difference in months between two dates, counting a grant running from the
+    first to the last day of months as covering those months entirely.
+
+    Example:
+        >>> month_diff(date(2020, 12, 31), date(2020, 1, 1))
+        12
+    """
+    months = 12 * (end_date.year - start_date.year) + (end_date.month - start_date.month)
+    if start_date.day == 1 and (end_date + timedelta(days=1)).day == 1:
+        months += 1
+    return months
+
+
+def parse_months(term: Optional[str]) -> Optional[int]:
+    """Parses a grant term ("24 months", "3 Years", "18 mos.") as a number of months.
+
+    A number without a unit is taken as months. Returns None if the term has no number.
+    """
+    match = _TERM.search(term) if term else None
+    if not match:
+        return None
+    unit = (match.group(2) or "m")[0].lower()
+    return round(float(match.group(1)) * _MONTHS_PER_UNIT[unit])
+
+
+def format_months(months: Optional[int]) -> Optional[str]:
+    """The normalized `grant_duration` of a term in months (None if unknown)."""
+    return f"{months} months" if months is not None else None
+
+
+def format_days(start_date: Optional[date], end_date: Optional[date]) -> Optional[str]:
+    """The normalized `grant_duration` of a grant running from `start_date` to `end_date`, in days."""
+    if start_date is None or end_date is None:
+        return None
+    return f"{(end_date - start_date).days} days"
+
+
+def add_months_expr(start: Column, months: Column) -> "pl.Expr":
+    """Vectorized `add_months`: a date column plus an integer column of months."""
+    import polars as pl
+
+    return _col(start).dt.offset_by(pl.format("{}mo", _col(months).cast(pl.Int64)))
+
+
+def month_diff_expr(end_date: Column, start_date: Column) -> "pl.Expr":
+    """Vectorized `month_diff` of two date columns."""
+    import polars as pl
+
+    end, start = _col(end_date), _col(start_date)
+    whole_months = (start.dt.day() == 1) & (end.dt.offset_by("1d").dt.day() == 1)
+    return (
+        12 * (end.dt.year().cast(pl.Int64) - start.dt.year().cast(pl.Int64))
+        + (end.dt.month().cast(pl.Int64) - start.dt.month().cast(pl.Int64))
+        + whole_months.cast(pl.Int64)
+    )
+
+
+def format_months_expr(months: Column) -> "pl.Expr":
+    """Vectorized `format_months` of an integer column of months."""
+    import polars as pl
+
+    return pl.format("{} months", _col(months).cast(pl.Int64))
+
+
+def format_days_expr(start_date: Column, end_date: Column) -> "pl.Expr":
+    """Vectorized `format_days` of two date columns."""
+    import polars as pl
+
+    return pl.format("{} days", (_col(end_date) - _col(start_date)).dt.total_days())
@@ -0,0 +1,222 @@
+"""
+Memory-efficient request dupefilter for very large crawls.
+
+Scrapy's default dupefilter keeps the fingerprint of every request in a Python set, which for
+crawls with millions of requests (e.g. `dfg.de_grants`, with GEPRIS project and person pages)
+takes hundreds of MB. `BloomDupeFilter` stores them in a scalable Bloom filter instead: a few
+bytes per request, at the price of a small, configurable false-positive rate (a new request
+wrongly treated as already seen, and skipped).
+
+    DUPEFILTER_CLASS = "oic_scrape.dupefilters.BloomDupeFilter"
+    DUPEFILTER_BLOOM_ERROR_RATE = 1e-6
+
+The filter is saved to the job directory (`requests.bloom`) when a `JOBDIR` is set, so
+resumed crawls keep their seen requests, and its size is reported in the crawl stats.
+"""
+
+import logging
+import math
+import os
+import struct
+from pathlib import Path
+from typing import List, Optional
+
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.utils.job import job_dir
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over request fingerprints.
+
+    Fingerprints are already uniformly distributed hashes (SHA1 digests), so the bit positions
+    are derived from them directly by double hashing rather than by rehashing each key.
+
+    Args:
+        capacity (int): The number of items the filter is sized for.
+        error_rate (float): The false-positive rate once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: bytes):
+        h1 = int.from_bytes(fingerprint[:8], "little")
+        h2 = int.from_bytes(fingerprint[8:16], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, fingerprint: bytes) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fingerprint))
+
+    def add(self, fingerprint: bytes) -> None:
+        bits = self.bits
+        for pos in self._positions(fingerprint):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """A Bloom filter that grows as items are added, keeping the overall false-positive rate bounded.
+
+    When the current filter reaches its capacity, a new one twice as large and with a tighter
+    error rate is added. Following Almeida et al. (2007), the overall false-positive rate then
+    stays below `error_rate` however many items are added.
+
+    Args:
+        initial_capacity (int): The capacity of the first filter.
+        error_rate (float): The overall false-positive rate to stay under.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity: int = 1_000_000, error_rate: float = 1e-6):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.filters: List[BloomFilter] = []
+
+    def __contains__(self, fingerprint: bytes) -> bool:
+        return any(fingerprint in f for f in reversed(self.filters))
+
+    def add(self, fingerprint: bytes) -> None:
+        if not self.filters or self.filters[-1].is_full:
+            i = len(self.filters)
+            self.filters.append(
+                BloomFilter(
+                    capacity=self.initial_capacity * self.GROWTH**i,
+                    error_rate=self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING**i,
+                )
+            )
+        self.filters[-1].add(fingerprint)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the bit arrays."""
+        return sum(len(f.bits) for f in self.filters)
+
+    # File format: a header (initial capacity, error rate, number of filters), then for each
+    # filter its capacity, error rate, item count and bits.
+    _HEADER = struct.Struct("<QdI")
+    _FILTER = struct.Struct("<QdQ")
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(self._HEADER.pack(self.initial_capacity, self.error_rate, len(self.filters)))
+            for bf in self.filters:
+                f.write(self._FILTER.pack(bf.capacity, bf.error_rate, bf.count))
+                f.write(bf.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ScalableBloomFilter":
+        with path.open("rb") as f:
+            initial_capacity, error_rate, num_filters = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            sbf = cls(initial_capacity, error_rate)
+            for _ in range(num_filters):
+                capacity, filter_error_rate, count = cls._FILTER.unpack(f.read(cls._FILTER.size))
+                bf = BloomFilter(capacity, filter_error_rate)
+                bf.bits = bytearray(f.read(len(bf.bits)))
+                bf.count = count
+                sbf.filters.append(bf)
+        return sbf
+
+
+class BloomDupeFilter(BaseDupeFilter):
+    """Request dupefilter backed by a scalable Bloom filter.
+
+    Settings:
+        DUPEFILTER_BLOOM_CAPACITY: The number of requests the filter is initially sized for. Defaults to 1,000,000.
+        DUPEFILTER_BLOOM_ERROR_RATE: The maximum false-positive rate. Defaults to 1e-6.
+        DUPEFILTER_DEBUG: Log every filtered request rather than only the first one.
+    """
+
+    def __init__(
+        self,
+        fingerprinter,
+        path: Optional[Path] = None,
+        initial_capacity: int = 1_000_000,
+        error_rate: float = 1e-6,
+        debug: bool = False,
+        stats=None,
+    ):
+        self.fingerprinter = fingerprinter
+        self.path = path
+        self.debug = debug
+        self.stats = stats
+        self.logdupes = True
+        if path is not None and path.exists():
+            self.seen = ScalableBloomFilter.load(path)
+            logger.info("Loaded %d seen requests from %s", len(self.seen), path)
+        else:
+            self.seen = ScalableBloomFilter(initial_capacity, error_rate)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        jobdir = job_dir(settings)
+        return cls(
+            fingerprinter=crawler.request_fingerprinter,
+            path=Path(jobdir, "requests.bloom") if jobdir else None,
+            initial_capacity=settings.getint("DUPEFILTER_BLOOM_CAPACITY", 1_000_000),
+            error_rate=settings.getfloat("DUPEFILTER_BLOOM_ERROR_RATE", 1e-6),
+            debug=settings.getbool("DUPEFILTER_DEBUG"),
+            stats=crawler.stats,
+        )
+
+    def request_seen(self, request) -> bool:
+        fingerprint = self.fingerprinter.fingerprint(request)
+        if fingerprint in self.seen:
+            return True
+        num_filters = len(self.seen.filters)
+        self.seen.add(fingerprint)
+        if len(self.seen.filters) != num_filters:
+            self._update_stats()
+        return False
+
+    def _update_stats(self) -> None:
+        if self.stats is None:
+            return
+        self.stats.set_value("dupefilter/bloom/memory_bytes", self.seen.nbytes)
+        self.stats.set_value("dupefilter/bloom/filters", len(self.seen.filters))
+        self.stats.set_value("dupefilter/bloom/requests", len(self.seen))
+
+    def checkpoint(self) -> None:
+        """Saves the filter to the job directory (called periodically by the CheckpointScheduler)."""
+        if self.path is not None:
+            self.seen.save(self.path)
+
+    def close(self, reason: str) -> None:
+        self._update_stats()
+        self.checkpoint()
+
+    def log(self, request, spider) -> None:
+        if self.debug:
+            logger.debug("Filtered duplicate request: %(request)s", {"request": request}, extra={"spider": spider})
+        elif self.logdupes:
+            logger.debug(
+                "Filtered duplicate request: %(request)s - no more duplicates will be shown"
+                " (see DUPEFILTER_DEBUG to show all duplicates)",
+                {"request": request},
+                extra={"spider": spider},
+            )
+            self.logdupes = False
+        if self.stats is not None:
+            self.stats.inc_value("dupefilter/filtered", spider=spider)
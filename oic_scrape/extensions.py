@@ -0,0 +1,241 @@
+# Define here the extensions for your Scrapy project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import logging
+from typing import Dict, Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class GlobalRequestBudget:
+    """Request budget shared by every crawler running in the same process.
+
+    Caps the total number of concurrent requests granted to all download slots (across all
+    spiders) and the total request rate, which is split evenly between the active slots.
+    Every slot is granted at least one request, so the cap is only exceeded when more slots
+    are active than `max_concurrency`.
+
+    Args:
+        max_concurrency (int): The maximum sum of concurrency over all slots.
+        max_rate (float): The maximum number of requests per second over all slots. 0 disables the rate cap.
+    """
+
+    def __init__(self, max_concurrency: int, max_rate: float):
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.granted: Dict[str, int] = {}
+
+    def available(self, key: str) -> int:
+        """Returns how much extra concurrency could be granted to a slot."""
+        used = sum(c for k, c in self.granted.items() if k != key)
+        return self.max_concurrency - used - self.granted.get(key, 0)
+
+    def grant(self, key: str, concurrency: int) -> int:
+        """Grants a slot the requested concurrency, clamped to what the other slots leave.
+
+        Returns:
+            int: The concurrency granted, which the slot must not exceed.
+        """
+        used = sum(c for k, c in self.granted.items() if k != key)
+        granted = max(1, min(concurrency, self.max_concurrency - used))
+        self.granted[key] = granted
+        return granted
+
+    def release(self, key: str) -> None:
+        self.granted.pop(key, None)
+
+    def min_delay(self) -> float:
+        """Returns the delay each slot needs to keep the total rate under budget."""
+        if not self.max_rate:
+            return 0.0
+        return max(len(self.granted), 1) / self.max_rate
+
+
+class AdaptiveConcurrency:
+    """Adapts the concurrency and delay of each download slot (i.e. domain) while crawling.
+
+    Unlike AutoThrottle, which only reacts to latency, this also backs off on error
+    responses (429s and 5xx), honors `Retry-After`, and keeps all running spiders under a
+    shared request budget. Slots that respond quickly and without errors are ramped up one
+    request at a time until they reach the configured maximum or the global budget.
+
+    Every decision is recorded in the crawl stats under `adaptive_concurrency/`.
+
+    Settings:
+        ADAPTIVE_CONCURRENCY_ENABLED: Enables the extension. Defaults to False.
+        ADAPTIVE_CONCURRENCY_MAX: The maximum concurrency of a single slot. Defaults to 8.
+        ADAPTIVE_CONCURRENCY_MIN_DELAY: The lowest delay a slot can ramp down to. Defaults to 0.
+        ADAPTIVE_CONCURRENCY_MAX_DELAY: The highest delay a slot can back off to. Defaults to 60.
+        ADAPTIVE_CONCURRENCY_LATENCY_FACTOR: Latency (relative to the slot's baseline latency)
+            above which the slot is considered congested. Defaults to 2.0. The baseline follows
+            drops in latency at once and rises slowly with sustained latency, so a single fast
+            response (e.g. robots.txt) doesn't keep the slot congested.
+        ADAPTIVE_CONCURRENCY_ERROR_CODES: Status codes that cause a slot to back off. Defaults to 429 and 5xx.
+        ADAPTIVE_CONCURRENCY_GLOBAL_MAX: The maximum total concurrency over all spiders in the process. Defaults to 32.
+        ADAPTIVE_CONCURRENCY_GLOBAL_RATE: The maximum total requests per second over all spiders
+            in the process. Defaults to 0 (unlimited).
+    """
+
+    # Shared between every crawler of the process, e.g. when running several spiders with
+    # CrawlerProcess. It is created with the settings of the first crawler, and dropped when the
+    # last one closes, so that later crawls of the process start with a fresh budget.
+    budget: Optional[GlobalRequestBudget] = None
+    _crawlers = 0
+    # How fast the baseline latency rises towards higher latencies
+    BASELINE_RISE = 0.05
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        if settings.getbool("AUTOTHROTTLE_ENABLED"):
+            logger.warning(
+                "AdaptiveConcurrency is disabled because AUTOTHROTTLE_ENABLED is set, "
+                "both extensions would compete to set download delays."
+            )
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MAX", 8)
+        self.min_delay = settings.getfloat("ADAPTIVE_CONCURRENCY_MIN_DELAY", 0.0)
+        self.max_delay = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_DELAY", 60.0)
+        self.latency_factor = settings.getfloat("ADAPTIVE_CONCURRENCY_LATENCY_FACTOR", 2.0)
+        self.error_codes = {
+            int(code)
+            for code in settings.getlist(
+                "ADAPTIVE_CONCURRENCY_ERROR_CODES",
+                [429, 500, 502, 503, 504, 520, 521, 522, 524],
+            )
+        }
+
+        if AdaptiveConcurrency.budget is None:
+            AdaptiveConcurrency.budget = GlobalRequestBudget(
+                max_concurrency=settings.getint("ADAPTIVE_CONCURRENCY_GLOBAL_MAX", 32),
+                max_rate=settings.getfloat("ADAPTIVE_CONCURRENCY_GLOBAL_RATE", 0.0),
+            )
+        AdaptiveConcurrency._crawlers += 1
+
+        # Per-slot state: smoothed latency, baseline latency, and successes since the last change
+        self.latency: Dict[str, float] = {}
+        self.baseline_latency: Dict[str, float] = {}
+        self.successes: Dict[str, int] = {}
+
+        crawler.signals.connect(self.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _budget_key(self, key: str) -> str:
+        # Slot keys are only unique within a crawler
+        return f"{self.crawler.spider.name}:{key}"
+
+    def response_downloaded(self, response, request, spider):
+        key = request.meta.get("download_slot")
+        slot = self.crawler.engine.downloader.slots.get(key)
+        latency = request.meta.get("download_latency")
+        if slot is None or latency is None:
+            return
+
+        if key not in self.latency:
+            self.latency[key] = latency
+            self.baseline_latency[key] = latency
+            self.successes[key] = 0
+        else:
+            self.latency[key] = 0.7 * self.latency[key] + 0.3 * latency
+            baseline = self.baseline_latency[key]
+            if latency < baseline:
+                self.baseline_latency[key] = latency
+            else:
+                self.baseline_latency[key] = baseline + self.BASELINE_RISE * (latency - baseline)
+        # Other slots may have taken the budget since the last grant
+        self._grant(key, slot)
+
+        if response.status in self.error_codes:
+            self.stats.inc_value("adaptive_concurrency/error_responses", spider=spider)
+            self._back_off(key, slot, spider, self._retry_after(response))
+        elif self.latency[key] > self.baseline_latency[key] * self.latency_factor:
+            self._ease_off(key, slot, spider)
+        else:
+            self._ramp_up(key, slot, spider)
+
+        # The fair share of the global rate depends on how many slots are active
+        slot.delay = max(slot.delay, self.budget.min_delay())
+
+        self.stats.set_value(f"adaptive_concurrency/{key}/concurrency", slot.concurrency, spider=spider)
+        self.stats.set_value(f"adaptive_concurrency/{key}/delay", round(slot.delay, 3), spider=spider)
+        self.stats.set_value(
+            f"adaptive_concurrency/{key}/latency", round(self.latency[key], 3), spider=spider
+        )
+
+    def _grant(self, key, slot) -> None:
+        """Clamps the slot's concurrency to what the global budget grants it."""
+        slot.concurrency = self.budget.grant(self._budget_key(key), slot.concurrency)
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value else None
+        except ValueError:
+            # HTTP-date values are rare on the APIs we crawl, fall back to exponential backoff
+            return None
+
+    def _back_off(self, key, slot, spider, retry_after: Optional[float]):
+        """Multiplicative decrease on errors: halve the concurrency and double the delay."""
+        slot.concurrency = max(1, slot.concurrency // 2)
+        slot.delay = min(self.max_delay, max(slot.delay * 2, 0.5, retry_after or 0))
+        self.successes[key] = 0
+        self._grant(key, slot)
+        self.stats.inc_value(f"adaptive_concurrency/{key}/decreases", spider=spider)
+        logger.debug(
+            "Backing off %s: concurrency=%d delay=%.2f", key, slot.concurrency, slot.delay
+        )
+
+    def _ease_off(self, key, slot, spider):
+        """Gentle decrease when latency climbs: the server is slowing down, but not failing."""
+        self.successes[key] = 0
+        if slot.concurrency > 1:
+            slot.concurrency -= 1
+        else:
+            slot.delay = min(self.max_delay, max(slot.delay * 1.5, 0.25))
+        self._grant(key, slot)
+        self.stats.inc_value(f"adaptive_concurrency/{key}/decreases", spider=spider)
+        logger.debug(
+            "Latency rising on %s (%.2fs): concurrency=%d delay=%.2f",
+            key,
+            self.latency[key],
+            slot.concurrency,
+            slot.delay,
+        )
+
+    def _ramp_up(self, key, slot, spider):
+        """Additive increase: after a full round of healthy responses, shorten the delay or add a request."""
+        self.successes[key] += 1
+        if self.successes[key] < slot.concurrency:
+            return
+        self.successes[key] = 0
+
+        if slot.delay > self.min_delay:
+            slot.delay = max(self.min_delay, slot.delay * 0.75)
+        elif slot.concurrency < self.max_concurrency and self.budget.available(self._budget_key(key)) > 0:
+            slot.concurrency += 1
+            self._grant(key, slot)
+        else:
+            return
+
+        self.stats.inc_value(f"adaptive_concurrency/{key}/increases", spider=spider)
+        logger.debug("Ramping up %s: concurrency=%d delay=%.2f", key, slot.concurrency, slot.delay)
+
+    def spider_closed(self, spider):
+        for key in self.latency:
+            self.budget.release(self._budget_key(key))
+        AdaptiveConcurrency._crawlers -= 1
+        if AdaptiveConcurrency._crawlers == 0:
+            AdaptiveConcurrency.budget = None
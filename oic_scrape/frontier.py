@@ -0,0 +1,376 @@
+"""
+A crawl frontier that can be shared by several Scrapy worker processes or machines.
+
+Very large crawls (e.g. `dfg.de_grants`, with hundreds of thousands of GEPRIS project pages)
+are limited by what one scheduler on one machine can fetch. With the frontier scheduler,
+every worker pushes the requests it discovers into a shared queue and pulls its next request
+from it, while a shared dupefilter makes sure each page is only fetched once overall.
+
+The queue lives in a backend:
+
+- `RedisFrontierBackend` stores it in Redis (or anything that speaks the Redis protocol),
+  so workers on different machines can share it.
+- `LocalFrontierBackend` keeps it in memory, for single-process runs and for testing.
+
+To use it, point all workers at the same backend:
+
+    SCHEDULER = "oic_scrape.frontier.FrontierScheduler"
+    DUPEFILTER_CLASS = "oic_scrape.frontier.FrontierDupeFilter"
+    SPIDER_MIDDLEWARES = {"oic_scrape.frontier.FrontierSeedMiddleware": 50}
+    FRONTIER_URL = "redis://localhost:6379/0"
+
+    $ poetry run scrapy crawl dfg.de_grants -s FRONTIER_URL=redis://queue:6379/0 -O data/dfg-worker1.jsonl
+
+Each worker writes its own output, which are then merged deterministically with:
+
+    $ poetry run python -m oic_scrape.frontier merge data/dfg.de_grants.jsonl data/dfg-worker*.jsonl
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import pickle
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+class FrontierBackend(ABC):
+    """Storage for a shared frontier: priority queues of serialized requests and sets of fingerprints."""
+
+    @abstractmethod
+    def push(self, key: str, data: bytes, priority: int = 0) -> None:
+        """Adds a serialized request to a queue. Higher priorities are popped first."""
+
+    @abstractmethod
+    def pop(self, key: str) -> Optional[bytes]:
+        """Removes and returns the next serialized request of a queue, or None if it is empty."""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Returns the number of requests in a queue."""
+
+    @abstractmethod
+    def add_fingerprint(self, key: str, fingerprint: str) -> bool:
+        """Adds a fingerprint to a set. Returns True if it was not in the set yet."""
+
+    @abstractmethod
+    def clear(self, *keys: str) -> None:
+        """Removes queues or fingerprint sets."""
+
+    @classmethod
+    def from_url(cls, url: str) -> "FrontierBackend":
+        """
+        Creates a backend from a URL.
+
+        Args:
+            url (str): Either `local://<name>` for an in-process backend or a `redis://` / `rediss://` URL.
+
+        Returns:
+            FrontierBackend: The backend.
+
+        Raises:
+            ValueError: If the URL scheme is not supported.
+        """
+        if url.startswith("local://"):
+            return LocalFrontierBackend.named(url[len("local://"):])
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            return RedisFrontierBackend.from_url(url)
+        raise ValueError(f"Unsupported FRONTIER_URL: {url}")
+
+
+class LocalFrontierBackend(FrontierBackend):
+    """In-process backend, shared by all crawlers of the process that use the same name."""
+
+    _instances: Dict[str, "LocalFrontierBackend"] = {}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues: Dict[str, List[Tuple[int, int, bytes]]] = {}
+        self._sets: Dict[str, Set[str]] = {}
+        self._counter = itertools.count()
+
+    @classmethod
+    def named(cls, name: str) -> "LocalFrontierBackend":
+        if name not in cls._instances:
+            cls._instances[name] = cls()
+        return cls._instances[name]
+
+    def push(self, key, data, priority=0):
+        with self._lock:
+            # The counter keeps requests of equal priority in FIFO order
+            heapq.heappush(self._queues.setdefault(key, []), (-priority, next(self._counter), data))
+
+    def pop(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            return heapq.heappop(queue)[2] if queue else None
+
+    def size(self, key):
+        return len(self._queues.get(key, ()))
+
+    def add_fingerprint(self, key, fingerprint):
+        with self._lock:
+            seen = self._sets.setdefault(key, set())
+            if fingerprint in seen:
+                return False
+            seen.add(fingerprint)
+            return True
+
+    def clear(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._queues.pop(key, None)
+                self._sets.pop(key, None)
+
+
+class RedisFrontierBackend(FrontierBackend):
+    """Redis backend. Queues are sorted sets popped with ZPOPMIN, fingerprints are sets.
+
+    Args:
+        client: A client for Redis or any server speaking the Redis protocol
+            (e.g. a `redis.Redis` or `fakeredis.FakeRedis` instance).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisFrontierBackend":
+        try:
+            import redis
+        except ImportError:
+            raise ImportError(
+                "The redis package is required for a redis:// FRONTIER_URL (`poetry add redis`)."
+            ) from None
+        return cls(redis.Redis.from_url(url))
+
+    def push(self, key, data, priority=0):
+        # Members must be unique and sort FIFO within a priority, so prefix them with a sequence number
+        seq = self.client.incr(f"{key}:seq")
+        self.client.zadd(key, {b"%020d:" % seq + data: -priority})
+
+    def pop(self, key):
+        popped = self.client.zpopmin(key)
+        if not popped:
+            return None
+        member, _ = popped[0]
+        return member.split(b":", 1)[1]
+
+    def size(self, key):
+        return self.client.zcard(key)
+
+    def add_fingerprint(self, key, fingerprint):
+        return bool(self.client.sadd(key, fingerprint))
+
+    def clear(self, *keys):
+        if keys:
+            self.client.delete(*keys, *(f"{key}:seq" for key in keys))
+
+
+def _frontier_key(settings, spider, suffix: str) -> str:
+    return f"{settings.get('FRONTIER_KEY_PREFIX', 'oic_scrape')}:{spider.name}:{suffix}"
+
+
+class FrontierDupeFilter(BaseDupeFilter):
+    """Request fingerprint filter stored in the shared frontier backend."""
+
+    def __init__(self, backend: FrontierBackend, fingerprinter, settings, stats=None):
+        self.backend = backend
+        self.fingerprinter = fingerprinter
+        self.settings = settings
+        self.stats = stats
+        self.key: Optional[str] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        backend = FrontierBackend.from_url(crawler.settings.get("FRONTIER_URL", "local://default"))
+        return cls(backend, crawler.request_fingerprinter, crawler.settings, crawler.stats)
+
+    def open(self):
+        # The key depends on the spider, which the scheduler sets before opening the filter
+        pass
+
+    def bind(self, spider) -> None:
+        self.key = _frontier_key(self.settings, spider, "seen")
+
+    def request_seen(self, request) -> bool:
+        fingerprint = self.fingerprinter.fingerprint(request).hex()
+        return not self.backend.add_fingerprint(self.key, fingerprint)
+
+    def log(self, request, spider):
+        if self.stats:
+            self.stats.inc_value("frontier/filtered", spider=spider)
+
+
+class FrontierSeedMiddleware:
+    """Spider middleware marking start requests, so only one worker's seeds enter the frontier.
+
+    Start requests are usually `dont_filter=True`, which would make every worker that joins
+    the crawl add the seeds again. The mark only applies to the first scheduling of a seed:
+    retries and other re-schedulings of it (which copy its `meta`) are not deduplicated.
+    """
+
+    def process_start_requests(self, start_requests, spider):
+        for request in start_requests:
+            request.meta["frontier_seed"] = True
+            yield request
+
+
+class FrontierScheduler(BaseScheduler):
+    """Scheduler pushing and pulling requests through a shared frontier backend.
+
+    Settings:
+        FRONTIER_URL: The backend URL, `local://<name>` or `redis://...`. Defaults to `local://default`.
+        FRONTIER_KEY_PREFIX: Prefix of the backend keys. Defaults to `oic_scrape`.
+        FRONTIER_IDLE_TIMEOUT: Seconds a worker keeps polling an empty frontier before it closes,
+            as other workers may still be adding requests. Defaults to 30.
+        FRONTIER_FLUSH_ON_START: Clear the queue and fingerprints when opening. Defaults to False.
+    """
+
+    def __init__(self, crawler, backend: FrontierBackend, dupefilter):
+        self.crawler = crawler
+        self.backend = backend
+        self.df = dupefilter
+        self.stats = crawler.stats
+        self.idle_timeout = crawler.settings.getfloat("FRONTIER_IDLE_TIMEOUT", 30)
+        self.flush_on_start = crawler.settings.getbool("FRONTIER_FLUSH_ON_START")
+        self.idle_since: Optional[float] = None
+        self.spider = None
+        self.queue_key: Optional[str] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        backend = FrontierBackend.from_url(settings.get("FRONTIER_URL", "local://default"))
+        dupefilter_cls = load_object(settings["DUPEFILTER_CLASS"])
+        if issubclass(dupefilter_cls, FrontierDupeFilter):
+            dupefilter = dupefilter_cls(backend, crawler.request_fingerprinter, settings, crawler.stats)
+        else:
+            dupefilter = dupefilter_cls.from_crawler(crawler)
+        scheduler = cls(crawler, backend, dupefilter)
+        crawler.signals.connect(scheduler.spider_idle, signal=signals.spider_idle)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        self.queue_key = _frontier_key(self.crawler.settings, spider, "requests")
+        if isinstance(self.df, FrontierDupeFilter):
+            self.df.bind(spider)
+            if self.flush_on_start:
+                self.backend.clear(self.queue_key, self.df.key)
+        return self.df.open()
+
+    def close(self, reason):
+        return self.df.close(reason)
+
+    def has_pending_requests(self) -> bool:
+        return self.backend.size(self.queue_key) > 0
+
+    def enqueue_request(self, request) -> bool:
+        # Seeds are deduplicated once: the mark is dropped so their retries get through
+        filtered = request.meta.pop("frontier_seed", False) or not request.dont_filter
+        if filtered and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+        data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        self.backend.push(self.queue_key, data, request.priority)
+        self.stats.inc_value("frontier/enqueued", spider=self.spider)
+        return True
+
+    def next_request(self):
+        data = self.backend.pop(self.queue_key)
+        if data is None:
+            return None
+        self.idle_since = None
+        self.stats.inc_value("frontier/dequeued", spider=self.spider)
+        return request_from_dict(pickle.loads(data), spider=self.spider)
+
+    def spider_idle(self, spider):
+        # An empty frontier doesn't mean the crawl is over: other workers may still be
+        # parsing responses that add requests. Keep polling until the timeout.
+        now = time.monotonic()
+        if self.idle_since is None:
+            self.idle_since = now
+        if now - self.idle_since < self.idle_timeout:
+            raise DontCloseSpider
+
+
+def merge_outputs(inputs: List[str], output: str, key: str = "grant_id") -> int:
+    """
+    Merges the JSON Lines outputs of several workers into one deterministic file.
+
+    Records are deduplicated by `key` (a page fetched by two workers before the dupefilter
+    caught it keeps a single record) and written sorted by `key`, so the merged file
+    doesn't depend on which worker crawled which page or in which order. Records without
+    `key` are skipped, with a warning.
+
+    Args:
+        inputs (List[str]): Paths of the worker outputs.
+        output (str): Path of the merged output.
+        key (str, optional): The field identifying a record. Defaults to "grant_id".
+
+    Returns:
+        int: The number of records written.
+    """
+    records: Dict[str, str] = {}
+    for path in inputs:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get(key) is None:
+                    logger.warning("%s:%d: skipping record without %r", path, line_number, key)
+                    continue
+                canonical = json.dumps(record, sort_keys=True, ensure_ascii=False)
+                existing = records.get(record[key])
+                # Pick the same duplicate whatever the input order
+                if existing is None or canonical < existing:
+                    records[record[key]] = canonical
+
+    with open(output, "w", encoding="utf-8") as f:
+        for record_key in sorted(records):
+            f.write(records[record_key] + "\n")
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Crawl frontier utilities.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge = subparsers.add_parser("merge", help="Merge worker outputs into one deterministic file")
+    merge.add_argument("output")
+    merge.add_argument("inputs", nargs="+")
+    merge.add_argument("--key", default="grant_id")
+
+    clear = subparsers.add_parser("clear", help="Remove a spider's queue and fingerprints from a backend")
+    clear.add_argument("url")
+    clear.add_argument("spider")
+    clear.add_argument("--prefix", default="oic_scrape")
+
+    args = parser.parse_args(argv)
+    if args.command == "merge":
+        count = merge_outputs(args.inputs, args.output, args.key)
+        print(f"Wrote {count} records to {args.output}")
+    elif args.command == "clear":
+        backend = FrontierBackend.from_url(args.url)
+        backend.clear(f"{args.prefix}:{args.spider}:requests", f"{args.prefix}:{args.spider}:seen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
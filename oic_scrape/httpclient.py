@@ -0,0 +1,264 @@
+"""
+The HTTP client of the pipelines that don't go through Scrapy (e.g. the bulk sources).
+
+Scrapy handles connection pooling, throttling, retries and caching for the spiders. This
+module gives the same to plain `requests` code, so that each pipeline doesn't build its own
+session:
+
+- Keep-alive connections are pooled per host (`pool_size` connections each), and requests
+  wait for a free connection rather than opening extra ones.
+- Each host can be limited to a number of requests per second by a token bucket, shared by
+  all the threads and coroutines using the client.
+- Connection errors and 429/5xx responses are retried with exponential backoff and random
+  jitter (so that concurrent requests don't retry in lockstep), honoring `Retry-After`.
+- Responses can be cached on disk with `requests-cache` (for development use only).
+- The latency of the requests to each host is recorded in `client.metrics`.
+
+`HttpClient` is a `requests.Session`, so it can be used anywhere a session is expected.
+Coroutines can use `arequest()`, which waits for the rate limit without blocking the event
+loop and runs the request in a worker thread.
+
+Example:
+
+    >>> client = build_client(rate_limits={"api.reporter.nih.gov": 1.0}, pool_size=4)
+    >>> response = await client.arequest("POST", url, json=payload)
+    >>> client.metrics.summary()
+    {'api.reporter.nih.gov': {'requests': 12, 'errors': 0, 'mean_ms': 850.2, 'p50_ms': 790.0, ...}}
+"""
+
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120  # Seconds to wait for a connection or for data, when not given
+DEFAULT_CACHE_PATH = "cache.sqlite"
+
+
+class TokenBucket:
+    """Limits the rate of an operation, allowing short bursts. Thread-safe.
+
+    A caller reserves a token and waits for the returned delay before proceeding, which works
+    the same from threads (`acquire`) and coroutines (`acquire_async`).
+
+    Args:
+        rate (float): The sustained number of operations per second. 0 disables the limit.
+        capacity (float, optional): The maximum burst size. Defaults to 1.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token, returning how many seconds to wait before it can be used."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens go negative when reserved ahead, so later callers wait longer
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0.0)
+
+    def acquire(self) -> None:
+        time.sleep(self.reserve())
+
+    async def acquire_async(self) -> None:
+        await asyncio.sleep(self.reserve())
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """The `percent` percentile of sorted values (nearest rank)."""
+    return values[max(round(percent / 100 * len(values)) - 1, 0)]
+
+
+class RequestMetrics:
+    """Counts the requests to each host, their statuses and their latency. Thread-safe.
+
+    The latency of a request is the time until its response is received (its headers, for
+    streamed responses), including retries.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, host: str, seconds: float, status: Optional[int] = None) -> None:
+        """Records a request, with its status or None if it failed without a response."""
+        with self._lock:
+            self.latencies[host].append(seconds)
+            if status is None:
+                self.errors[host] += 1
+            else:
+                self.statuses[host][status] += 1
+
+    @property
+    def count(self) -> int:
+        """The number of requests made to all hosts."""
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the number of requests, failures and latency percentiles (in ms) by host."""
+        with self._lock:
+            summary = {}
+            for host, latencies in self.latencies.items():
+                ms = sorted(seconds * 1000 for seconds in latencies)
+                summary[host] = {
+                    "requests": len(ms),
+                    "errors": self.errors[host],
+                    "statuses": dict(self.statuses[host]),
+                    "mean_ms": round(statistics.fmean(ms), 1),
+                    "p50_ms": round(_percentile(ms, 50), 1),
+                    "p95_ms": round(_percentile(ms, 95), 1),
+                    "max_ms": round(ms[-1], 1),
+                }
+            return summary
+
+
+class HttpClient(requests.Session):
+    """A session with per-host rate limits, a default timeout and latency metrics.
+
+    Use `build_client()` to also configure connection pooling and retries.
+
+    Args:
+        rate_limits (Dict[str, float], optional): The maximum requests per second by host name.
+        default_rate (float, optional): The maximum requests per second to other hosts. Defaults to 0 (no limit).
+        timeout (float, optional): The timeout of requests made without one. Defaults to 120 seconds.
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, float]] = None,
+        default_rate: float = 0,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+    ):
+        super().__init__()
+        self.rate_limits = rate_limits or {}
+        self.default_rate = default_rate
+        self.timeout = timeout
+        self.metrics = RequestMetrics()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        """Returns the token bucket limiting the requests to a host."""
+        with self._buckets_lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate_limits.get(host, self.default_rate))
+            return self._buckets[host]
+
+    def _send(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        host = urlsplit(url).hostname or ""
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(host, time.monotonic() - start)
+            raise
+        self.metrics.record(host, time.monotonic() - start, response.status_code)
+        return response
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        """Sends a request once the host's rate limit allows it (see `requests.Session.request`)."""
+        self.bucket(urlsplit(url).hostname or "").acquire()
+        return self._send(method, url, *args, **kwargs)
+
+    async def arequest(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Sends a request from a coroutine, waiting for the rate limit without blocking the event loop.
+
+        The request itself runs in a worker thread. Concurrency is bounded by the connection
+        pool; callers can bound it further with their own semaphore.
+        """
+        await self.bucket(urlsplit(url).hostname or "").acquire_async()
+        return await asyncio.to_thread(self._send, method, url, **kwargs)
+
+    async def aget(self, url: str, **kwargs: Any) -> requests.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs: Any) -> requests.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+
+def build_retry(retries: int = 5, backoff_factor: float = 1.5, jitter: float = 1.0) -> Retry:
+    """Returns the retry policy of the clients: connection errors and 429/5xx responses.
+
+    Args:
+        retries (int, optional): The number of retries. Defaults to 5.
+        backoff_factor (float, optional): The exponential backoff factor, in seconds. Defaults to 1.5.
+        jitter (float, optional): The maximum random delay added to each backoff, in seconds. Defaults to 1.
+    """
+    return Retry(
+        connect=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=jitter,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,  # Retry POST search requests too
+        respect_retry_after_header=True,
+    )
+
+
+def build_client(
+    rate_limits: Optional[Dict[str, float]] = None,
+    default_rate: float = 0,
+    pool_size: int = 10,
+    retries: int = 5,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    use_cache: bool = False,
+    cache_path: str = DEFAULT_CACHE_PATH,
+) -> HttpClient:
+    """Returns an HTTP client with pooled connections, rate limits and retries.
+
+    Args:
+        rate_limits (Dict[str, float], optional): The maximum requests per second by host name.
+        default_rate (float, optional): The maximum requests per second to other hosts. Defaults to 0 (no limit).
+        pool_size (int, optional): The number of keep-alive connections per host. Defaults to 10.
+        retries (int, optional): The number of retries of failed requests. Defaults to 5.
+        timeout (float, optional): The timeout of requests made without one. Defaults to 120 seconds.
+        use_cache (bool, optional): Cache responses on disk (development use only). Defaults to False.
+        cache_path (str, optional): The SQLite file of the cache. Defaults to `cache.sqlite`.
+
+    Returns:
+        HttpClient: The client.
+    """
+    client_cls = HttpClient
+    kwargs: Dict[str, Any] = {}
+    if use_cache:
+        # requests-cache is a development dependency
+        from requests_cache import CacheMixin
+
+        class CachedHttpClient(CacheMixin, HttpClient):
+            pass
+
+        client_cls = CachedHttpClient
+        kwargs = {
+            "cache_name": cache_path,
+            "backend": "sqlite",
+            "allowable_methods": ("GET", "POST"),
+            "allowable_codes": (200, 404),
+        }
+
+    client = client_cls(rate_limits=rate_limits, default_rate=default_rate, timeout=timeout, **kwargs)
+    # Blocks when all the connections to a host are in use, instead of opening unpooled ones
+    adapter = HTTPAdapter(max_retries=build_retry(retries), pool_maxsize=pool_size, pool_block=True)
+    client.mount("http://", adapter)
+    client.mount("https://", adapter)
+    return client
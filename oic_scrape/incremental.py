@@ -0,0 +1,97 @@
+"""
+What incremental crawls remember of the previous runs, and when they record it.
+
+Incremental spiders (`oic_scrape.sitemaps`, `oic_scrape.listings`) keep a value for each page or
+listing entry they processed (its `<lastmod>`, or a fingerprint of the listing data) in a
+`PersistedStore`, a JSON file under `.scrapy/` loaded when the spider starts and saved when it
+closes. They then skip what didn't change since.
+
+A page only counts as processed once its callback has run to completion: requests carry the key
+and value to record in their meta (`record_meta()`), and `IncrementalRecordMiddleware` records them
+after the callback's last output has been yielded. A callback that raises leaves the page
+unrecorded, so it is fetched again on the next run.
+
+    yield Request(url, callback=self.parse_grant, meta=record_meta(url, lastmod))
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from scrapy import signals
+from scrapy.utils.project import data_path
+
+RECORD_META_KEY = "incremental_record"
+
+
+class PersistedStore:
+    """Values by key (e.g. the `<lastmod>` of each page URL), stored as JSON.
+
+    Args:
+        path (Path): The JSON file the values are loaded from and saved to.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.values: Dict[str, str] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                self.values = json.load(f)
+
+    @classmethod
+    def for_spider(cls, directory: str, spider_name: str) -> "PersistedStore":
+        """Returns the store of a spider, in `.scrapy/<directory>/<spider_name>.json`."""
+        return cls(Path(data_path(directory, createdir=True)) / f"{spider_name}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        return self.values.get(key)
+
+    def record(self, key: str, value: str) -> None:
+        self.values[key] = value
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.values, f)
+        os.replace(tmp_path, self.path)
+
+
+def record_meta(key: str, value: str) -> dict:
+    """Returns request meta recording `value` under `key` once the response has been parsed."""
+    return {RECORD_META_KEY: (key, value)}
+
+
+class IncrementalRecordMiddleware:
+    """Spider middleware recording the pages of incremental spiders once they have been parsed.
+
+    The key and value in the meta of a request (see `record_meta()`) are recorded in the
+    spider's `incremental_store` after its callback has yielded its last result, and only for a
+    200 response. Every spider's store is saved when the spider closes.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls()
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def _record(self, response, spider):
+        record = response.meta.get(RECORD_META_KEY)
+        store = getattr(spider, "incremental_store", None)
+        if record and store is not None and response.status == 200:
+            store.record(*record)
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self._record(response, spider)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for r in result:
+            yield r
+        self._record(response, spider)
+
+    def spider_closed(self, spider, reason):
+        store = getattr(spider, "incremental_store", None)
+        if store is not None:
+            store.save()
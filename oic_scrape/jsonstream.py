@@ -0,0 +1,140 @@
+"""
+Iterative extraction of the elements of a JSON array nested in a large response.
+
+Some endpoints return every grant in a single response (Kress' datatable with
+`iDisplayLength: -1`, NASA's search API pages). `json.loads(response.text)` first decodes the
+whole body to text and then builds the object tree of the whole payload, so peak memory is a
+multiple of the response size. `iter_json_array()` scans the body bytes instead, skipping over
+everything outside the array it is asked for, and decodes the array elements one at a time:
+
+    for grant in iter_json_array(response.body, ["Datatable", "aaData"]):
+        ...
+
+Only one element is decoded at a time, so beyond the body itself, memory is proportional to a
+single grant. The scan is done in Python, so it is several times slower than `json.loads`: use it
+for responses large enough for memory to matter.
+"""
+
+import json
+import re
+from typing import Any, Iterator, Sequence
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+# Strings are matched as a whole, so the brackets inside them are skipped
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.DOTALL)
+
+
+class JSONStreamError(ValueError):
+    """Raised when the document is not valid JSON, or doesn't have an array at the given path."""
+
+
+class _Scanner:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def skip_whitespace(self) -> None:
+        self.pos = _WHITESPACE.match(self.data, self.pos).end()
+
+    def peek(self) -> bytes:
+        self.skip_whitespace()
+        return self.data[self.pos : self.pos + 1]
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char:
+            raise JSONStreamError(f"Expected {char.decode()!r} at position {self.pos}")
+        self.pos += 1
+
+    def read_string(self) -> str:
+        self.skip_whitespace()
+        match = _STRING.match(self.data, self.pos)
+        if match is None:
+            raise JSONStreamError(f"Expected a string at position {self.pos}")
+        self.pos = match.end()
+        return json.loads(match.group())
+
+    def skip_value(self) -> None:
+        """Moves past the value at the current position without decoding it."""
+        char = self.peek()
+        if char == b'"':
+            self.read_string()
+        elif char in (b"{", b"["):
+            depth = 0
+            for match in _TOKEN.finditer(self.data, self.pos):
+                token = match.group()
+                if token in (b"{", b"["):
+                    depth += 1
+                elif token in (b"}", b"]"):
+                    depth -= 1
+                    if depth == 0:
+                        self.pos = match.end()
+                        return
+            raise JSONStreamError("Unexpected end of document")
+        else:
+            match = _SCALAR.match(self.data, self.pos)
+            if match is None:
+                raise JSONStreamError(f"Expected a value at position {self.pos}")
+            self.pos = match.end()
+
+    def find_key(self, key: str) -> bool:
+        """Moves to the value of `key` in the object at the current position."""
+        self.expect(b"{")
+        if self.peek() == b"}":
+            return False
+        while True:
+            name = self.read_string()
+            self.expect(b":")
+            if name == key:
+                return True
+            self.skip_value()
+            if self.peek() == b",":
+                self.pos += 1
+            else:
+                self.expect(b"}")
+                return False
+
+
+def iter_json_array(data: bytes, path: Sequence[str] = ()) -> Iterator[Any]:
+    """Yields the decoded elements of the JSON array at `path` in a document, one at a time.
+
+    Args:
+        data (bytes): The JSON document, e.g. `response.body`.
+        path (Sequence[str], optional): The object keys leading to the array. Defaults to the
+            document itself being the array.
+
+    Yields:
+        Any: Each element of the array, decoded with `json.loads`.
+
+    Raises:
+        JSONStreamError: If the document is invalid, or there is no array at `path`. A missing
+            key or a `null` array yields nothing instead.
+    """
+    scanner = _Scanner(data)
+    for key in path:
+        if scanner.peek() == b"n":
+            # A null parent (e.g. `"hits": null`), there's nothing to yield
+            return
+        if not scanner.find_key(key):
+            return
+
+    char = scanner.peek()
+    if char == b"n":
+        return
+    if char != b"[":
+        raise JSONStreamError(f"Expected an array at {'.'.join(path) or 'the document root'}")
+    scanner.pos += 1
+    if scanner.peek() == b"]":
+        return
+
+    while True:
+        scanner.skip_whitespace()
+        start = scanner.pos
+        scanner.skip_value()
+        yield json.loads(data[start : scanner.pos])
+        if scanner.peek() == b",":
+            scanner.pos += 1
+        else:
+            scanner.expect(b"]")
+            return
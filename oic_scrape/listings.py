@@ -0,0 +1,83 @@
+"""
+Incremental crawls of spiders getting their grant listing in one go.
+
+Some funders publish all their grants in a single listing payload (a JSON API, or JSON embedded
+in a page) and the spider then does per-grant work: fetching a detail page, building the item.
+`IncrementalListingSpider` hashes each listing entry and remembers the hashes of the previous
+run in `.scrapy/listing_fingerprints/<spider_name>.json`, so that in incremental mode only the
+entries that are new or whose listing data changed get processed.
+
+Incremental mode is enabled with the `LISTING_INCREMENTAL` setting. As unchanged grants are
+skipped, append to the previous output (`-o`) rather than overwriting it (`-O`):
+
+    $ poetry run scrapy crawl dorisduke.org_grants -s LISTING_INCREMENTAL=True -o data/dorisduke.org_grants.jsonl
+"""
+
+import hashlib
+import json
+import logging
+
+import scrapy
+
+from oic_scrape.incremental import PersistedStore, record_meta
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_entry(entry) -> str:
+    """Returns a stable hash of a (JSON-serializable) listing entry."""
+    canonical = json.dumps(entry, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class ListingFingerprintStore(PersistedStore):
+    """The fingerprint of each listing entry processed during previous runs."""
+
+    def is_changed(self, key: str, fingerprint: str) -> bool:
+        """Returns True if the entry is new or its fingerprint differs from the one recorded."""
+        return self.get(key) != fingerprint
+
+
+class IncrementalListingSpider(scrapy.Spider):
+    """Spider skipping the listing entries that did not change since the previous runs.
+
+    Spiders call `listing_entry_changed()` for each entry before processing it. An entry is
+    recorded as processed either with `record_listing_entry()` (when its item is built from the
+    listing, after yielding it), or once the callback of a request carrying `listing_meta()` in
+    its meta has parsed a 200 response (when a detail page has to be fetched, see
+    `oic_scrape.incremental`).
+
+    Settings:
+        LISTING_INCREMENTAL: Only process listing entries that are new or changed since the
+            previous runs. Defaults to False.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.incremental_store = ListingFingerprintStore.for_spider("listing_fingerprints", spider.name)
+        spider.listing_incremental = crawler.settings.getbool("LISTING_INCREMENTAL")
+        return spider
+
+    def listing_entry_changed(self, key: str, entry) -> bool:
+        """Returns True if the entry needs to be processed: it is new, changed, or incremental mode is off.
+
+        Args:
+            key (str): A stable identifier of the entry, e.g. the grant id or URL.
+            entry: The listing data of the entry.
+        """
+        stats = self.crawler.stats
+        stats.inc_value("listing/entries", spider=self)
+        if self.listing_incremental and not self.incremental_store.is_changed(key, fingerprint_entry(entry)):
+            stats.inc_value("listing/unchanged", spider=self)
+            return False
+        stats.inc_value("listing/changed", spider=self)
+        return True
+
+    def record_listing_entry(self, key: str, entry) -> None:
+        """Records an entry as processed."""
+        self.incremental_store.record(key, fingerprint_entry(entry))
+
+    def listing_meta(self, key: str, entry) -> dict:
+        """Returns request meta recording the entry as processed once its response has been parsed."""
+        return record_meta(key, fingerprint_entry(entry))
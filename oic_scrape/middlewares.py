@@ -3,7 +3,7 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+from scrapy import Request, signals
 
 # useful for handling different item types with a single interface
 # from itemadapter import is_item, ItemAdapter
@@ -99,3 +99,47 @@ class OiCatalogScrapingPipelineDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class LeafFirstPriorityMiddleware:
+    """Gives requests for detail (leaf) pages a higher priority than listing pages.
+
+    Listing callbacks are the ones that expand the crawl: pagination, search results,
+    sitemaps. By default these are `parse` and `_parse_sitemap`, and spiders can name
+    others in a `listing_callbacks` attribute. Any other callback is considered a detail
+    page, and its requests get `SCHEDULER_LEAF_PRIORITY` added to their priority, so the
+    scheduler drains them before fetching more listing pages.
+    """
+
+    default_listing_callbacks = ("parse", "_parse_sitemap")
+
+    def __init__(self, leaf_priority: int):
+        self.leaf_priority = leaf_priority
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getint("SCHEDULER_LEAF_PRIORITY", 100))
+
+    def _is_listing(self, request, spider) -> bool:
+        callback = request.callback
+        if callback is None:
+            name = "parse"
+        elif isinstance(callback, str):
+            name = callback
+        else:
+            name = getattr(callback, "__name__", "")
+        listing = set(self.default_listing_callbacks) | set(getattr(spider, "listing_callbacks", ()))
+        return name in listing
+
+    def _prioritize(self, result, spider):
+        if isinstance(result, Request) and not self._is_listing(result, spider):
+            result.priority += self.leaf_priority
+        return result
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            yield self._prioritize(r, spider)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for r in result:
+            yield self._prioritize(r, spider)
@@ -0,0 +1,218 @@
+"""
+Parses award amounts ("$1,250,000", "€ 1.250.000,50", "CAD 75,000", "£2.5 million") into a
+number and a currency.
+
+Spiders used to strip everything but digits and dots from amounts, which drops the currency,
+reads "1.250.000,50" as 1.25 and "$50,000.00" (with `\\D`) as 5,000,000. `parse_money`
+detects the currency from its symbol or ISO code, reads the number next to it ("FY2020: $50,000"
+is 50,000) and the thousands and decimal separators from how they are used, and caches its
+results, since the same amounts recur across grants. Amounts it can't read unambiguously
+("$1,234,56", or "$12.345", which could be 12.345 or 12,345) have no amount rather than a guess.
+`parse_money_batch` and `parse_money_series` parse columns of amounts, parsing each distinct
+value once.
+
+Example:
+
+    >>> parse_money("€ 1.250.000,50")
+    Money(amount=1250000.5, currency='EUR')
+    >>> parse_money("$75,000", default_currency="CAD")
+    Money(amount=75000.0, currency='CAD')
+"""
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# Currency symbols (matched longest first, so that "US$" isn't read as "$")
+CURRENCY_SYMBOLS = {
+    "US$": "USD",
+    "CA$": "CAD",
+    "C$": "CAD",
+    "AU$": "AUD",
+    "A$": "AUD",
+    "NZ$": "NZD",
+    "HK$": "HKD",
+    "€": "EUR",
+    "£": "GBP",
+    "¥": "JPY",
+    "₹": "INR",
+    "₩": "KRW",
+    "₪": "ILS",
+    "R$": "BRL",
+}
+CURRENCY_CODES = {
+    "USD", "CAD", "EUR", "GBP", "CHF", "AUD", "NZD", "JPY", "CNY", "HKD", "INR", "KRW", "ILS",
+    "BRL", "MXN", "ZAR", "SEK", "NOK", "DKK", "PLN", "CZK", "SGD",
+}  # fmt: skip
+# Currencies usually written with a decimal comma ("1.250,50"), the others with a decimal point
+DECIMAL_COMMA_CURRENCIES = {"EUR", "BRL", "SEK", "NOK", "DKK", "PLN", "CZK"}
+MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6, "bn": 1e9, "billion": 1e9}
+
+_CODE = re.compile(r"\b(" + "|".join(sorted(CURRENCY_CODES)) + r")\b")
+_SYMBOL = re.compile("|".join(re.escape(symbol) for symbol in sorted(CURRENCY_SYMBOLS, key=len, reverse=True)))
+_NUMBER_PATTERN = (
+    r"(?P<number>\d+(?:(?:[.,'\u2019]|[ \u00a0\u202f](?=\d{3}\b))\d+)*)"
+    r"(?:\s*(?P<multiplier>thousand|million|billion|bn|mm|k|m)\b)?"
+)
+# A number, with separators (",", ".", apostrophes, or spaces before groups of 3 digits) and
+# an optional multiplier
+_NUMBER = re.compile(_NUMBER_PATTERN, re.IGNORECASE)
+# The number right after a currency marker ("$ 50,000", "$-5")
+_NUMBER_AFTER = re.compile(r"\s*(?P<sign>[-\u2212])?\s*" + _NUMBER_PATTERN, re.IGNORECASE)
+_SIGN_BEFORE = re.compile(r"[-\u2212]\s*$")
+_SEPARATOR = re.compile(r"([.,'\u2019 \u00a0\u202f])")
+_GROUPED = re.compile(r"\d{1,3}(?:\d{3})*")
+
+
+class Money(NamedTuple):
+    """An amount and its ISO 4217 currency code (either may be None)."""
+
+    amount: Optional[float]
+    currency: Optional[str]
+
+
+def _valid_grouping(groups: List[str]) -> bool:
+    """Whether digit groups split by a thousands separator are 1 to 3 digits, then 3 digits each."""
+    return 1 <= len(groups[0]) <= 3 and all(len(group) == 3 for group in groups[1:])
+
+
+def _to_float(number: str, currency: Optional[str]) -> Optional[float]:
+    """Reads a number using either "," or "." as decimal separator.
+
+    Returns None if its separators are malformed ("1,234,56") or ambiguous ("12.345" in USD).
+    """
+    parts = _SEPARATOR.split(number)
+    groups, separators = parts[0::2], ["'" if sep not in ".," else sep for sep in parts[1::2]]
+    if not separators:
+        return float(number)
+
+    decimal = None
+    last = separators[-1]
+    if last in ".," and separators.count(last) == 1:
+        if len(separators) > 1:
+            # The last separator is the decimal one: "1,250.50" or "1.250,50"
+            decimal = last
+        else:
+            # A single separator: decimal or thousands, depending on the currency's conventions
+            decimal_separator = "," if currency in DECIMAL_COMMA_CURRENCIES else "."
+            if len(groups[-1]) == 3:
+                if last == decimal_separator:
+                    return None  # "12.345" in USD
+            elif last == decimal_separator:
+                decimal = last
+            else:
+                return None  # "12,34" in USD
+
+    integer_groups = groups[:-1] if decimal else groups
+    thousands = set(separators[:-1] if decimal else separators)
+    if len(thousands) > 1 or thousands & {decimal}:
+        return None
+    if thousands and not _valid_grouping(integer_groups):
+        return None
+    integer = "".join(integer_groups)
+    return float(f"{integer}.{groups[-1]}" if decimal else integer)
+
+
+def _marker(text: str) -> Tuple[Optional[str], Optional[re.Match]]:
+    """Finds the currency code or symbol of an amount, if any."""
+    code = _CODE.search(text)
+    if code:
+        return code.group(1), code
+    symbol = _SYMBOL.search(text)
+    if symbol:
+        return CURRENCY_SYMBOLS[symbol.group(0)], symbol
+    dollar = re.search(r"\$", text)
+    return None, dollar
+
+
+def _number_near(text: str, marker: re.Match) -> Tuple[Optional[re.Match], bool]:
+    """Finds the number right after or right before a currency marker, and whether it's negative."""
+    after = _NUMBER_AFTER.match(text, marker.end())
+    if after:
+        negative = bool(after.group("sign")) or bool(_SIGN_BEFORE.search(text, 0, marker.start()))
+        return after, negative
+    for match in _NUMBER.finditer(text, 0, marker.start()):
+        if not text[match.end() : marker.start()].strip():
+            return match, bool(_SIGN_BEFORE.search(text, 0, match.start()))
+    return None, False
+
+
+@lru_cache(maxsize=65536)
+def parse_money(text: Optional[str], default_currency: Optional[str] = None) -> Money:
+    """Parses an amount of money, detecting its currency and separators.
+
+    The amount is the number next to the currency symbol or code ("FY2020: $50,000" is 50,000),
+    or the only number of `text` if it has no currency or no number next to it. A bare "$" is
+    taken as `default_currency` when it's given (e.g. "CAD" for a Canadian funder), else as USD.
+    Results are cached by `text` and `default_currency`.
+
+    Args:
+        text (str): The amount, e.g. "$1,250,000", "1.250.000,50 €", "CAD 75,000", "-$5" or "$2.5M".
+        default_currency (str, optional): The currency of amounts without a symbol or code.
+
+    Returns:
+        Money: The amount (None if `text` has no number, several numbers and no currency, or a
+            malformed or ambiguous number) and its currency.
+    """
+    if not text:
+        return Money(None, None)
+    currency, marker = _marker(text)
+    if currency is None:
+        currency = (default_currency or "USD") if marker else default_currency
+
+    match, negative = _number_near(text, marker) if marker else (None, False)
+    if match is None:
+        numbers = list(_NUMBER.finditer(text))
+        if len(numbers) != 1:
+            return Money(None, currency)
+        match = numbers[0]
+        negative = bool(_SIGN_BEFORE.search(text, 0, match.start()))
+
+    amount = _to_float(match.group("number"), currency)
+    if amount is None:
+        return Money(None, currency)
+    if match.group("multiplier"):
+        amount *= MULTIPLIERS[match.group("multiplier").lower()]
+    return Money(-amount if negative else amount, currency)
+
+
+def parse_money_batch(
+    values: Iterable[Optional[str]], default_currency: Optional[str] = None
+) -> Tuple[List[Optional[float]], List[Optional[str]]]:
+    """Parses many amounts (see `parse_money`), each distinct value once.
+
+    Returns:
+        Tuple[List[Optional[float]], List[Optional[str]]]: The amounts and the currencies, in order.
+    """
+    parsed: Dict[Optional[str], Money] = {}
+    amounts, currencies = [], []
+    for value in values:
+        if value not in parsed:
+            parsed[value] = parse_money(value, default_currency)
+        amount, currency = parsed[value]
+        amounts.append(amount)
+        currencies.append(currency)
+    return amounts, currencies
+
+
+def parse_money_series(values: "pl.Series", default_currency: Optional[str] = None) -> "pl.DataFrame":
+    """Parses a column of amounts (see `parse_money`), each distinct value once.
+
+    Returns:
+        pl.DataFrame: The `amount` (Float64) and `currency` (String) of each value, in order.
+    """
+    # Imported here, so that spiders using `parse_money` don't need Polars
+    import polars as pl
+
+    unique = values.cast(pl.String).unique().drop_nulls()
+    amounts, currencies = parse_money_batch(unique.to_list(), default_currency)
+    strings = values.cast(pl.String)
+    return pl.DataFrame(
+        [
+            strings.replace_strict(unique, amounts, default=None, return_dtype=pl.Float64).alias("amount"),
+            strings.replace_strict(unique, currencies, default=None, return_dtype=pl.String).alias("currency"),
+        ]
+    )
@@ -0,0 +1,201 @@
+"""
+Splits participant names into the first, middle and last name and suffix of `AwardParticipant`.
+
+Most sources only give a participant's full name, in various forms: "Jane A. Doe",
+"DOE, JANE A", "Dr. Jane Doe, PhD" or "Jane Doe (Principal Investigator)". `parse_name`
+reads them all, and is memoized, since the same investigators recur across thousands of
+awards. `with_name_parts` fills the missing name fields of an `AwardParticipant`, and
+`fill_name_parts` those of a column of participants in an award batch (see
+`oic_scrape.bulk.mapping`), parsing each distinct name once.
+
+Example:
+
+    >>> parse_name("van der Berg, Anna Maria (Co-applicant)")
+    ParsedName(full_name='van der Berg, Anna Maria', first_name='Anna', middle_name='Maria', last_name='van der Berg', suffix=None, role='Co-applicant')
+"""
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional
+
+import attrs
+
+from oic_scrape.items import AwardParticipant
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# The AwardParticipant fields filled from a parsed name
+NAME_PARTS = ("first_name", "middle_name", "last_name", "suffix")
+
+PREFIXES = {"dr", "prof", "professor", "mr", "mrs", "ms", "mx", "miss", "sir", "dame", "rev", "hon"}
+SUFFIXES = {
+    "jr", "sr", "ii", "iii", "iv", "phd", "dphil", "md", "dds", "dvm", "jd", "esq", "mph", "mba", "rn", "frs",
+}  # fmt: skip
+# Lowercase particles that belong to the last name ("Ludwig van Beethoven")
+PARTICLES = {"van", "von", "der", "den", "de", "del", "della", "di", "da", "das", "dos", "du", "la", "le", "ter", "ten"}
+
+# A role in parentheses or brackets: "Jane Doe (Principal Investigator)", "Jane Doe [Project Director]"
+_ROLE = re.compile(r"[(\[]([^)\]]*)[)\]]")
+
+
+class ParsedName(NamedTuple):
+    """The parts of a name, and the role given with it (e.g. in parentheses), if any."""
+
+    full_name: str
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    suffix: Optional[str] = None
+    role: Optional[str] = None
+
+
+def _key(word: str) -> str:
+    return word.lower().replace(".", "")
+
+
+def _split_given(words: List[str]) -> List[Optional[str]]:
+    """The first and middle names among given names, without honorifics."""
+    while words and _key(words[0]) in PREFIXES:
+        words = words[1:]
+    if not words:
+        return [None, None]
+    return [words[0], " ".join(words[1:]) or None]
+
+
+@lru_cache(maxsize=65536)
+def parse_name(raw: str) -> ParsedName:
+    """Splits a personal name into its parts.
+
+    Handles "First Middle Last" and "Last, First Middle" names, honorifics ("Dr.", "Prof."),
+    suffixes ("Jr.", "III", "PhD") and a role in parentheses or brackets, which is left out of
+    `full_name`. A single word is taken as the last name. Results are cached.
+
+    Args:
+        raw (str): The name, as given by the source.
+
+    Returns:
+        ParsedName: The name without its role, its parts (None when missing) and its role.
+    """
+    roles = [role.strip() for role in _ROLE.findall(raw) if role.strip()]
+    full_name = " ".join(_ROLE.sub(" ", raw).split()).strip(" ,;")
+
+    # Comma-separated suffixes ("Jane Doe, PhD", "Doe, Jane, Jr.")
+    segments = [segment.strip() for segment in full_name.split(",") if segment.strip()]
+    suffixes = [segment for segment in segments[1:] if _key(segment) in SUFFIXES]
+    segments = [segment for segment in segments if segment not in suffixes]
+    if not segments:
+        return ParsedName(full_name, role=roles[0] if roles else None)
+
+    if len(segments) > 1:
+        last_words, given_words = segments[0].split(), " ".join(segments[1:]).split()
+        words = given_words
+    else:
+        words = segments[0].split()
+    # Space-separated suffixes ("John Smith Jr.")
+    while len(words) > 1 and _key(words[-1]) in SUFFIXES:
+        suffixes.insert(0, words[-1])
+        words = words[:-1]
+
+    if len(segments) > 1:
+        first_name, middle_name = _split_given(words)
+        last_name = " ".join(last_words)
+    elif len(words) == 1:
+        first_name = middle_name = None
+        last_name = words[0]
+    else:
+        # The last name starts at its lowercase particles, if any ("Anna van der Berg")
+        start = len(words) - 1
+        while start > 1 and words[start - 1] in PARTICLES:
+            start -= 1
+        first_name, middle_name = _split_given(words[:start])
+        last_name = " ".join(words[start:])
+
+    return ParsedName(
+        full_name=full_name,
+        first_name=first_name,
+        middle_name=middle_name,
+        last_name=last_name,
+        suffix=", ".join(suffixes) or None,
+        role=roles[0] if roles else None,
+    )
+
+
+def parse_names(raws: Iterable[str]) -> List[ParsedName]:
+    """Parses many names (see `parse_name`), each distinct name once."""
+    raws = list(raws)
+    parsed: Dict[str, ParsedName] = {}
+    for raw in raws:
+        if raw not in parsed:
+            parsed[raw] = parse_name(raw)
+    return [parsed[raw] for raw in raws]
+
+
+def with_name_parts(participant: AwardParticipant) -> AwardParticipant:
+    """Returns a participant with its missing name parts filled from its full name.
+
+    Name parts given by the source are kept.
+    """
+    if all(getattr(participant, part) is not None for part in NAME_PARTS):
+        return participant
+    parsed = parse_name(participant.full_name)
+    return attrs.evolve(
+        participant,
+        **{part: getattr(parsed, part) for part in NAME_PARTS if getattr(participant, part) is None},
+    )
+
+
+def parse_name_series(names: "pl.Series") -> "pl.DataFrame":
+    """Parses a column of names (see `parse_name`), each distinct name once.
+
+    Returns:
+        pl.DataFrame: The `first_name`, `middle_name`, `last_name` and `suffix` of each name, in order.
+    """
+    # Imported here, so that the spiders parsing names one at a time don't load Polars
+    import polars as pl
+
+    unique = names.unique().drop_nulls()
+    parsed = parse_names(unique.to_list())
+    return pl.DataFrame(
+        [
+            names.replace_strict(
+                unique, [getattr(name, part) for name in parsed], default=None, return_dtype=pl.String
+            ).alias(part)
+            for part in NAME_PARTS
+        ]
+    )
+
+
+def fill_name_parts(participants: "pl.Series") -> "pl.Series":
+    """Fills the missing name parts of a column of participant lists (`named_participants`).
+
+    Args:
+        participants (pl.Series): Lists of participant structs, with the `AwardParticipant` fields.
+
+    Returns:
+        pl.Series: The same lists, with the name parts parsed from `full_name` where missing.
+    """
+    import polars as pl
+
+    rows = (
+        participants.to_frame("participants")
+        .with_row_index("row")
+        .explode("participants")
+        .filter(pl.col("participants").is_not_null())
+    )
+    people = rows["participants"].struct.unnest()
+    parts = parse_name_series(people["full_name"])
+    people = people.with_columns(pl.col(part).fill_null(parts[part]) for part in NAME_PARTS)
+    filled = (
+        pl.DataFrame([rows["row"], people.to_struct("participants")])
+        .group_by("row", maintain_order=True)
+        .agg("participants")
+    )
+    # Rows without participants stay null
+    return (
+        pl.DataFrame({"row": pl.arange(0, len(participants), eager=True).cast(pl.UInt32)})
+        .join(filled, on="row", how="left")
+        .sort("row")["participants"]
+        .cast(participants.dtype)
+        .alias(participants.name)
+    )
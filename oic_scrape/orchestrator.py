@@ -0,0 +1,405 @@
+"""
+Runs several spiders concurrently and summarizes the results.
+
+A full refresh used to mean running `scrapy crawl <name> -O data/...` once per spider, so it
+took the sum of all their runtimes. The orchestrator runs all (or selected) spiders at the
+same time, either as crawlers sharing one Twisted reactor (the default) or in a pool of
+worker processes (`--processes`). A spider that fails does not stop the others, and a
+combined summary is printed (and optionally written as JSON) at the end.
+
+`--max-requests` caps the concurrent requests of each process: the spiders sharing the reactor
+split it evenly (as their CONCURRENT_REQUESTS), while with `--processes` every worker gets the
+whole budget for its spider.
+
+Bulk sources (`oic_scrape.bulk`) can be run alongside the spiders with `--bulk`, each in its
+own worker process. When only bulk sources are given, no spiders are run.
+
+Usage:
+
+    $ poetry run python -m oic_scrape.orchestrator
+    $ poetry run python -m oic_scrape.orchestrator sloan.org_grants imls.gov_grants --max-running 2
+    $ poetry run python -m oic_scrape.orchestrator --exclude dfg.de_grants --output sshrc-ca=data/sshrc-ca.jsonl
+    $ poetry run python -m oic_scrape.orchestrator --processes 4 --summary crawl_summary.json
+    $ poetry run python -m oic_scrape.orchestrator --max-running 4 --max-requests 32
+    $ poetry run python -m oic_scrape.orchestrator sloan.org_grants --bulk neh.gov_grants --bulk rwjf.org_grants
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from attrs import asdict, define, field
+from scrapy.crawler import CrawlerProcess
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+
+from oic_scrape.bulk import SOURCES, load_source
+from oic_scrape.bulk.base import run_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_TEMPLATE = "data/{name}.jsonl"
+
+
+@define
+class CrawlJob:
+    """A spider to run and where its items should be written.
+
+    Args:
+        spider (str): The name of the spider.
+        output (str): The path of the JSON Lines file the items are written to (overwritten).
+        settings (Dict[str, Any], optional): Settings overriding the project and spider settings for this job.
+    """
+
+    spider: str
+    output: str
+    settings: Dict[str, Any] = field(factory=dict)
+
+    def spider_settings(self) -> Dict[str, Any]:
+        return {
+            **self.settings,
+            "FEEDS": {self.output: {"format": "jsonlines", "overwrite": True}},
+        }
+
+
+@define
+class CrawlSummary:
+    """The outcome of a single spider's crawl."""
+
+    spider: str
+    output: str
+    status: str
+    finish_reason: Optional[str] = None
+    items: int = 0
+    requests: int = 0
+    errors: int = 0
+    elapsed_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_stats(cls, job: CrawlJob, stats: Dict[str, Any], error: Optional[str] = None):
+        finish_reason = stats.get("finish_reason")
+        return cls(
+            spider=job.spider,
+            output=job.output,
+            status="ok" if finish_reason == "finished" and error is None else "failed",
+            finish_reason=finish_reason,
+            items=stats.get("item_scraped_count", 0),
+            requests=stats.get("downloader/request_count", 0),
+            errors=stats.get("log_count/ERROR", 0),
+            elapsed_seconds=stats.get("elapsed_time_seconds"),
+            error=error,
+        )
+
+
+def _job_spidercls(loader: SpiderLoader, job: CrawlJob):
+    # Per-job settings (such as the output feed) are layered on top of the spider's own
+    # custom_settings, so each crawler in the shared reactor gets its own configuration
+    spidercls = loader.load(job.spider)
+    custom_settings = {**(spidercls.custom_settings or {}), **job.spider_settings()}
+    return type(spidercls.__name__, (spidercls,), {"custom_settings": custom_settings})
+
+
+def run_in_reactor(jobs: List[CrawlJob], max_running: int) -> List[CrawlSummary]:
+    """
+    Runs the jobs as crawlers of a single CrawlerProcess.
+
+    Args:
+        jobs (List[CrawlJob]): The crawls to run.
+        max_running (int): The maximum number of spiders crawling at the same time.
+
+    Returns:
+        List[CrawlSummary]: The summary of each crawl, in the order of `jobs`.
+    """
+    settings = get_project_settings()
+    # Scrapy installs the reactor when the first crawl starts, while the crawls are scheduled
+    # below through Twisted: the configured reactor is installed first, or importing
+    # twisted.internet.reactor would install the default one and every crawl would fail
+    install_reactor(settings["TWISTED_REACTOR"], settings["ASYNCIO_EVENT_LOOP"])
+    from twisted.internet import defer, reactor
+
+    process = CrawlerProcess(settings)
+    loader = SpiderLoader.from_settings(settings)
+    crawlers = [process.create_crawler(_job_spidercls(loader, job)) for job in jobs]
+
+    semaphore = defer.DeferredSemaphore(max_running)
+    errors: Dict[str, str] = {}
+
+    def crawl(job, crawler):
+        d = semaphore.run(process.crawl, crawler)
+
+        def on_error(failure):
+            # Isolate failures: record them and let the other crawls carry on
+            errors[job.spider] = failure.getErrorMessage()
+            logger.error("Crawl of %s failed: %s", job.spider, errors[job.spider])
+
+        return d.addErrback(on_error)
+
+    finished = defer.DeferredList([crawl(job, crawler) for job, crawler in zip(jobs, crawlers)])
+    # The crawls may all end (e.g. fail) before the reactor runs
+    finished.addBoth(lambda _: reactor.callWhenRunning(reactor.stop))
+    process.start(stop_after_crawl=False)
+
+    return [
+        CrawlSummary.from_stats(job, crawler.stats.get_stats() if crawler.stats else {}, errors.get(job.spider))
+        for job, crawler in zip(jobs, crawlers)
+    ]
+
+
+def _crawl_in_worker(job: CrawlJob) -> CrawlSummary:
+    # Twisted reactors cannot be restarted, so every worker process runs exactly one crawl
+    try:
+        return run_in_reactor([job], max_running=1)[0]
+    except Exception as e:
+        return CrawlSummary(spider=job.spider, output=job.output, status="failed", error=repr(e))
+
+
+def run_in_processes(jobs: List[CrawlJob], processes: int) -> List[CrawlSummary]:
+    """
+    Runs each job in its own worker process, with at most `processes` running at once.
+
+    Args:
+        jobs (List[CrawlJob]): The crawls to run.
+        processes (int): The number of worker processes.
+
+    Returns:
+        List[CrawlSummary]: The summary of each crawl, in the order of `jobs`.
+    """
+    summaries: Dict[str, CrawlSummary] = {}
+    with ProcessPoolExecutor(max_workers=processes, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(_crawl_in_worker, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summaries[job.spider] = future.result()
+            except Exception as e:
+                # e.g. the worker process was killed
+                summaries[job.spider] = CrawlSummary(
+                    spider=job.spider, output=job.output, status="failed", error=repr(e)
+                )
+            logger.info("Crawl of %s finished: %s", job.spider, summaries[job.spider].status)
+    return [summaries[job.spider] for job in jobs]
+
+
+def _run_bulk_source(name: str, output: str) -> CrawlSummary:
+    try:
+        result = run_source(load_source(name)(), output)
+    except Exception as e:
+        return CrawlSummary(spider=name, output=output, status="failed", error=repr(e))
+    return CrawlSummary(
+        spider=name,
+        output=output,
+        status="ok",
+        items=result["items"],
+        requests=result["requests"],
+        errors=result["errors"],
+        elapsed_seconds=result["elapsed_seconds"],
+    )
+
+
+def start_bulk_sources(
+    sources: List[Tuple[str, str]], pool: ProcessPoolExecutor
+) -> List[Tuple[str, str, Future]]:
+    """
+    Submits bulk sources to a process pool, so they run while the spiders crawl.
+
+    Args:
+        sources (List[Tuple[str, str]]): The names of the bulk sources and their output paths.
+        pool (ProcessPoolExecutor): The pool to run them in.
+
+    Returns:
+        List[Tuple[str, str, Future]]: The name, output and future of each source.
+    """
+    return [(name, output, pool.submit(_run_bulk_source, name, output)) for name, output in sources]
+
+
+def collect_bulk_sources(futures: List[Tuple[str, str, Future]]) -> List[CrawlSummary]:
+    """Waits for the bulk sources and returns their summaries, in the order they were submitted."""
+    summaries = []
+    for name, output, future in futures:
+        try:
+            summaries.append(future.result())
+        except Exception as e:
+            # e.g. the worker process was killed
+            summaries.append(CrawlSummary(spider=name, output=output, status="failed", error=repr(e)))
+        logger.info("Bulk source %s finished: %s", name, summaries[-1].status)
+    return summaries
+
+
+def build_bulk_sources(names: List[str], outputs: Dict[str, str]) -> List[Tuple[str, str]]:
+    """
+    Resolves the output path of each selected bulk source.
+
+    Raises:
+        ValueError: If an unknown bulk source is requested.
+    """
+    unknown = set(names) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown bulk sources: {', '.join(sorted(unknown))}")
+    return [(name, outputs.get(name, load_source(name).default_output)) for name in names]
+
+
+def build_jobs(
+    spiders: List[str],
+    exclude: List[str],
+    output_template: str,
+    outputs: Dict[str, str],
+    settings: Dict[str, Any],
+) -> List[CrawlJob]:
+    """
+    Builds the list of crawl jobs from the command line selection.
+
+    Args:
+        spiders (List[str]): The spiders to run. All project spiders if empty.
+        exclude (List[str]): Spiders to leave out.
+        output_template (str): Output path for spiders without an explicit output, formatted with `name`.
+        outputs (Dict[str, str]): Explicit output paths by spider name.
+        settings (Dict[str, Any]): Settings applied to every job.
+
+    Returns:
+        List[CrawlJob]: The jobs to run.
+
+    Raises:
+        ValueError: If an unknown spider is requested.
+    """
+    available = SpiderLoader.from_settings(get_project_settings()).list()
+    unknown = (set(spiders) | set(outputs)) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown spiders: {', '.join(sorted(unknown))}")
+
+    selected = [name for name in (spiders or sorted(available)) if name not in exclude]
+    return [
+        CrawlJob(
+            spider=name,
+            output=outputs.get(name, output_template.format(name=name)),
+            settings=dict(settings),
+        )
+        for name in selected
+    ]
+
+
+def apply_request_budget(jobs: List[CrawlJob], max_requests: int, running: int) -> None:
+    """
+    Caps the concurrent requests of the spiders that crawl at the same time in one process.
+
+    Each job gets an equal share of `max_requests` as its CONCURRENT_REQUESTS, so that the
+    `running` spiders together never have more than `max_requests` requests in flight. The
+    whole budget is also set as ADAPTIVE_CONCURRENCY_GLOBAL_MAX, which the AdaptiveConcurrency
+    extension shares between the crawlers of the process.
+
+    Args:
+        jobs (List[CrawlJob]): The crawls to cap, modified in place.
+        max_requests (int): The maximum number of concurrent requests in the process.
+        running (int): The number of spiders crawling at the same time in the process.
+    """
+    share = max(1, max_requests // max(1, min(running, len(jobs))))
+    for job in jobs:
+        job.settings["CONCURRENT_REQUESTS"] = share
+        job.settings["ADAPTIVE_CONCURRENCY_GLOBAL_MAX"] = max_requests
+
+
+def print_summary(summaries: List[CrawlSummary], elapsed: float) -> None:
+    header = f"{'spider':<34} {'status':<7} {'items':>8} {'requests':>9} {'errors':>7} {'seconds':>9}  output"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        seconds = f"{s.elapsed_seconds:9.1f}" if s.elapsed_seconds is not None else f"{'-':>9}"
+        print(f"{s.spider:<34} {s.status:<7} {s.items:>8} {s.requests:>9} {s.errors:>7} {seconds}  {s.output}")
+        if s.error:
+            print(f"    error: {s.error}")
+    failed = sum(1 for s in summaries if s.status != "ok")
+    print(
+        f"\n{len(summaries)} spiders, {failed} failed, {sum(s.items for s in summaries)} items in {elapsed:.1f}s"
+    )
+
+
+def _key_value(value: str) -> tuple:
+    key, sep, val = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE, got {value!r}")
+    return key, val
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run several spiders concurrently.")
+    parser.add_argument("spiders", nargs="*", help="Spiders to run (default: all)")
+    parser.add_argument("--exclude", nargs="*", default=[], help="Spiders to leave out")
+    parser.add_argument(
+        "--output-template",
+        default=DEFAULT_OUTPUT_TEMPLATE,
+        help="Output path for each spider, formatted with {name} (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output", action="append", type=_key_value, default=[], metavar="SPIDER=PATH",
+        help="Output path for a specific spider",
+    )
+    parser.add_argument(
+        "-s", "--set", action="append", type=_key_value, default=[], metavar="NAME=VALUE",
+        help="Setting applied to every spider",
+    )
+    parser.add_argument(
+        "--max-running", type=int, default=0,
+        help="Maximum number of spiders running at once (default: all)",
+    )
+    parser.add_argument(
+        "--max-requests", type=int,
+        help="Maximum concurrent requests per process, shared by the spiders running in it "
+        "(with --processes, each worker gets its own budget)",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=0,
+        help="Run each spider in its own worker process, with this many workers (default: one shared reactor)",
+    )
+    parser.add_argument(
+        "--bulk", action="append", default=[], metavar="SOURCE",
+        help="Bulk source to run alongside the spiders, in its own process (see python -m oic_scrape.bulk --list)",
+    )
+    parser.add_argument("--summary", help="Write the crawl summary as JSON to this path")
+    args = parser.parse_args(argv)
+
+    settings = dict(args.set)
+    outputs = dict(args.output)
+    bulk_sources = build_bulk_sources(args.bulk, outputs)
+    spider_outputs = {name: path for name, path in outputs.items() if name not in args.bulk}
+    if bulk_sources and not args.spiders:
+        jobs = []
+    else:
+        jobs = build_jobs(args.spiders, args.exclude, args.output_template, spider_outputs, settings)
+    if not jobs and not bulk_sources:
+        parser.error("No spiders selected")
+    if jobs and args.max_requests:
+        # The budget is per process: a worker process runs a single spider
+        running = 1 if args.processes else args.max_running or len(jobs)
+        apply_request_budget(jobs, args.max_requests, running)
+
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=max(len(bulk_sources), 1)) as bulk_pool:
+        # Submitted first, so the bulk sources run while the spiders crawl
+        bulk_futures = start_bulk_sources(bulk_sources, bulk_pool)
+        summaries = []
+        if jobs and args.processes:
+            summaries = run_in_processes(jobs, args.processes)
+        elif jobs:
+            summaries = run_in_reactor(jobs, args.max_running or len(jobs))
+        summaries += collect_bulk_sources(bulk_futures)
+    elapsed = time.monotonic() - start
+
+    print_summary(summaries, elapsed)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(
+                {"elapsed_seconds": elapsed, "crawls": [asdict(s) for s in summaries]},
+                f,
+                indent=2,
+            )
+
+    return 0 if all(s.status == "ok" for s in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Concurrent page prefetching for spiders walking numbered result pages.
+
+Spiders that follow "next page" links one at a time wait for a full round-trip per page, so
+their crawl time is bound by latency rather than bandwidth. `PaginatedSpider` requests a window
+of `PAGINATION_WINDOW` pages ahead of the last page received instead, so several pages are
+always in flight:
+
+    class MySpider(PaginatedSpider):
+        def page_url(self, page):
+            return f"https://example.org/grants?page={page}"
+
+        def parse(self, response):
+            ...  # yield the items of one page
+
+The pagination stops at a page `is_last_page()` returns True for, or before a page
+`is_past_last_page()` returns True for (e.g. an empty JSON list). Only these positive signals
+stop it: a page without items, a page whose parsing fails, or a page whose download fails (its
+errback still runs) doesn't, and the window moves on past it. Pages requested beyond the last
+page are dropped by `PaginationMiddleware` (enabled in `settings.py`) before they are
+downloaded, or when their response arrives if they were already being downloaded.
+"""
+
+import logging
+from typing import Optional
+
+import scrapy
+from scrapy.exceptions import IgnoreRequest
+from scrapy.utils.misc import arg_to_iter
+
+logger = logging.getLogger(__name__)
+
+
+class PaginatedSpider(scrapy.Spider):
+    """Spider fetching numbered pages concurrently, a window of pages ahead.
+
+    Subclasses implement `page_url()` and `parse()`, which yields the items of one page (the
+    page number is in `response.meta["page_number"]`), and `is_last_page()` or
+    `is_past_last_page()` to end the pagination (or set `max_pages`).
+
+    Attributes:
+        first_page (int): The number of the first page. Defaults to 1.
+        max_pages (Optional[int]): The maximum number of pages to fetch. Defaults to no limit.
+
+    Settings:
+        PAGINATION_WINDOW: The number of pages requested ahead of the last page received. Defaults to 4.
+    """
+
+    first_page = 1
+    max_pages: Optional[int] = None
+    # Result pages expand the crawl (see LeafFirstPriorityMiddleware)
+    listing_callbacks = ("parse", "_parse_page")
+
+    def page_url(self, page: int) -> str:
+        """Returns the URL of a result page."""
+        raise NotImplementedError(f"{self.__class__.__name__}.page_url callback is not defined")
+
+    def page_request_kwargs(self) -> dict:
+        """Returns extra keyword arguments for the page requests (headers, errback, etc)."""
+        return {}
+
+    def is_last_page(self, response, page: int) -> bool:
+        """Returns True if the response is the last result page."""
+        return False
+
+    def is_past_last_page(self, response, page: int) -> bool:
+        """Returns True if the response is past the last result page (e.g. an empty result list)."""
+        return False
+
+    def start_requests(self):
+        self.window = self.settings.getint("PAGINATION_WINDOW", 4)
+        # The last page with results, once known
+        self.last_page: Optional[int] = None
+        self.next_page = self.first_page
+        yield from self._fill_window(self.first_page - 1)
+
+    def _fill_window(self, received_page: int):
+        end = received_page + self.window
+        if self.max_pages is not None:
+            end = min(end, self.first_page + self.max_pages - 1)
+        while self.next_page <= end and (self.last_page is None or self.next_page <= self.last_page):
+            yield self.page_request(self.next_page)
+            self.next_page += 1
+
+    def page_request(self, page: int) -> scrapy.Request:
+        kwargs = self.page_request_kwargs()
+        # The spider's errback is called by _page_failed, which also moves the window on
+        kwargs.pop("errback", None)
+        return scrapy.Request(
+            self.page_url(page),
+            callback=self._parse_page,
+            errback=self._page_failed,
+            meta={"page_number": page},
+            dont_filter=True,
+            **kwargs,
+        )
+
+    def is_beyond_last_page(self, page: int) -> bool:
+        return self.last_page is not None and page > self.last_page
+
+    def _parse_page(self, response):
+        page = response.meta["page_number"]
+        if self.is_beyond_last_page(page):
+            return
+
+        if self.is_past_last_page(response, page):
+            self._stop(page - 1)
+            return
+
+        try:
+            results = list(self.parse(response))
+        except Exception:
+            # A bad page (e.g. an error body or truncated JSON) doesn't end the pagination
+            self.crawler.stats.inc_value("pagination/failed_pages", spider=self)
+            yield from self._fill_window(page)
+            raise
+        if not results:
+            self.crawler.stats.inc_value("pagination/empty_pages", spider=self)
+            logger.warning("Result page %(page)d has no items", {"page": page}, extra={"spider": self})
+        if self.is_last_page(response, page):
+            self._stop(page)
+
+        yield from results
+        if not self.is_beyond_last_page(page + 1):
+            yield from self._fill_window(page)
+
+    def _page_failed(self, failure):
+        errback = self.page_request_kwargs().get("errback")
+        if errback is not None:
+            yield from arg_to_iter(errback(failure))
+        page = failure.request.meta["page_number"]
+        if not self.is_beyond_last_page(page):
+            self.crawler.stats.inc_value("pagination/failed_pages", spider=self)
+            yield from self._fill_window(page)
+
+    def _stop(self, last_page: int) -> None:
+        if self.last_page is None or last_page < self.last_page:
+            logger.info("Last result page is %(page)d", {"page": last_page}, extra={"spider": self})
+            self.last_page = last_page
+
+
+class PaginationMiddleware:
+    """Downloader middleware dropping the page requests of a `PaginatedSpider` beyond its last page."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def _check(self, request, spider) -> None:
+        page = request.meta.get("page_number")
+        if page is not None and isinstance(spider, PaginatedSpider) and spider.is_beyond_last_page(page):
+            self.stats.inc_value("pagination/cancelled", spider=spider)
+            raise IgnoreRequest(f"Page {page} is beyond the last result page")
+
+    def process_request(self, request, spider):
+        self._check(request, spider)
+        return None
+
+    def process_response(self, request, response, spider):
+        self._check(request, spider)
+        return response
@@ -0,0 +1,89 @@
+"""
+Scheduler keeping a bounded number of pending requests in memory.
+
+Listing-style callbacks (search result pages, sitemaps) can discover far more requests than
+the crawl can fetch at once, e.g. every SSHRC result page yields all its award links plus the
+next page. With Scrapy's default scheduler these all wait in memory, so memory peaks long
+before items start flowing, in proportion to the size of the site.
+
+`SpillingScheduler` keeps up to `SCHEDULER_MEMORY_LIMIT` requests in memory and spills the
+rest to a disk queue (in the job directory if there is one, otherwise a temporary
+directory). Requests are always taken in priority order across both queues. Together with
+`LeafFirstPriorityMiddleware` (see `middlewares.py`), which gives detail pages a higher
+priority than listing pages, detail pages are drained before more listing pages are
+expanded, and items flow from the start of the crawl.
+"""
+
+import logging
+import shutil
+import tempfile
+
+from oic_scrape.checkpoint import CheckpointScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class SpillingScheduler(CheckpointScheduler):
+    """Scheduler spilling requests to disk beyond a memory budget.
+
+    When a `JOBDIR` is set, every serializable request already goes to the (checkpointed)
+    disk queue, and this behaves like `CheckpointScheduler`.
+
+    Settings:
+        SCHEDULER_MEMORY_LIMIT: The maximum number of requests kept in the memory queue. Defaults to 10,000.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.memory_limit = (
+            self.crawler.settings.getint("SCHEDULER_MEMORY_LIMIT", 10_000) if self.crawler else 10_000
+        )
+        self.spill_dir = None
+        if self.dqdir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="oic_scrape-scheduler-")
+            self.dqdir = self._dqdir(self.spill_dir)
+
+    def close(self, reason):
+        result = super().close(reason)
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        return result
+
+    def enqueue_request(self, request) -> bool:
+        if self.jobdir is not None:
+            return super().enqueue_request(request)
+
+        if not request.dont_filter and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+
+        if len(self.mqs) < self.memory_limit or not self._dqpush(request):
+            self._mqpush(request)
+            self.stats.inc_value("scheduler/enqueued/memory", spider=self.spider)
+            self.stats.max_value("scheduler/memory_queue_peak", len(self.mqs), spider=self.spider)
+        else:
+            self.stats.inc_value("scheduler/enqueued/disk", spider=self.spider)
+        self.stats.inc_value("scheduler/enqueued", spider=self.spider)
+        return True
+
+    def next_request(self):
+        if self.jobdir is not None:
+            return super().next_request()
+
+        # Priority queues store negated priorities, so the lowest `curprio` is the most urgent
+        mq_prio = getattr(self.mqs, "curprio", None) if len(self.mqs) else None
+        dq_prio = getattr(self.dqs, "curprio", None) if self.dqs is not None and len(self.dqs) else None
+
+        request = None
+        if dq_prio is None or (mq_prio is not None and mq_prio <= dq_prio):
+            request = self.mqs.pop()
+            if request is not None:
+                self.stats.inc_value("scheduler/dequeued/memory", spider=self.spider)
+        if request is None:
+            request = self._dqpop()
+            if request is not None:
+                self.stats.inc_value("scheduler/dequeued/disk", spider=self.spider)
+
+        if request is not None:
+            self.stats.inc_value("scheduler/dequeued", spider=self.spider)
+        return request
@@ -44,21 +44,28 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#    "oic_scrape.middlewares.OiCatalogScrapingPipelineSpiderMiddleware": 543,
-# }
+SPIDER_MIDDLEWARES = {
+    # Outermost, so that it sees the output of every other spider middleware
+    "oic_scrape.checkpoint.CheckpointMiddleware": 40,
+    "oic_scrape.middlewares.LeafFirstPriorityMiddleware": 60,
+    "oic_scrape.incremental.IncrementalRecordMiddleware": 100,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    "oic_scrape.middlewares.OiCatalogScrapingPipelineDownloaderMiddleware": 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+    "oic_scrape.checkpoint.CheckpointDownloaderMiddleware": 40,
+    "oic_scrape.pagination.PaginationMiddleware": 50,
+}
+
+# Number of result pages PaginatedSpider spiders request ahead (see oic_scrape/pagination.py)
+PAGINATION_WINDOW = 4
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-# }
+EXTENSIONS = {
+    "oic_scrape.extensions.AdaptiveConcurrency": 500,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -79,6 +86,20 @@ ROBOTSTXT_OBEY = True
 # Enable showing throttling stats for every response received:
 # AUTOTHROTTLE_DEBUG = False
 
+# Adaptive concurrency (see oic_scrape/extensions.py) adjusts each domain's concurrency
+# and delay from latency and error responses (429/5xx). It is an alternative to
+# AutoThrottle and is disabled when AUTOTHROTTLE_ENABLED is set. Spiders opt in with
+# `ADAPTIVE_CONCURRENCY_ENABLED` in their custom_settings (see dfg.de_grants).
+ADAPTIVE_CONCURRENCY_ENABLED = False
+# The maximum concurrent requests for a single domain
+ADAPTIVE_CONCURRENCY_MAX = 8
+# The delay bounds a domain can be ramped down / backed off to
+ADAPTIVE_CONCURRENCY_MIN_DELAY = 0.25
+ADAPTIVE_CONCURRENCY_MAX_DELAY = 60
+# Budget shared by all spiders running in the same process
+ADAPTIVE_CONCURRENCY_GLOBAL_MAX = 32
+ADAPTIVE_CONCURRENCY_GLOBAL_RATE = 0  # requests per second, 0 = unlimited
+
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
 HTTPCACHE_ENABLED = True
@@ -87,6 +108,20 @@ HTTPCACHE_DIR = ".httpcache"
 HTTPCACHE_IGNORE_HTTP_CODES = []
 HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Keep at most SCHEDULER_MEMORY_LIMIT pending requests in memory and spill the rest to disk,
+# draining detail pages (see SCHEDULER_LEAF_PRIORITY) before expanding listing pages.
+# Crawls run with a JOBDIR are checkpointed, so they can resume after being killed
+# (see oic_scrape/scheduler.py and oic_scrape/checkpoint.py)
+SCHEDULER = "oic_scrape.scheduler.SpillingScheduler"
+SCHEDULER_MEMORY_LIMIT = 10_000
+SCHEDULER_LEAF_PRIORITY = 100
+CHECKPOINT_INTERVAL = 60  # seconds
+
+# For crawls of millions of requests, a Bloom filter uses far less memory than the default dupefilter
+# DUPEFILTER_CLASS = "oic_scrape.dupefilters.BloomDupeFilter"
+# DUPEFILTER_BLOOM_CAPACITY = 1_000_000
+# DUPEFILTER_BLOOM_ERROR_RATE = 1e-6
+
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
@@ -1,6 +1,6 @@
-import scrapy
 import json
 from oic_scrape.items import AwardItem
+from oic_scrape.listings import IncrementalListingSpider
 import datetime
 
 FUNDER_NAME = "Chan Zuckerberg Initiative"
@@ -17,7 +17,7 @@ are available on project pages, they are not in this initial implementation.
 """
 
 
-class ChanzuckerbergComSpider(scrapy.Spider):
+class ChanzuckerbergComSpider(IncrementalListingSpider):
     name = "chanzuckerberg.com_grants"
     allowed_domains = ["chanzuckerberg.com"]
     start_urls = ["https://chanzuckerberg.com/wp-json/czi/v1/grants/"]
@@ -31,6 +31,10 @@ class ChanzuckerbergComSpider(scrapy.Spider):
             raw_source_data = g["fields"]
             grant_id = f"chanzuckerberg::{raw_source_data['Opportunity Salesforce ID']}"
 
+            # Skip grants that didn't change since the previous run (LISTING_INCREMENTAL)
+            if not self.listing_entry_changed(grant_id, raw_source_data):
+                continue
+
             ai = AwardItem(
                 grant_id=grant_id,
                 funder_org_name=FUNDER_NAME,
@@ -49,3 +53,4 @@ class ChanzuckerbergComSpider(scrapy.Spider):
                 raw_source_data=str(raw_source_data),
             )
             yield ai
+            self.record_listing_entry(grant_id, raw_source_data)
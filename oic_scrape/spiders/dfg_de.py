@@ -1,5 +1,5 @@
 import scrapy
-from scrapy.spiders import SitemapSpider
+from oic_scrape.sitemaps import LastmodSitemapSpider
 from datetime import datetime, date
 from oic_scrape.items import AwardItem, AwardParticipant
 import re
@@ -7,7 +7,7 @@ import re
 FUNDER_NAME = "Deutsche Forschungsgemeinschaft"
 FUNDER_ROR_ID = "https://ror.org/018mejw64"
 
-class DfgDeSpider(SitemapSpider):
+class DfgDeSpider(LastmodSitemapSpider):
     name = "dfg.de_grants"
     allowed_domains = ["gepris.dfg.de"]
     sitemap_urls = ["https://gepris.dfg.de/gepris/sitemap_index.xml"]
@@ -18,13 +18,14 @@ class DfgDeSpider(SitemapSpider):
     ]
 
     # Add politeness delays and concurrency settings
+    # Delay and concurrency are starting points, AdaptiveConcurrency tunes them while crawling
     custom_settings = {
-        'DOWNLOAD_DELAY': 1,  # Reduced from 3 to 1 second
-        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,  # Increased from 1 to 4 concurrent requests
-        'AUTOTHROTTLE_ENABLED': True,
-        'AUTOTHROTTLE_START_DELAY': 1,  # Reduced from 5 to 1
-        'AUTOTHROTTLE_MAX_DELAY': 60,
-        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,  # Increased from 1.0 to 2.0
+        'DOWNLOAD_DELAY': 1,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 2,
+        'ADAPTIVE_CONCURRENCY_ENABLED': True,
+        'ADAPTIVE_CONCURRENCY_MAX': 6,
+        'ADAPTIVE_CONCURRENCY_MIN_DELAY': 0.5,
+        'ADAPTIVE_CONCURRENCY_MAX_DELAY': 60,
         'ROBOTSTXT_OBEY': True,
         'USER_AGENT': 'Mozilla/5.0 (compatible; IOIBot/1.0; +https://investinopen.org/)',
         # Error handling settings
@@ -33,8 +34,32 @@ class DfgDeSpider(SitemapSpider):
         'RETRY_HTTP_CODES': [500, 502, 503, 504, 408, 429],  # Common error codes to retry
         'DOWNLOAD_TIMEOUT': 30,  # Timeout after 30 seconds
         'CONCURRENT_REQUESTS': 16,  # Global concurrent request limit
+        # GEPRIS has hundreds of thousands of project and person pages, keep seen requests compact
+        'DUPEFILTER_CLASS': 'oic_scrape.dupefilters.BloomDupeFilter',
+        'DUPEFILTER_BLOOM_CAPACITY': 1_000_000,
     }
 
+    def _person_joins(self):
+        """
+        The join state of projects and person pages, kept in `self.state` so that it is
+        checkpointed with the request queue and survives a JOBDIR resume:
+
+        - `cache`: the institution (or None) of every person page parsed so far, by URL
+        - `waiters`: the projects waiting for each person page being fetched, by URL
+        """
+        if not hasattr(self, 'state'):
+            # Without a JOBDIR, Scrapy doesn't set a state dict
+            self.state = {}
+        return self.state.setdefault('person_joins', {'cache': {}, 'waiters': {}})
+
+    @property
+    def person_cache(self):
+        return self._person_joins()['cache']
+
+    @property
+    def person_waiters(self):
+        return self._person_joins()['waiters']
+
     def parse_grant(self, response):
         """Parse individual grant pages"""
         crawl_ts = datetime.utcnow()
@@ -51,17 +76,19 @@ class DfgDeSpider(SitemapSpider):
         # Extract program information
         program = response.css('div:contains("DFG-Verfahren") .value::text').get('')
         
-        # Extract all applicants
+        # Extract all applicants, once each (a person can be listed twice)
         applicants = []
+        seen_urls = set()
         applicant_links = response.css('div:contains("Applicant") .value a')
         for link in applicant_links:
-            applicant_data = {
-                'name': link.css('::text').get('').strip(),
-                'url': link.css('::attr(href)').get()
-            }
-            applicants.append(applicant_data)
+            url = link.css('::attr(href)').get()
+            url = response.urljoin(url) if url else None
+            if url in seen_urls:
+                continue
+            if url:
+                seen_urls.add(url)
+            applicants.append({'name': link.css('::text').get('').strip(), 'url': url})
         
-        # Store base data to pass through to callback
         base_data = {
             'crawl_ts': crawl_ts,
             'title': title,
@@ -69,58 +96,95 @@ class DfgDeSpider(SitemapSpider):
             'project_id': project_id,
             'source_url': response.url,
             'program_of_funder': program.strip() if program else None,
-            'applicants': applicants
+            'applicants': applicants,
         }
-        
-        # Follow first applicant link if available
-        if applicants:
-            return response.follow(
-                applicants[0]['url'],
-                callback=self.parse_applicant_page,
-                cb_kwargs=base_data
-            )
-        
-        return self._create_award(base_data, None, [])
 
-    def parse_applicant_page(self, response, **base_data):
-        """Parse the applicant's page to get their institution and create participant"""
+        # Person pages are shared between many projects: use the cached institution when the
+        # page was already parsed, wait for the request when it is in flight, and otherwise
+        # request it. All applicant pages of a project are requested at once and joined below.
+        pending = {
+            'base_data': base_data,
+            'institutions': {},
+            'remaining': set(),
+        }
+        requests = []
+        for applicant in applicants:
+            if not applicant['url']:
+                continue
+            person_url = applicant['url']
+            if person_url in self.person_cache:
+                self.crawler.stats.inc_value('dfg/person_cache/hits', spider=self)
+                pending['institutions'][person_url] = self.person_cache[person_url]
+            elif person_url in self.person_waiters:
+                self.crawler.stats.inc_value('dfg/person_cache/waited', spider=self)
+                self.person_waiters[person_url].append(pending)
+                pending['remaining'].add(person_url)
+            else:
+                self.crawler.stats.inc_value('dfg/person_cache/misses', spider=self)
+                self.person_waiters[person_url] = [pending]
+                pending['remaining'].add(person_url)
+                # dont_filter: the join waits for this request, a filtered one would never complete it
+                requests.append(
+                    scrapy.Request(
+                        person_url,
+                        callback=self.parse_applicant_page,
+                        errback=self.applicant_page_failed,
+                        cb_kwargs={'person_url': person_url},
+                        dont_filter=True,
+                    )
+                )
+
+        if not pending['remaining']:
+            yield self._complete_award(pending)
+        yield from requests
+
+    def parse_applicant_page(self, response, person_url):
+        """Parse an applicant's page to get their institution, and complete the projects waiting for it"""
         # Extract institution from address
         address_block = response.css('.details p:contains("Adresse") span[style*="inline-block"]::text').getall()
-        
+
         institution = None
         if address_block and not any("keine aktuelle Dienstanschrift" in line for line in address_block):
             institution = address_block[0].strip()
-        
-        # Create participant for current applicant
-        current_applicant = base_data['applicants'][0]
-        participant = AwardParticipant(
-            full_name=current_applicant['name'],
-            is_pi=True,  # All DFG applicants are considered PIs
-            affiliations=[institution] if institution else None,
-            grant_role="Applicant",  # German: "Antragsteller"
-            identifiers={"dfg_person_id": current_applicant['url'].split('/')[-1]} if current_applicant['url'] else None
-        )
-        
-        # Remove processed applicant and follow next if available
-        remaining_applicants = base_data['applicants'][1:]
-        if remaining_applicants:
-            base_data['applicants'] = remaining_applicants
-            return response.follow(
-                remaining_applicants[0]['url'],
-                callback=self.parse_applicant_page,
-                cb_kwargs={
-                    **base_data,
-                    'institution': institution,
-                    'participants': [participant]
-                }
+
+        self.person_cache[person_url] = institution
+        yield from self._resolve_person(person_url, institution)
+
+    def applicant_page_failed(self, failure):
+        """Complete the projects waiting for a person page that could not be fetched, without an institution"""
+        person_url = failure.request.cb_kwargs['person_url']
+        self.logger.warning(f"Failed to fetch applicant page {person_url}: {failure.value!r}")
+        self.crawler.stats.inc_value('dfg/person_cache/failed', spider=self)
+        yield from self._resolve_person(person_url, None)
+
+    def _resolve_person(self, person_url, institution):
+        for pending in self.person_waiters.pop(person_url, []):
+            pending['institutions'][person_url] = institution
+            pending['remaining'].discard(person_url)
+            if not pending['remaining']:
+                yield self._complete_award(pending)
+
+    def _complete_award(self, pending):
+        """Create the award once the institutions of all its applicants are known"""
+        participants = []
+        for applicant in pending['base_data']['applicants']:
+            institution = pending['institutions'].get(applicant['url'])
+            participants.append(
+                AwardParticipant(
+                    full_name=applicant['name'],
+                    is_pi=True,  # All DFG applicants are considered PIs
+                    affiliations=[institution] if institution else None,
+                    grant_role="Applicant",  # German: "Antragsteller"
+                    identifiers={"dfg_person_id": applicant['url'].split('/')[-1]} if applicant['url'] else None
+                )
             )
-        
-        # All applicants processed
-        return self._create_award(
-            base_data,
-            institution,
-            [participant]
+
+        # The recipient is the institution of the first applicant who has one
+        institution = next(
+            (p.affiliations[0] for p in participants if p.affiliations),
+            None,
         )
+        return self._create_award(pending['base_data'], institution, participants)
 
     def _create_award(self, base_data, institution, participants):
         """Helper to create award with consistent data"""
@@ -2,6 +2,7 @@ from typing import Dict, List, Optional
 import scrapy
 import json
 from oic_scrape.items import AwardItem
+from oic_scrape.listings import IncrementalListingSpider
 from datetime import datetime
 
 # NOTE: In the current iteration, this scraper does not handle multiple-listing grant pages
@@ -14,7 +15,7 @@ from datetime import datetime
 FUNDER_ORG_NAME = "Doris Duke Charitable Foundation"
 FUNDER_ORG_ROR_ID = "https://ror.org/04n65rp89"
 
-class DorisdukeOrgSpider(scrapy.Spider):
+class DorisdukeOrgSpider(IncrementalListingSpider):
     name = "dorisduke.org_grants"
     source_name = "dorisduke.org"
     source_type = "grants"
@@ -52,8 +53,15 @@ class DorisdukeOrgSpider(scrapy.Spider):
         # Process the grants
         if all_grants:
             for grant in all_grants:
-                grant_url = grant[3]  # Assuming the index is correct
-                yield scrapy.Request(response.urljoin(grant_url), callback=self.parse_grant_page)
+                grant_url = response.urljoin(grant[3])  # Assuming the index is correct
+                # Skip grants whose listing entry didn't change since the previous run (LISTING_INCREMENTAL)
+                if not self.listing_entry_changed(grant_url, grant):
+                    continue
+                yield scrapy.Request(
+                    grant_url,
+                    callback=self.parse_grant_page,
+                    meta=self.listing_meta(grant_url, grant),
+                )
             
     def parse_grant_page(self, response):
         crawl_ts = datetime.utcnow()
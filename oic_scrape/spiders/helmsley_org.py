@@ -1,16 +1,17 @@
 import scrapy
-from scrapy.spiders import SitemapSpider
+from oic_scrape.sitemaps import LastmodSitemapSpider
 import dateparser
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from oic_scrape.dates import add_months, format_months, parse_months
 from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.money import parse_money
 import re
 from attrs import asdict
 
 FUNDER_ROR_ID = "https://ror.org/011x6n313"
 FUNDER_NAME = "Leona M. and Harry B. Helmsley Charitable Trust"
 
-class HelmsleyOrgSitemapSpider(SitemapSpider):
+class HelmsleyOrgSitemapSpider(LastmodSitemapSpider):
     name = "helmsley.org_grants"
     allowed_domains = ["helmsleytrust.org"]
     sitemap_urls = ["https://helmsleytrust.org/sitemap.xml"]
@@ -48,15 +49,14 @@ class HelmsleyOrgSitemapSpider(SitemapSpider):
             self.logger.warning(f"Could not find grant ID in the URL {source_url}.")
             grant_id = f"helmsley:grants::{hash(source_url)}"  # Fallback to a hash of the URL
         
-        formatted_award_amount = float(re.sub(r"[^\d.]", "", award_amount)) if award_amount else None
+        formatted_award_amount, award_currency = parse_money(award_amount, "USD")
 
         grant_start_date = dateparser.parse(award_date) if award_date else None
         grant_year = int(grant_start_date.year) if grant_start_date else None
 
-        duration_in_months = re.search(r"\d+", grant_duration) if grant_duration else None
-        if duration_in_months and grant_start_date:
-            duration_in_months = int(duration_in_months.group())
-            grant_end_date = grant_start_date + relativedelta(months=duration_in_months)
+        duration_in_months = parse_months(grant_duration)
+        if duration_in_months is not None and grant_start_date:
+            grant_end_date = add_months(grant_start_date, duration_in_months)
         else:
             grant_end_date = None
 
@@ -78,12 +78,12 @@ class HelmsleyOrgSitemapSpider(SitemapSpider):
             pi_name=recipient_org_name,  # Using recipient org name as PI name
             named_participants=[recipient],
             grant_year=grant_year,
-            grant_duration=grant_duration,
+            grant_duration=format_months(duration_in_months) or grant_duration,
             grant_start_date=grant_start_date,
             grant_end_date=grant_end_date,
             award_amount=formatted_award_amount,
-            award_currency="USD" if formatted_award_amount else None,
-            award_amount_usd=formatted_award_amount,
+            award_currency=award_currency if formatted_award_amount else None,
+            award_amount_usd=formatted_award_amount if award_currency == "USD" else None,
             source_url=source_url,
             grant_description=grant_description,
             program_of_funder=program_of_funder,
@@ -1,13 +1,14 @@
 import scrapy
-from scrapy.spiders import SitemapSpider
+from oic_scrape.sitemaps import LastmodSitemapSpider
 from oic_scrape.items import AwardItem
+from oic_scrape.money import parse_money
 from datetime import datetime, date
 import re
 
 FUNDER_ORG_NAME = "William and Flora Hewlett Foundation"
 FUNDER_ORG_ROR_ID = "https://ror.org/04hd1y677"
 
-class HewlettOrgSpider(SitemapSpider):
+class HewlettOrgSpider(LastmodSitemapSpider):
     name = "hewlett.org_grants"
     allowed_domains = ["hewlett.org"]
     sitemap_urls = ["https://hewlett.org/sitemap.xml"]
@@ -22,10 +23,8 @@ class HewlettOrgSpider(SitemapSpider):
         
         # Extract and process amount
         amount_str = response.css('.highlight:contains("Amount") .highlights-value::text').get(default="")
-        try:
-            award_amount = float(amount_str.replace("$", "").replace(",", ""))
-        except ValueError:
-            award_amount = None
+        award_amount = parse_money(amount_str, "USD").amount
+        if award_amount is None:
             self.logger.warning(f"Could not parse award amount: {amount_str}")
 
         # Extract and process date
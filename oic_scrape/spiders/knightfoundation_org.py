@@ -1,18 +1,23 @@
-import scrapy
 import json
 from datetime import datetime
 from oic_scrape.items import AwardItem, AwardParticipant
-import logging
-from urllib.parse import urlparse, parse_qs
+from oic_scrape.pagination import PaginatedSpider
+from scrapy.exceptions import IgnoreRequest
+from scrapy.spidermiddlewares.httperror import HttpError
+from twisted.internet.error import ConnectionRefusedError, DNSLookupError, TimeoutError
 
-class KnightFoundationSpider(scrapy.Spider):
+class KnightFoundationSpider(PaginatedSpider):
     name = "knightfoundation_org_grants"
     allowed_domains = ["knightfoundation.org"]
-    start_urls = ["https://knightfoundation.org/wp-json/knight-foundation-app/v1/grants?per_page=100&page=1&_locale=user"]
-    
+    api_url = "https://knightfoundation.org/wp-json/knight-foundation-app/v1/grants?per_page=100&page={page}&_locale=user"
+    max_pages = 52  # Set maximum number of pages to scrape
+
+    # Pages are fetched a few at a time (see PaginatedSpider), AdaptiveConcurrency backs off if the API struggles
     custom_settings = {
-        'DOWNLOAD_DELAY': 2,
-        'CONCURRENT_REQUESTS': 1,
+        'DOWNLOAD_DELAY': 0.5,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
+        'PAGINATION_WINDOW': 4,
+        'ADAPTIVE_CONCURRENCY_ENABLED': True,
         'ROBOTSTXT_OBEY': False,  # API endpoint
         'LOG_LEVEL': 'DEBUG',
     }
@@ -23,63 +28,30 @@ class KnightFoundationSpider(scrapy.Spider):
         'Accept': 'application/json',
         'Accept-Language': 'en-US,en;q=0.9',
     }
-        
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.total_records = 0
-        self.max_pages = 52  # Set maximum number of pages to scrape
-        
-    def start_requests(self):
-        for url in self.start_urls:
-            yield scrapy.Request(
-                url,
-                headers=self.headers,
-                callback=self.parse,
-                errback=self.handle_error,
-                dont_filter=True
-            )
 
-    def parse(self, response):
+    def page_url(self, page):
+        return self.api_url.format(page=page)
+
+    def page_request_kwargs(self):
+        return {'headers': self.headers, 'errback': self.handle_error}
+
+    def is_past_last_page(self, response, page):
+        # The API returns an empty list past the last page
         try:
-            grants = json.loads(response.text)
-            
-            # Stop if no grants are returned
-            if not grants:
-                self.logger.info("No more grants found. Stopping pagination.")
-                return
-            
-            # Parse current_page safely
-            parsed_url = urlparse(response.url)
-            query_params = parse_qs(parsed_url.query)
-            current_page = int(query_params.get('page', [1])[0])
-            
-            self.logger.info(f"Processing page {current_page}")
-            self.logger.info(f"Number of grants in current response: {len(grants)}")
-            
-            # Process each grant
-            for grant in grants:
-                yield self.parse_grant(grant)
-                
-            # Continue pagination if current_page is less than max_pages
-            if current_page < self.max_pages:
-                next_page = current_page + 1
-                query_params['page'] = [str(next_page)]
-                new_query = '&'.join([f"{k}={v[0]}" for k, v in query_params.items()])
-                next_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{new_query}"
-                self.logger.info(f"Moving to next page: {next_page}")
-                yield scrapy.Request(
-                    next_url,
-                    headers=self.headers,
-                    callback=self.parse,
-                    errback=self.handle_error,
-                    dont_filter=True
-                )
-            else:
-                self.logger.info(f"Stopping pagination: reached maximum page limit of {self.max_pages}")
-                    
-        except Exception as e:
-            self.logger.error(f"An error occurred: {e}")
-            self.logger.error("Traceback:", exc_info=True)
+            return json.loads(response.text) == []
+        except ValueError:
+            return False
+
+    def parse(self, response):
+        # Errors propagate, a bad page is logged as a spider error and the pagination moves on
+        grants = json.loads(response.text)
+
+        current_page = response.meta.get('page_number')
+        self.logger.info(f"Processing page {current_page}")
+        self.logger.info(f"Number of grants in current response: {len(grants)}")
+
+        for grant in grants:
+            yield self.parse_grant(grant)
 
     def parse_grant(self, grant):
         # Extract comments if any special conditions exist
@@ -128,6 +100,11 @@ class KnightFoundationSpider(scrapy.Spider):
         )
 
     def handle_error(self, failure):
+        if failure.check(IgnoreRequest) and not failure.check(HttpError):
+            # Pages past the last result page, cancelled by PaginationMiddleware (HttpError is
+            # an IgnoreRequest too, but a real failure)
+            self.logger.debug(f'Dropped {failure.request.url}: {failure.value}')
+            return
         self.logger.error(f'Request failed: {failure.value}')
         if failure.check(HttpError):
             response = failure.value.response
@@ -4,6 +4,8 @@ from datetime import datetime
 import re
 from bs4 import BeautifulSoup
 from oic_scrape.items import AwardItem
+from oic_scrape.jsonstream import JSONStreamError, iter_json_array
+from oic_scrape.money import parse_money
 
 FUNDER_ORG_NAME = "Samuel H. Kress Foundation"
 FUNDER_ORG_ROR_ID = "https://ror.org/00akqa526"
@@ -116,15 +118,15 @@ class KressFoundationSpider(scrapy.Spider):
             clean_amount = self.clean_html_text(amount_str)
             if not clean_amount:
                 return None
-            return float(re.sub(r'[^\d.]', '', clean_amount))
+            return parse_money(clean_amount, "USD").amount
         except (ValueError, AttributeError) as e:
             self.logger.warning(f"Could not parse amount: {amount_str} - {str(e)}")
             return None
 
     def parse_grants(self, response):
         try:
-            data = json.loads(response.text)
-            grants = data.get("Datatable", {}).get("aaData", [])
+            # All the grants are in a single response, decode them one at a time
+            grants = iter_json_array(response.body, ["Datatable", "aaData"])
             
             for grant in grants:
                 program, grantee, description, amount, year = [
@@ -164,8 +166,8 @@ class KressFoundationSpider(scrapy.Spider):
                 token = response.meta["token"]
                 yield self.create_page_request(1, token, "pager")
                 
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, JSONStreamError) as e:
             self.logger.error(f"Failed to parse JSON response: {e}")
-            self.logger.error(f"Response text: {response.text}")
+            self.logger.error(f"Response text: {response.text[:1000]}")
         except Exception as e:
             self.logger.error(f"Error processing grants: {str(e)}")
\ No newline at end of file
@@ -1,13 +1,14 @@
 import scrapy
-from scrapy.spiders import SitemapSpider
+from oic_scrape.sitemaps import LastmodSitemapSpider
 from datetime import datetime
 from oic_scrape.items import AwardItem
+from oic_scrape.money import parse_money
 import re
 
 FUNDER_NAME = "John D. and Catherine T. MacArthur Foundation"
 FUNDER_ROR_ID = "https://ror.org/00dxczh48"
 
-class MacfoundSpider(SitemapSpider):
+class MacfoundSpider(LastmodSitemapSpider):
     name = "macfound.org_grants"
     allowed_domains = ["macfound.org"]
     sitemap_urls = ["https://www.macfound.org/sitemap.xml"]
@@ -37,7 +38,7 @@ class MacfoundSpider(SitemapSpider):
             
             # Extract and clean amount
             amount_text = grant.css('div.card-item--amt strong::text').get()
-            amount = float(re.sub(r'[^\d.]', '', amount_text)) if amount_text else None
+            amount, currency = parse_money(amount_text, "USD")
             
             # Extract program and description
             program = grant.css('div.card-item--title a::text').get()
@@ -69,8 +70,8 @@ class MacfoundSpider(SitemapSpider):
                 grant_year=year,
                 grant_duration=duration,
                 award_amount=amount,
-                award_currency="USD" if amount else None,
-                award_amount_usd=amount,
+                award_currency=currency if amount else None,
+                award_amount_usd=amount if currency == "USD" else None,
                 source_url=response.url,
                 grant_description=description,
                 program_of_funder=program,
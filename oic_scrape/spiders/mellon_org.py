@@ -6,18 +6,44 @@ But it's a very hip site without any server-side rendering so lets just read the
 Assumptions:
 - End Date = Date of Award (start date) + Length (e.g. 35 months)
 - No PI is listed in their database
+
+Grant details are fetched `batch_size` grants per request (aliased `grantDetails` fields in one
+query), falling back to one request per grant for the grants a batch failed on, or for all of
+them when the batch request itself fails. Details are cached in
+`.scrapy/mellon/grant_details.json`, and grants whose search result (title, country, state) is
+unchanged are not queried again. Spider arguments:
+
+    $ poetry run scrapy crawl mellon.org_grants -a batch_size=25 -a refresh_cache=true -O data/mellon.org_grants.jsonl
 """
 
 import scrapy
 import json
+import os
+from pathlib import Path
+from oic_scrape.dates import add_months, format_months
 from oic_scrape.items import AwardItem
 import dateparser
-from dateutil.relativedelta import relativedelta
 from datetime import datetime
+from scrapy import signals
+from scrapy.utils.project import data_path
 
 FUNDER_NAME = "Andrew W. Mellon Foundation"
 FUNDER_ROR = "https://ror.org/04jsh2530"
 
+GRANT_FIELDS = """grant {
+      amount
+      areaOfFocus
+      date
+      description
+      durationInMonths
+      granteeId
+      granteeName
+      id
+      location
+      programArea
+      title
+    }"""
+
 
 class MellonSpider(scrapy.Spider):
     name = "mellon.org_grants"
@@ -27,6 +53,30 @@ class MellonSpider(scrapy.Spider):
     offset = 0
     limit = 5000
 
+    def __init__(self, batch_size: int = 50, refresh_cache: str = "false", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = max(1, int(batch_size))
+        self.refresh_cache = str(refresh_cache).lower() in ("1", "true", "yes")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.cache_path = Path(data_path("mellon", createdir=True)) / "grant_details.json"
+        spider.details_cache = {}
+        if spider.cache_path.exists() and not spider.refresh_cache:
+            with spider.cache_path.open(encoding="utf-8") as f:
+                spider.details_cache = json.load(f)
+        crawler.signals.connect(spider._save_cache, signal=signals.spider_closed)
+        return spider
+
+    def _save_cache(self, spider, reason):
+        if spider is not self:
+            return
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.details_cache, f)
+        os.replace(tmp_path, self.cache_path)
+
     def start_requests(self):
         # Query to their GraphQL API to get grant IDs (with pagination)
         # Note: subsequent pagination requests are triggered from the parse function
@@ -89,41 +139,22 @@ fragment GrantSearchResults on GrantSearchResultWithTotal {
     def parse(self, response):
         # Parse the JSON response from grantSearch
         data = json.loads(response.text)
+        to_fetch = []
         for grant in data["data"]["grantSearch"]["entities"]:
-            # For each grant, request its full details
             grant_id = grant["data"]["id"]
+            summary = {k: grant["data"].get(k) for k in ("title", "country", "state")}
 
-            # Call the GraphQL API for each individual grant
-            yield scrapy.Request(
-                self.graphql_url,
-                method="POST",
-                headers={
-                    "Content-Type": "application/json",
-                },
-                body=json.dumps(
-                    {
-                        "query": """query GrantDetails($grantId: String!) {
-                                  grantDetails(grantId: $grantId) {
-                                    grant {
-                                      amount
-                                      areaOfFocus
-                                      date
-                                      description
-                                      durationInMonths
-                                      granteeId
-                                      granteeName
-                                      id
-                                      location
-                                      programArea
-                                      title
-                                    }
-                                  }
-                                }""",
-                        "variables": {"grantId": grant_id},
-                    }
-                ),
-                callback=self.parse_grant_details,
-            )
+            # Grants whose search result didn't change since they were cached are not queried again
+            cached = self.details_cache.get(grant_id)
+            if cached and cached["summary"] == summary:
+                self.crawler.stats.inc_value("mellon/details_cache/hits", spider=self)
+                yield self.build_award(cached["details"])
+            else:
+                to_fetch.append((grant_id, summary))
+
+        # Request the full details of the other grants, batch_size grants at a time
+        for i in range(0, len(to_fetch), self.batch_size):
+            yield self.grant_details_request(to_fetch[i : i + self.batch_size])
 
         # Paginate the original base GraphQL Query
         # Update offset and check for more data to fetch
@@ -133,14 +164,86 @@ fragment GrantSearchResults on GrantSearchResultWithTotal {
             # Generate next request with updated offset
             yield from self.start_requests()
 
-    def parse_grant_details(self, response):
+    def grant_details_request(self, grants):
+        """Builds a request for the details of several grants, with one aliased grantDetails field per grant.
+
+        Args:
+            grants (list): (grant id, search result summary) pairs.
+
+        Returns:
+            scrapy.Request: The GraphQL request.
+        """
+        if len(grants) == 1:
+            query = f"""query GrantDetails($grantId: String!) {{
+  grantDetails(grantId: $grantId) {{
+    {GRANT_FIELDS}
+  }}
+}}"""
+            variables = {"grantId": grants[0][0]}
+        else:
+            params = ", ".join(f"$g{i}: String!" for i in range(len(grants)))
+            fields = "\n".join(
+                f"  g{i}: grantDetails(grantId: $g{i}) {{\n    {GRANT_FIELDS}\n  }}" for i in range(len(grants))
+            )
+            query = f"query GrantDetailsBatch({params}) {{\n{fields}\n}}"
+            variables = {f"g{i}": grant_id for i, (grant_id, _) in enumerate(grants)}
+
+        return scrapy.Request(
+            self.graphql_url,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+            },
+            body=json.dumps({"query": query, "variables": variables}),
+            callback=self.parse_grant_details,
+            errback=self.grant_details_failed,
+            cb_kwargs={"grants": grants},
+            # Identical batches can legitimately repeat (e.g. single-grant fallbacks)
+            dont_filter=True,
+        )
+
+    def parse_grant_details(self, response, grants):
         # Attempt to parse the JSON response
         try:
-            details = json.loads(response.text)["data"]["grantDetails"]["grant"]
-        except (json.JSONDecodeError, KeyError) as e:
+            payload = json.loads(response.text)
+            data = payload.get("data") or {}
+        except (json.JSONDecodeError, AttributeError) as e:
             self.logger.error(f"Error parsing JSON response: {e}")
+            payload, data = {}, {}
+
+        if len(grants) == 1:
+            results = {0: (data.get("grantDetails") or {}).get("grant")}
+        else:
+            results = {i: (data.get(f"g{i}") or {}).get("grant") for i in range(len(grants))}
+
+        # Aliases with an error are fetched again one by one, a single failing grant makes the whole field null
+        failed_aliases = {
+            error["path"][0] for error in payload.get("errors") or [] if error.get("path")
+        }
+
+        for i, (grant_id, summary) in enumerate(grants):
+            details = results.get(i)
+            if details and f"g{i}" not in failed_aliases:
+                self.details_cache[grant_id] = {"summary": summary, "details": details}
+                yield self.build_award(details)
+            elif len(grants) > 1:
+                self.crawler.stats.inc_value("mellon/batch_fallbacks", spider=self)
+                yield self.grant_details_request([(grant_id, summary)])
+            else:
+                self.logger.error(f"Failed to fetch details of grant {grant_id}: {payload.get('errors')}")
+
+    def grant_details_failed(self, failure):
+        """Fetches the grants of a failed batch (e.g. an HTTP error for a too large query) one by one."""
+        grants = failure.request.cb_kwargs["grants"]
+        if len(grants) == 1:
+            self.logger.error(f"Failed to fetch details of grant {grants[0][0]}: {failure.value!r}")
             return
+        self.logger.warning(f"Batch of {len(grants)} grants failed ({failure.value!r}), fetching them one by one")
+        for grant in grants:
+            self.crawler.stats.inc_value("mellon/batch_fallbacks", spider=self)
+            yield self.grant_details_request([grant])
 
+    def build_award(self, details) -> AwardItem:
         # Parse the grant start date
         try:
             grant_start_date = dateparser.parse(details["date"])
@@ -153,14 +256,13 @@ fragment GrantSearchResults on GrantSearchResultWithTotal {
 
         # Calculate the grant end date
         grant_end_date = None
-        if grant_start_date:
-            try:
-                duration_in_months = int(details["durationInMonths"])
-                grant_end_date = grant_start_date + relativedelta(
-                    months=duration_in_months
-                )
-            except (ValueError, TypeError) as e:
-                self.logger.error(f"Error calculating grant end date: {e}")
+        try:
+            duration_in_months = int(details["durationInMonths"])
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Error parsing grant duration: {e}")
+            duration_in_months = None
+        if grant_start_date and duration_in_months is not None:
+            grant_end_date = add_months(grant_start_date, duration_in_months)
 
         # Now, prepare the item
         award = AwardItem(
@@ -173,7 +275,7 @@ fragment GrantSearchResults on GrantSearchResultWithTotal {
             grant_year=int(grant_start_date.strftime("%Y"))
             if grant_start_date
             else None,
-            grant_duration=f"{details['durationInMonths']} months",
+            grant_duration=format_months(duration_in_months),
             grant_start_date=grant_start_date.date()
             if grant_start_date
             else None,
@@ -192,4 +294,4 @@ fragment GrantSearchResults on GrantSearchResultWithTotal {
             _award_schema_version="0.1.0",
         )
 
-        yield award
+        return award
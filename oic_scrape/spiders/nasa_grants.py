@@ -2,9 +2,20 @@ import scrapy
 import json
 from datetime import datetime, timedelta
 from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.jsonstream import iter_json_array
 from urllib.parse import urlencode
 
 class NasaGrantsSpider(scrapy.Spider):
+    """
+    Harvests NASA grants from the NSSC Elasticsearch API, by award date windows.
+
+    The API returns at most 10,000 hits per query (`from` + `size`), so the date range is split
+    adaptively: each window is first counted (`size=0`), windows over the cap are split in two
+    until they fit, and windows that fit are fetched in pages of `page_size` hits. Windows start
+    as whole years, so sparse years cost a single count request, and all windows are requested
+    at once, so they are fetched concurrently.
+    """
+
     name = "nasa_nssc_grants"
     allowed_domains = ["www3.nasa.gov"]
     base_url = "https://www3.nasa.gov/api/2/grants/_search"
@@ -14,35 +25,90 @@ class NasaGrantsSpider(scrapy.Spider):
         'HTTPCACHE_EXPIRATION_SECS': 60 * 60 * 24  # Cache for 24 hours
     }
 
-    def __init__(self, *args, **kwargs):
+    # Maximum number of hits the API returns for a query
+    max_window_hits = 10000
+    source_fields = 'purchase_request_number,grant_number,pgrp_center,proposal_title,principal_investigator,technical_representative,institution_name,award_date,pop_start_date,pop_end_date,case_state,pr_task,program_title'
+
+    def __init__(self, page_size: int = 1000, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.start_date = datetime(2006, 1, 1)
-        self.end_date = datetime.now()
-        self.current_date = self.start_date
+        self.end_date = datetime.now() + timedelta(days=1)
+        self.page_size = min(int(page_size), self.max_window_hits)
 
     def start_requests(self):
-        while self.current_date < self.end_date:
-            next_date = self.current_date + timedelta(days=30)
-            yield self.create_request(self.current_date, next_date)
-            self.current_date = next_date
+        # When resuming a checkpointed crawl (JOBDIR), the windows already requested are dropped by
+        # the persisted dupefilter, and the pending ones are in the persisted request queue
+        year = self.start_date.year
+        while datetime(year, 1, 1) < self.end_date:
+            window_start = max(datetime(year, 1, 1), self.start_date)
+            window_end = min(datetime(year + 1, 1, 1), self.end_date)
+            yield self.create_count_request(window_start, window_end)
+            year += 1
 
-    def create_request(self, start_date, end_date):
-        params = {
-            'sort': 'grant_number:asc',
-            'from': 0,
-            'size': 10000,
-            '_source_include': 'purchase_request_number,grant_number,pgrp_center,proposal_title,principal_investigator,technical_representative,institution_name,award_date,pop_start_date,pop_end_date,case_state,pr_task,program_title',
-            'q': f'award_date:[{start_date.strftime("%Y-%m-%d")} TO {end_date.strftime("%Y-%m-%d")}] AND pgrp_center:* AND case_state:*'
-        }
+    def _query(self, start_date, end_date) -> str:
+        # The end of the window is exclusive, so adjacent windows don't overlap
+        return f'award_date:[{start_date.strftime("%Y-%m-%d")} TO {end_date.strftime("%Y-%m-%d")}}} AND pgrp_center:* AND case_state:*'
+
+    def _request(self, params, **kwargs):
         url = f"{self.base_url}?{urlencode(params)}"
-        return scrapy.Request(url, callback=self.parse, headers={
+        return scrapy.Request(url, headers={
             'Accept': 'application/json',
             'Content-Type': 'application/json'
-        })
+        }, **kwargs)
+
+    def create_count_request(self, start_date, end_date):
+        params = {
+            'size': 0,
+            'track_total_hits': 'true',
+            'q': self._query(start_date, end_date),
+        }
+        return self._request(
+            params,
+            callback=self.parse_count,
+            cb_kwargs={'start_date': start_date, 'end_date': end_date},
+        )
+
+    def create_request(self, start_date, end_date, offset=0):
+        params = {
+            'sort': 'grant_number:asc',
+            'from': offset,
+            'size': min(self.page_size, self.max_window_hits - offset),
+            '_source_include': self.source_fields,
+            'q': self._query(start_date, end_date),
+        }
+        return self._request(params, callback=self.parse)
+
+    def parse_count(self, response, start_date, end_date):
+        total = json.loads(response.body).get('hits', {}).get('total', 0)
+        if isinstance(total, dict):
+            # Elasticsearch 7+ reports {"value": n, "relation": "eq" | "gte"}
+            total = total.get('value', 0) if total.get('relation') == 'eq' else max(total.get('value', 0), self.max_window_hits + 1)
+
+        days = (end_date - start_date).days
+        self.logger.debug(f"{total} grants awarded from {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}")
+
+        if total > self.max_window_hits and days > 1:
+            # Over the cap, split the window in two and count both halves
+            self.crawler.stats.inc_value('nasa/windows_split', spider=self)
+            middle = start_date + timedelta(days=days // 2)
+            yield self.create_count_request(start_date, middle)
+            yield self.create_count_request(middle, end_date)
+            return
+
+        if total > self.max_window_hits:
+            self.logger.warning(
+                f"{total} grants awarded on {start_date:%Y-%m-%d}, only the first {self.max_window_hits} can be retrieved"
+            )
+            total = self.max_window_hits
+
+        if total:
+            self.crawler.stats.inc_value('nasa/windows', spider=self)
+        for offset in range(0, total, self.page_size):
+            yield self.create_request(start_date, end_date, offset)
 
     def parse(self, response):
-        data = json.loads(response.body)
-        for hit in data.get('hits', {}).get('hits', []):
+        # Decode the hits one at a time rather than the whole page
+        for hit in iter_json_array(response.body, ['hits', 'hits']):
             source = hit.get('_source', {})
             
             award = AwardItem(
@@ -1,21 +1,24 @@
-import scrapy
 import re
 
 from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.money import parse_money
+from oic_scrape.pagination import PaginatedSpider
 from datetime import datetime
 
 FUNDER_ORG_NAME = "Alfred P. Sloan Foundation"
 FUNDER_ORG_ROR_ID = "https://ror.org/052csg198"
 
 
-class SloanSpider(scrapy.Spider):
+class SloanSpider(PaginatedSpider):
     source_name = "sloan.org"
     source_type = "grants"
     name = f"{source_name}_{source_type}"
 
-    def start_requests(self):
-        url = "https://sloan.org/grants-database?page=1"
-        yield scrapy.Request(url)
+    def page_url(self, page):
+        return f"https://sloan.org/grants-database?page={page}"
+
+    def is_last_page(self, response, page):
+        return response.css("a.pager-right::attr(href)").get() is None
 
     def parse(self, response):
         """
@@ -67,7 +70,7 @@ class SloanSpider(scrapy.Spider):
                 if kv["Sub-program"]
                 else kv["Program"]
             )
-            award_amount = float(re.sub(r"\D", "", amount))
+            award_amount = parse_money(amount, "USD").amount
 
             pi = AwardParticipant(
                 full_name=str(investigator),
@@ -98,13 +101,8 @@ class SloanSpider(scrapy.Spider):
 
             yield award
 
-        next_page = response.css("a.pager-right::attr(href)").get()
-        if next_page is not None:
-            next_page = response.urljoin(next_page)
-            yield scrapy.Request(next_page, callback=self.parse)
-
 
-class SloanResearchFellowSpider(scrapy.Spider):
+class SloanResearchFellowSpider(PaginatedSpider):
     """
     Spider for the Sloan Research Fellowships
     https://sloan.org/fellows-database
@@ -114,10 +112,12 @@ class SloanResearchFellowSpider(scrapy.Spider):
     source_type = "research-fellowships"
     name = "sloan.org_research-fellowships"
 
-    def start_requests(self):
+    def page_url(self, page):
         # Because we only have the index page, the only way to have a deterministic URL to spot-check a record is for us to use ascending pages by year
-        url = "https://sloan.org/fellows-database?dynamic=1&order_by=approval_year&order_by_direction=asc&limit=10&page=1"
-        yield scrapy.Request(url)
+        return f"https://sloan.org/fellows-database?dynamic=1&order_by=approval_year&order_by_direction=asc&limit=10&page={page}"
+
+    def is_last_page(self, response, page):
+        return response.css("a.pager-right::attr(href)").get() is None
 
     def parse(self, response):
         """
@@ -180,8 +180,3 @@ class SloanResearchFellowSpider(scrapy.Spider):
             )
 
             yield award
-
-        next_page = response.css("a.pager-right::attr(href)").get()
-        if next_page is not None:
-            next_page = response.urljoin(next_page)
-            yield scrapy.Request(next_page, callback=self.parse)
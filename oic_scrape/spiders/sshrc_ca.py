@@ -3,6 +3,8 @@ import scrapy
 import re
 from urllib.parse import urlparse, parse_qs
 from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.money import parse_money
+from oic_scrape.names import parse_name
 from currency_converter import ECB_URL, CurrencyConverter, RateNotFoundError
 
 
@@ -11,6 +13,15 @@ Scrapy Spider for SSHRC (Social Sciences and Humanities Research Council) Canada
 
 Design Notes:
 Currency Conversion to USD is estimated based on the exchange rate at the start of the calendar year of the award.
+
+The search is partitioned by competition year: each year gets its own form session (cookie jar)
+and result pages, so the years are paginated concurrently rather than one page after another.
+Awards are deduplicated by their `Cle` id across partitions.
+
+On a JOBDIR resume, the sessions of the previous run are gone: each year is searched again in a
+fresh session and jumps to the page after the last one parsed, while the result pages queued by
+the previous run are dropped. The pagination cursors and the ids of the awards requested so far
+are kept in the spider state.
 """
 
 
@@ -20,6 +31,8 @@ class SshrcCaSpider(scrapy.Spider):
     start_urls = ["http://www.outil.ost.uqam.ca/CRSH/RechProj.aspx?vLangue=Anglais"]
     FUNDER_ORG_NAME = "Social Sciences and Humanities Research Council"
     FUNDER_ORG_ROR_ID = "https://ror.org/04j5jqy92"
+    # Callbacks expanding the crawl, which are fetched after the award pages (see LeafFirstPriorityMiddleware)
+    listing_callbacks = ("parse", "parse_result_page")
 
     start_year = "1998"
     end_year = str(datetime.now().year + 1)
@@ -40,14 +53,55 @@ class SshrcCaSpider(scrapy.Spider):
         self.currency_converter = CurrencyConverter(
             ECB_URL, fallback_on_missing_rate=True
         )
+        self._run = None
+
+    def _state(self):
+        """The spider state, persisted by checkpoints (JOBDIR), or a plain dict without a JOBDIR."""
+        if not hasattr(self, "state"):
+            self.state = {}
+        return self.state
+
+    @property
+    def run(self):
+        """The number of this run of the crawl (counting JOBDIR resumes), which the form sessions belong to."""
+        if self._run is None:
+            state = self._state()
+            self._run = state["runs"] = state.get("runs", 0) + 1
+        return self._run
+
+    @property
+    def seen_award_ids(self):
+        """Cle ids of the awards requested so far, across all year partitions and runs."""
+        return self._state().setdefault("seen_award_ids", set())
+
+    def start_requests(self):
+        partitions = self._state().get("partitions", {})
+        for year in range(int(self.start_year), int(self.end_year) + 1):
+            # Partitions fully paginated before a resume (JOBDIR) are not searched again
+            partition = partitions.get(year)
+            if partition and partition["total_pages"] is not None and partition["result_page"] >= partition["total_pages"]:
+                self.logger.info(f"Skipping year {year}, already harvested")
+                continue
+
+            # Each year gets its own session, the result pages are tied to the search in it
+            yield scrapy.Request(
+                self.start_urls[0],
+                callback=self.parse,
+                cb_kwargs={"year": year, "run": self.run},
+                meta={"cookiejar": f"{self.run}:{year}"},
+                dont_filter=True,
+            )
 
-    def parse(self, response):
+    def parse(self, response, year: int, run: int = 1):
+        if run != self.run:
+            # A search queued by a previous run (JOBDIR), start_requests searched again
+            return
         # NOTE: There are diacritics in the POST API payload, so we need to be sure they're correctly encoded
         formdata = {
             "vVersion": "Normal",
             "vFinComp": "Comp",
-            "vDebutC": self.start_year,
-            "vFinC": self.end_year,
+            "vDebutC": str(year),
+            "vFinC": str(year),
             "vLangue": "Anglais",
             "vProgramme": "Aucun critère",
             "vInstitut": "Aucun critère",
@@ -62,36 +116,64 @@ class SshrcCaSpider(scrapy.Spider):
             formname="idValideCRSH",
             formdata=formdata,
             callback=self.parse_result_page,
+            cb_kwargs={"year": year, "run": run},
+            meta={"cookiejar": f"{run}:{year}"},
+            dont_filter=True,
         )
 
-        pass
+    def parse_result_page(self, response, year: int, run: int = 1):
+        if run != self.run:
+            # Queued by a previous run (JOBDIR), in a session that no longer exists
+            self.logger.debug(f"Year {year}: dropping a result page of run {run}")
+            self.crawler.stats.inc_value("sshrc/stale_result_pages", spider=self)
+            return
 
-    def parse_result_page(self, response):
         award_listings = response.css("#lblResultat a::attr(href)").getall()
         for award_url in award_listings:
-            yield scrapy.Request(
-                response.urljoin(award_url), callback=self.parse_award_page
-            )
+            award_url = response.urljoin(award_url)
+            # The same award can be listed in several partitions, only request it once
+            award_id = parse_qs(urlparse(award_url).query).get("Cle", [award_url])[0]
+            if award_id in self.seen_award_ids:
+                self.crawler.stats.inc_value("sshrc/duplicate_awards", spider=self)
+                continue
+            self.seen_award_ids.add(award_id)
+            yield scrapy.Request(award_url, callback=self.parse_award_page)
 
         # Handle Pagination of Result Pages
         form_section = response.css("#ListeProjet")
         current_page = form_section.css("input#NoPage::attr(value)").get()
+        if current_page is None:
+            # A single year can have no awards, there is no pagination then
+            self.logger.debug(f"Year {year}: no result pages")
+            return
         total_pages_text = (
-            form_section.css('td[align="center"]::text').getall()[-1].strip()
-        )  # Get the last text element
+            form_section.css('td[align="center"]::text').getall() or [""]
+        )[-1].strip()  # Get the last text element
         total_pages_match = re.search(r"of (\d+)", total_pages_text)
         total_pages = total_pages_match.group(1) if total_pages_match else None
 
-        self.logger.debug(f"Index page {current_page} of {total_pages}")
+        self.logger.debug(f"Year {year}: index page {current_page} of {total_pages}")
+
+        # Keep the pagination cursor of each partition in the spider state, persisted by checkpoints (JOBDIR).
+        # A resumed year starts again from page 1, and continues after the last page parsed before.
+        partitions = self._state().setdefault("partitions", {})
+        last_page = max(int(current_page), partitions.get(year, {}).get("result_page", 0))
+        partitions[year] = {
+            "result_page": last_page,
+            "total_pages": int(total_pages) if total_pages else None,
+        }
 
         # Proceed to the next result page
-        if total_pages and int(current_page) < int(total_pages):
-            next_page = int(current_page) + 1
+        if total_pages and last_page < int(total_pages):
+            next_page = last_page + 1
             yield scrapy.FormRequest.from_response(
                 response,
                 formname="ListeProjet",
                 formdata={"NoPage": str(next_page)},  # Setting the page number
                 callback=self.parse_result_page,
+                cb_kwargs={"year": year, "run": run},
+                meta={"cookiejar": f"{run}:{year}"},
+                dont_filter=True,
             )
 
     def build_Participant(
@@ -101,22 +183,23 @@ class SshrcCaSpider(scrapy.Spider):
         Processes a name string into its parts and returns a corresponding AwardParticipant.
 
         Args:
-            name (str): The name to process
+            name (str): The name to process, possibly followed by a title in parentheses
+            title (str): The participant's role, unless the name gives one in parentheses
             is_PI (bool, optional): Whether the name should be treated as a principal investigator. Defaults to False.
 
         Returns:
             AwardParticipant: An AwardParticipant object with the name parts filled in.
         """
-
-        # Sees if theres a title in parentheses
-        match = re.search(r"\((.*?)\)", name)
-        if match:
-            title = match.group(1)  # This is the text inside the parentheses
-            name = name[
-                : match.start()
-            ].strip()  # This is the name up until the parentheses
-
-        return AwardParticipant(full_name=name, grant_role=title, is_pi=is_pi)
+        parsed = parse_name(name)
+        return AwardParticipant(
+            full_name=parsed.full_name,
+            grant_role=parsed.role or title,
+            is_pi=is_pi,
+            first_name=parsed.first_name,
+            middle_name=parsed.middle_name,
+            last_name=parsed.last_name,
+            suffix=parsed.suffix,
+        )
 
     def parse_award_page(self, response):
         crawl_ts = datetime.utcnow()
@@ -167,10 +250,9 @@ class SshrcCaSpider(scrapy.Spider):
                     self.build_Participant(co_applicant, "Co-applicant")
                 )
 
-        award_amount = source_data.get("Amount Received", None)
+        # Amounts are in Canadian dollars ("$")
+        award_amount, award_currency = parse_money(source_data.get("Amount Received", None), "CAD")
         if award_amount:
-            award_amount = float(award_amount.replace("$", "").replace(",", ""))
-            award_currency = "CAD"
             try:
                 award_amount_usd = self.currency_converter.convert(
                     award_amount,
@@ -1,12 +1,13 @@
-from scrapy.spiders import SitemapSpider
+from oic_scrape.sitemaps import LastmodSitemapSpider
 from oic_scrape.items import AwardItem, AwardParticipant
+from oic_scrape.money import parse_money
 from datetime import datetime, UTC
 import json
 
 FUNDER_ORG_NAME = "John Templeton Foundation"
 FUNDER_ORG_ROR_ID = "https://ror.org/035tnyy05"
 
-class TempletonOrgSpider(SitemapSpider):
+class TempletonOrgSpider(LastmodSitemapSpider):
     name = "templeton.org_grants"
     allowed_domains = ["templeton.org"]
     sitemap_urls = ["https://www.templeton.org/sitemap_index.xml"]
@@ -84,9 +85,7 @@ class TempletonOrgSpider(SitemapSpider):
         return response.css(f"{css_selector}::text").get(default="").strip()
 
     def parse_amount(self, amount_str):
-        if amount_str:
-            try:
-                return float(amount_str.replace("$", "").replace(",", ""))
-            except ValueError:
-                self.logger.warning(f"Could not parse award amount: {amount_str}")
-        return None
\ No newline at end of file
+        award_amount = parse_money(amount_str, "USD").amount
+        if amount_str and award_amount is None:
+            self.logger.warning(f"Could not parse award amount: {amount_str}")
+        return award_amount
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+A project (settings and spiders) for the smoke tests, crawling a local HTTP server.
+"""
@@ -0,0 +1,15 @@
+"""
+The project settings, with the smoke test spiders and Scrapy's own download handlers.
+
+Used through `SCRAPY_SETTINGS_MODULE=tests.smoke.settings`.
+"""
+
+from oic_scrape.settings import *  # noqa: F403
+
+SPIDER_MODULES = ["tests.smoke.spiders"]
+NEWSPIDER_MODULE = "tests.smoke.spiders"
+ROBOTSTXT_OBEY = False
+HTTPCACHE_ENABLED = False
+# Plain HTTP, no browser
+DOWNLOAD_HANDLERS = {}
+LOG_LEVEL = "INFO"
@@ -0,0 +1,30 @@
+"""
+Spiders crawling the local server of the smoke tests, whose URL is in `SMOKE_URL`.
+"""
+
+import os
+
+import scrapy
+
+
+class SmokeSpider(scrapy.Spider):
+    """Yields an item for each of the pages linked from the server's index."""
+
+    name = "smoke"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.start_urls = [os.environ["SMOKE_URL"]]
+
+    def parse(self, response):
+        for href in response.css("a::attr(href)").getall():
+            yield response.follow(href, callback=self.parse_page)
+
+    def parse_page(self, response):
+        yield {"url": response.url, "title": response.css("title::text").get()}
+
+
+class OtherSmokeSpider(SmokeSpider):
+    """The same crawl under another name, to run several spiders at once."""
+
+    name = "smoke_other"
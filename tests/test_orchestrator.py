@@ -0,0 +1,94 @@
+"""
+Smoke tests of the orchestrator: runs its command line against spiders crawling a local server.
+
+    $ python -m unittest tests.test_orchestrator
+"""
+
+import http.server
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = 3
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/":
+            links = "".join(f'<a href="/page/{i}">{i}</a>' for i in range(PAGES))
+            body = f"<html><body>{links}</body></html>"
+        else:
+            body = f"<html><head><title>{self.path}</title></head></html>"
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class OrchestratorSmokeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def run_orchestrator(self, *args: str) -> dict:
+        env = {
+            **os.environ,
+            "SCRAPY_SETTINGS_MODULE": "tests.smoke.settings",
+            "SMOKE_URL": f"http://127.0.0.1:{self.server.server_port}/",
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])),
+        }
+        summary = self.tmp / "summary.json"
+        result = subprocess.run(
+            [
+                sys.executable, "-m", "oic_scrape.orchestrator", *args,
+                "--output-template", str(self.tmp / "{name}.jsonl"),
+                "--summary", str(summary),
+            ],
+            cwd=self.tmp,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        return json.loads(summary.read_text())
+
+    def assert_crawled(self, summary: dict, spiders: list) -> None:
+        self.assertEqual(sorted(c["spider"] for c in summary["crawls"]), sorted(spiders))
+        for crawl in summary["crawls"]:
+            self.assertEqual(crawl["status"], "ok", crawl)
+            self.assertEqual(crawl["items"], PAGES, crawl)
+            lines = Path(crawl["output"]).read_text().splitlines()
+            self.assertEqual(len(lines), PAGES)
+
+    def test_shared_reactor(self):
+        summary = self.run_orchestrator("smoke", "smoke_other", "--max-running", "1", "--max-requests", "4")
+        self.assert_crawled(summary, ["smoke", "smoke_other"])
+
+    def test_processes(self):
+        summary = self.run_orchestrator("smoke", "smoke_other", "--processes", "2", "--max-requests", "4")
+        self.assert_crawled(summary, ["smoke", "smoke_other"])
+
+
+if __name__ == "__main__":
+    unittest.main()